@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark der Lese-Engines aus excel_reader.py auf den mitgelieferten Daten-Workbooks.
+
+Verwendung: python benchmark_excel_engines.py [Wiederholungen]
+"""
+
+import os
+import sys
+import time
+import warnings
+import pandas as pd
+from excel_reader import available_engines, read_workbook
+
+# openpyxl warnt bei ungültigen Datumswerten - für den Benchmark irrelevant
+warnings.filterwarnings("ignore", category=UserWarning, module="openpyxl")
+
+DATA_DIR = "excel_data/data"
+
+def benchmark_engine(engine, file_paths, repeats):
+    """Misst die beste Laufzeit (Sekunden) pro Datei für eine Engine"""
+    timings = {}
+    results = {}
+    for file_path in file_paths:
+        best = None
+        for _ in range(repeats):
+            start = time.perf_counter()
+            sheets, _ = read_workbook(file_path, engine)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        timings[file_path] = best
+        results[file_path] = sheets
+    return timings, results
+
+def frames_equal(sheets_a, sheets_b):
+    """Prüft, ob zwei Engines für eine Datei identische Sheets liefern"""
+    if list(sheets_a) != list(sheets_b):
+        return False
+    for sheet_name in sheets_a:
+        try:
+            pd.testing.assert_frame_equal(sheets_a[sheet_name], sheets_b[sheet_name])
+        except AssertionError:
+            return False
+    return True
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    file_paths = sorted(os.path.join(DATA_DIR, f) for f in os.listdir(DATA_DIR)
+                        if f.endswith(".xlsx") and not f.startswith("~$"))
+    engines = available_engines()
+
+    print(f"⏱️ Benchmark: {len(file_paths)} Dateien, {repeats} Wiederholungen, Engines: {engines}")
+
+    all_timings = {}
+    all_results = {}
+    for engine in engines:
+        print(f"   ▶️ {engine}...")
+        all_timings[engine], all_results[engine] = benchmark_engine(engine, file_paths, repeats)
+
+    # Tabelle: Datei × Engine
+    name_width = max(len(os.path.basename(f)) for f in file_paths)
+    header = "Datei".ljust(name_width) + "".join(f"{engine:>12}" for engine in engines)
+    print("\n" + header)
+    print("-" * len(header))
+    for file_path in file_paths:
+        line = os.path.basename(file_path).ljust(name_width)
+        line += "".join(f"{all_timings[engine][file_path]:>11.3f}s" for engine in engines)
+        print(line)
+
+    print("-" * len(header))
+    baseline = sum(all_timings["openpyxl"].values())
+    line = "GESAMT".ljust(name_width)
+    line += "".join(f"{sum(all_timings[engine].values()):>11.3f}s" for engine in engines)
+    print(line)
+
+    print()
+    for engine in engines:
+        total = sum(all_timings[engine].values())
+        identical = all(frames_equal(all_results[engine][f], all_results["openpyxl"][f]) for f in file_paths)
+        print(f"📊 {engine}: {total:.3f}s (Faktor {baseline / total:.2f}x ggü. openpyxl), "
+              f"Ergebnis identisch mit openpyxl: {'✅' if identical else '❌'}")
+
+if __name__ == "__main__":
+    main()
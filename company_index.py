@@ -0,0 +1,462 @@
+import os
+import re
+import unicodedata
+import numpy as np
+import pandas as pd
+from excel_kennzahlen import (
+    get_sector_excel_files, load_excel_files_once, apply_pending_changes,
+    get_loaded_sheet_names, get_sheet_frame, register_invalidation_hook
+)
+from data_catalog import sector_for_file
+
+# Sheets mit Unternehmens-Stammdaten (Spalten A-E: Holding, Universe, Sub-Industry, Focus, RIC)
+COMPANY_SHEET_KEYWORDS = ["equity", "key", "revenue", "profitability", "financial", "growth", "figures"]
+
+# Mindestlänge für die Teilwort-Suche nach Namen
+MIN_NAME_QUERY_LENGTH = 4
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s]")
+_WHITESPACE_RE = re.compile(r"\s+")
+_APOSTROPHES = str.maketrans({"\u2019": "'", "\u2018": "'", "`": "'", "\u00b4": "'"})
+
+# Spalten der Stammdaten-Tabelle (Positionen 0-4 der Stammdaten-Sheets + Herkunft)
+MASTER_COLUMNS = ["Name", "Holding", "Universe", "RIC", "Sub-Industry", "Focus", "Sector", "File", "Sheet"]
+
+# Gruppierungs-Spalten für Peer-Suche und Gruppen-Statistiken
+GROUP_COLUMNS = ["Focus", "Sub-Industry", "Sector"]
+
+# Spalten mit Bitmap-Index für Peer-Filter (File: Dateiname ohne Verzeichnis)
+FILTER_COLUMNS = ["Sub-Industry", "Focus", "Sector", "File"]
+
+# Pro Datei abgeleitete Strukturen: nach einer Änderung wird nur die betroffene Datei neu aufbereitet
+_company_sheets = {}  # Datei → Liste von (Sheet, Frame mit Spalten A-E) in Sheet-Reihenfolge
+_name_indexes = {}  # Datei → (Einträge, Trigramm-Index), siehe _file_name_index
+_master_parts = {}  # Datei → aufbereitete Stammdaten-Zeilen der Datei (vor dem Zusammenfassen)
+
+_company_master = None  # Stammdaten-Tabelle (siehe build_company_master)
+_master_files = None  # Dateien, aus denen die Stammdaten-Tabelle zusammengesetzt wurde
+_master_ric_rows = {}  # normalisierter RIC → Zeile der Stammdaten-Tabelle (erstes Vorkommen)
+_master_group_rows = {}  # Gruppierungs-Spalte → {Wert → Zeilen der Gruppe (ein Eintrag pro RIC)}
+_master_bitmaps = {}  # Filter-Spalte → {Wert → bool-Array über die Zeilen der Stammdaten-Tabelle}
+_master_ric_keys = None  # normalisierte RICs der Stammdaten-Tabelle (Array, für RIC-Filter)
+
+def _reset_master():
+    """Verwirft die zusammengesetzte Stammdaten-Tabelle und ihre Indizes (die Datei-Teile bleiben)"""
+    global _company_master, _master_files, _master_ric_keys
+    _company_master = None
+    _master_files = None
+    _master_ric_rows.clear()
+    _master_group_rows.clear()
+    _master_bitmaps.clear()
+    _master_ric_keys = None
+
+def clear_company_index():
+    """Verwirft Namens-Index und Stammdaten-Tabelle (werden beim nächsten Zugriff neu aufgebaut)"""
+    _company_sheets.clear()
+    _name_indexes.clear()
+    _master_parts.clear()
+    _reset_master()
+
+def _on_data_invalidated(file_path):
+    """
+    Verwirft Stammdaten-Sheets, Namens-Einträge und Stammdaten-Zeilen nur der geänderten Datei;
+    die Tabelle wird beim nächsten Zugriff aus den übrigen Datei-Teilen neu zusammengesetzt
+    """
+    if file_path is None:
+        clear_company_index()
+        return
+    _company_sheets.pop(file_path, None)
+    _name_indexes.pop(file_path, None)
+    _master_parts.pop(file_path, None)
+    _reset_master()
+
+register_invalidation_hook(_on_data_invalidated)
+
+def fold_company_name(name, strip=True):
+    """
+    Faltet einen Unternehmensnamen ohne Satzzeichen zu verlieren: Casefolding, Akzente entfernen
+    (L'Oréal → l'oreal), typografische Apostrophe vereinheitlichen, Leerzeichen zusammenfassen
+    """
+    text = unicodedata.normalize("NFKD", str(name).translate(_APOSTROPHES).casefold())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    text = _WHITESPACE_RE.sub(" ", text)
+    return text.strip() if strip else text
+
+def normalize_company_name(name, strip=True):
+    """
+    Normalisiert einen Unternehmensnamen für die Suche:
+    wie fold_company_name, Satzzeichen werden aber zu Wortgrenzen (L'Oréal → l oreal,
+    Lindt & Spruengli → lindt spruengli). Mit strip=False bleiben Leerzeichen am Rand erhalten
+    (Suchbegriffe wie "Corp " oder " Lam" grenzen damit auf Wortanfang/-ende ein).
+    """
+    text = _WHITESPACE_RE.sub(" ", _PUNCTUATION_RE.sub(" ", fold_company_name(name, strip=False)))
+    return text.strip() if strip else text
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+def _valid_name(value):
+    return bool(value) and value != 'nan' and len(value.strip()) > 2
+
+def _company_files():
+    """Alle Dateien in Such-Reihenfolge (wie bisher), einmalig in den Excel-Cache geladen"""
+    apply_pending_changes()
+    files = get_sector_excel_files(None)
+    load_excel_files_once(files)
+    return files
+
+def _file_company_sheets(file_path):
+    """Stammdaten-Sheets einer gecachten Datei in Sheet-Reihenfolge (einmalig pro Datei)"""
+    if file_path not in _company_sheets:
+        sheets = []
+        for sheet_name in get_loaded_sheet_names(file_path):
+            if not any(pattern in sheet_name.lower() for pattern in COMPANY_SHEET_KEYWORDS):
+                continue
+            df = get_sheet_frame(file_path, sheet_name)
+            if df is None or len(df.columns) < 5:
+                continue
+            sheets.append((sheet_name, df.iloc[:, :5]))
+        _company_sheets[file_path] = sheets
+    return _company_sheets[file_path]
+
+def _display_name(holding, universe, ric):
+    """Name eines Unternehmens: Holding, sonst Universe, sonst generischer Fallback"""
+    for value in (holding, universe):
+        if value and value.lower() not in ['nan', 'none', ''] and len(value) > 2:
+            return value
+    return f"Company_{ric}"
+
+def _file_master_rows(file_path):
+    """
+    Aufbereitete Stammdaten-Zeilen einer Datei (getrimmte Strings, Name, Sektor), innerhalb der
+    Datei bereits zusammengefasst; einmalig pro Datei
+    """
+    if file_path in _master_parts:
+        return _master_parts[file_path]
+
+    parts = []
+    for sheet_name, df in _file_company_sheets(file_path):
+        part = df.copy()
+        part.columns = ["Holding", "Universe", "Sub-Industry", "Focus", "RIC"]
+        part["File"] = file_path
+        part["Sheet"] = sheet_name
+        parts.append(part)
+
+    if not parts:
+        _master_parts[file_path] = None
+        return None
+
+    rows = pd.concat(parts, ignore_index=True)
+    rows = rows[rows["RIC"].notna()]
+
+    # Werte wie bisher als getrimmte Strings; fehlende Werte merken (für die Gruppen-Filter)
+    present = rows[["Universe", "Sub-Industry", "Focus"]].notna()
+    for col in ["Holding", "Universe", "Sub-Industry", "Focus", "RIC"]:
+        rows[col] = [str(value).strip() for value in rows[col]]
+    rows[["has_universe", "has_sub_industry", "has_focus"]] = present.to_numpy()
+
+    rows = rows[rows["RIC"] != ""]
+    rows = rows.drop_duplicates(["Holding", "Universe", "Sub-Industry", "Focus", "RIC"])
+    rows["Name"] = [_display_name(h, u, r) for h, u, r in zip(rows["Holding"], rows["Universe"], rows["RIC"])]
+    rows["Sector"] = sector_for_file(file_path) or ""
+    _master_parts[file_path] = rows
+    return rows
+
+def build_company_master():
+    """
+    Baut die Stammdaten-Tabelle aller Unternehmen (Name, Holding, Universe, RIC, Sub-Industry,
+    Focus, Sector, File, Sheet) aus den Stammdaten-Sheets aller Dateien.
+
+    Identische Zeilen aus mehreren Dateien/Sheets werden zusammengefasst; ein RIC kann aber
+    mehrfach vorkommen, wenn er in mehreren Focus-/Sub-Industry-Gruppen geführt wird.
+    Zusätzlich werden RIC → Zeile und Gruppe → Zeilen vorberechnet, so dass RIC-Suche und
+    Peer-Gruppen nur noch Dictionary-Zugriffe sind.
+
+    Die Zeilen werden pro Datei aufbereitet und gehalten: Nach einer Änderung wird nur die
+    geänderte Datei neu gelesen, die Tabelle samt Indizes aus den Datei-Teilen neu zusammengesetzt.
+    """
+    global _company_master, _master_files, _master_ric_keys
+    files = _company_files()
+    if _company_master is not None and _master_files == files:
+        return _company_master
+
+    _reset_master()
+    parts = [part for part in (_file_master_rows(file_path) for file_path in files) if part is not None]
+    _master_files = files
+
+    if not parts:
+        _company_master = pd.DataFrame(columns=MASTER_COLUMNS)
+        return _company_master
+
+    rows = pd.concat(parts, ignore_index=True)
+    rows = rows.drop_duplicates(["Holding", "Universe", "Sub-Industry", "Focus", "RIC"]).reset_index(drop=True)
+
+    ric_keys = rows["RIC"].str.upper().drop_duplicates()
+    _master_ric_rows.clear()
+    _master_ric_rows.update(zip(ric_keys.values, ric_keys.index))
+
+    # Peer-Gruppen: nur Zeilen mit Universe-Name und Gruppenwert, pro Gruppe jeder RIC einmal
+    _master_group_rows.clear()
+    present = {"Focus": rows["has_focus"], "Sub-Industry": rows["has_sub_industry"], "Sector": rows["Sector"] != ""}
+    for group_col in GROUP_COLUMNS:
+        members = rows[rows["has_universe"] & present[group_col]]
+        members = members.drop_duplicates([group_col, "RIC"])
+        _master_group_rows[group_col] = {value: positions.to_numpy()
+                                         for value, positions in members.groupby(group_col, sort=False).groups.items()}
+
+    # Bitmaps für Peer-Filter: pro Spalte und Wert ein bool-Array (fehlende Werte ohne Bitmap)
+    _master_bitmaps.clear()
+    for col in FILTER_COLUMNS:
+        values = rows[col].map(os.path.basename) if col == "File" else rows[col]
+        if col in ("Sub-Industry", "Focus"):
+            values = values.where(present[col])
+        codes, uniques = pd.factorize(values)
+        _master_bitmaps[col] = {value: codes == code for code, value in enumerate(uniques)}
+    _master_ric_keys = rows["RIC"].str.upper().to_numpy()
+
+    _company_master = rows[MASTER_COLUMNS + ["has_universe", "has_sub_industry", "has_focus"]]
+    print(f"🏢 Stammdaten-Tabelle aufgebaut: {len(_company_master)} Einträge, {len(_master_ric_rows)} RICs, "
+          f"{len(_master_group_rows['Focus'])} Focus- / {len(_master_group_rows['Sub-Industry'])} Sub-Industry- / "
+          f"{len(_master_group_rows['Sector'])} Sektor-Gruppen")
+    return _company_master
+
+def get_company_master():
+    """Liefert die Stammdaten-Tabelle (wird bei Bedarf aufgebaut)"""
+    return build_company_master()
+
+def find_company_record_by_ric(ric):
+    """Stammdaten zu einem RIC (erstes Vorkommen in Datei-/Sheet-Reihenfolge) oder None"""
+    master = build_company_master()
+    row_pos = _master_ric_rows.get(str(ric).upper().strip())
+    if row_pos is None:
+        return None
+
+    row = master.iloc[row_pos]
+    return {
+        "Name": row["Name"],
+        "RIC": row["RIC"],
+        "Sub-Industry": row["Sub-Industry"],
+        "Focus": row["Focus"]
+    }
+
+def find_group_members(group_col, value):
+    """
+    Alle Unternehmen einer Focus-, Sub-Industry- oder Sektor-Gruppe (ein Eintrag pro RIC,
+    Name aus der Universe-Spalte wie bei der bisherigen Peer-Suche)
+    """
+    master = build_company_master()
+    positions = _master_group_rows.get(group_col, {}).get(str(value).strip())
+    if positions is None:
+        return []
+
+    members = master.iloc[positions]
+    return [
+        {"Name": universe, "RIC": ric, "Sub-Industry": sub_industry, "Focus": focus}
+        for universe, ric, sub_industry, focus in zip(
+            members["Universe"], members["RIC"], members["Sub-Industry"], members["Focus"])
+    ]
+
+def group_values(group_col):
+    """Alle Werte einer Gruppierungs-Spalte (GROUP_COLUMNS) in Datei-/Sheet-Reihenfolge"""
+    build_company_master()
+    return list(_master_group_rows.get(group_col, {}))
+
+def group_members_frame(group_col, values):
+    """
+    Mitglieder mehrerer Focus-, Sub-Industry- oder Sektor-Gruppen als DataFrame (Spalten Group, Name, RIC,
+    Sub-Industry, Focus), Gruppen in der angegebenen Reihenfolge, ein Eintrag pro RIC und Gruppe
+    """
+    master = build_company_master()
+    groups = _master_group_rows.get(group_col, {})
+    parts = [(value, groups[value]) for value in dict.fromkeys(str(v).strip() for v in values) if value in groups]
+    if not parts:
+        return pd.DataFrame(columns=["Group", "Name", "RIC", "Sub-Industry", "Focus"])
+
+    positions = np.concatenate([rows for _, rows in parts])
+    members = master.iloc[positions]
+    return pd.DataFrame({
+        "Group": np.repeat([value for value, _ in parts], [len(rows) for _, rows in parts]),
+        "Name": members["Universe"].to_numpy(),
+        "RIC": members["RIC"].to_numpy(),
+        "Sub-Industry": members["Sub-Industry"].to_numpy(),
+        "Focus": members["Focus"].to_numpy(),
+    })
+
+def _as_list(values):
+    if isinstance(values, (list, tuple, set, frozenset)):
+        return list(values)
+    return [values]
+
+def filter_mask(expr):
+    """
+    Wertet einen Peer-Filter über die Bitmaps der Stammdaten-Tabelle aus (bool-Array pro Zeile).
+
+    Ausdrücke:
+        {"Spalte": Wert}                  Zeilen mit diesem Wert (Spalten: FILTER_COLUMNS oder "RIC")
+        {"Spalte": [Wert1, Wert2]}        einer der Werte (ODER)
+        {"Spalte1": ..., "Spalte2": ...}  alle Bedingungen (UND)
+        {..., "exclude": Ausdruck}        ohne die Zeilen des Teil-Ausdrucks
+        [Ausdruck1, Ausdruck2]            einer der Ausdrücke (ODER)
+        ("not", Ausdruck)                 Negation
+
+    Beispiel: Focus X im Sektor Y ohne bestimmte RICs
+        {"Focus": "X", "Sector": "Y", "exclude": {"RIC": ["AAA.N", "BBB.L"]}}
+    """
+    master = build_company_master()
+    row_count = len(master)
+
+    if isinstance(expr, list):
+        mask = np.zeros(row_count, dtype=bool)
+        for sub_expr in expr:
+            mask |= filter_mask(sub_expr)
+        return mask
+
+    if isinstance(expr, tuple) and len(expr) == 2 and expr[0] == "not":
+        return ~filter_mask(expr[1])
+
+    if not isinstance(expr, dict):
+        raise ValueError(f"Ungültiger Peer-Filter: {expr!r}")
+
+    mask = np.ones(row_count, dtype=bool)
+    for column, values in expr.items():
+        if column == "exclude":
+            mask &= ~filter_mask(values)
+        elif column == "RIC":
+            mask &= np.isin(_master_ric_keys, [str(ric).upper().strip() for ric in _as_list(values)])
+        elif column in _master_bitmaps:
+            bitmaps = _master_bitmaps[column]
+            column_mask = np.zeros(row_count, dtype=bool)
+            for value in _as_list(values):
+                key = os.path.basename(str(value)) if column == "File" else str(value).strip()
+                bitmap = bitmaps.get(key)
+                if bitmap is not None:
+                    column_mask |= bitmap
+            mask &= column_mask
+        else:
+            raise ValueError(f"Unbekannte Filter-Spalte '{column}' (erlaubt: {FILTER_COLUMNS + ['RIC']})")
+    return mask
+
+def select_companies(expr):
+    """
+    Alle Unternehmen, die den Peer-Filter erfüllen (ein Eintrag pro RIC in Datei-/Sheet-Reihenfolge,
+    Name aus der Universe-Spalte wie bei der bisherigen Peer-Suche)
+    """
+    master = build_company_master()
+    mask = filter_mask(expr) & master["has_universe"].to_numpy()
+    members = master[mask].drop_duplicates("RIC")
+    return [
+        {"Name": universe, "RIC": ric, "Sub-Industry": sub_industry, "Focus": focus}
+        for universe, ric, sub_industry, focus in zip(
+            members["Universe"], members["RIC"], members["Sub-Industry"], members["Focus"])
+    ]
+
+def _file_name_index(file_path):
+    """
+    Trigramm-Index über die Holding- und Universe-Namen einer Datei (einmalig pro Datei).
+    Die Eintrags-IDs werden in Such-Priorität vergeben (Sheet-Reihenfolge, innerhalb eines
+    Sheets erst alle Holding-, dann alle Universe-Treffer), damit der kleinste Treffer gewinnt.
+
+    Returns:
+        (Einträge: Eintrags-ID → (normalisierter Name, gefalteter Name, Sheet-Nr., Zeile, "Holding"/"Universe"),
+         Trigramm → Set von Eintrags-IDs)
+    """
+    if file_path in _name_indexes:
+        return _name_indexes[file_path]
+
+    entries = []
+    trigram_index = {}
+    for sheet_idx, (_, df) in enumerate(_file_company_sheets(file_path)):
+        for col_pos, found_in in ((0, "Holding"), (1, "Universe")):
+            names = df.iloc[:, col_pos].dropna().astype(str)
+            for row_pos, value in zip(names.index, names.values):
+                normalized = normalize_company_name(value)
+                if not normalized:
+                    continue
+                entry_id = len(entries)
+                entries.append((normalized, fold_company_name(value), sheet_idx, row_pos, found_in))
+                for gram in _trigrams(normalized):
+                    trigram_index.setdefault(gram, set()).add(entry_id)
+
+    _name_indexes[file_path] = (entries, trigram_index)
+    return _name_indexes[file_path]
+
+def build_company_index():
+    """
+    Baut den Trigramm-Index über alle Holding- und Universe-Namen auf, pro Datei: nach einer
+    Änderung wird nur die geänderte Datei neu indexiert. Gesucht wird in Datei-Reihenfolge,
+    innerhalb einer Datei gewinnt die kleinste Eintrags-ID (siehe _file_name_index).
+
+    Returns:
+        Liste von (Datei, Einträge, Trigramm-Index) in Such-Reihenfolge
+    """
+    files = _company_files()
+    missing = [file_path for file_path in files if file_path not in _name_indexes]
+    indexes = [(file_path, *_file_name_index(file_path)) for file_path in files]
+
+    if missing:
+        entry_count = sum(len(_name_indexes[file_path][0]) for file_path in missing)
+        print(f"🔤 Namens-Index aufgebaut: {entry_count} Namen aus {len(missing)} Dateien")
+    return indexes
+
+def _matching_entry(entries, trigram_index, query, folded_query=None):
+    """
+    Kleinste Eintrags-ID einer Datei, deren Name den normalisierten Suchbegriff enthält (oder None).
+    Mit folded_query (Suchbegriff mit Satzzeichen) muss zusätzlich der gefaltete Name diesen
+    enthalten, damit z.B. "AT&T" nicht über "at t" in "Just Eat Takeaway" oder "L'Or" in "Clorox" landet.
+    """
+    if len(query) >= 3:
+        postings = sorted((trigram_index.get(gram) for gram in _trigrams(query)),
+                          key=lambda ids: len(ids) if ids else 0)
+        if not postings[0]:
+            return None
+        candidates = postings[0].intersection(*postings[1:])
+    else:
+        # Nach dem Normalisieren zu kurz für Trigramme (z.B. viele Satzzeichen)
+        candidates = range(len(entries))
+
+    return min((entry_id for entry_id in candidates
+                if query in entries[entry_id][0]
+                and (folded_query is None or folded_query in entries[entry_id][1])), default=None)
+
+def _company_from_row(file_path, sheet_idx, row_pos):
+    """Stammdaten einer Zeile (Holding hat beim Namen Priorität)"""
+    _, df = _company_sheets[file_path][sheet_idx]
+    row = df.iloc[row_pos]
+
+    holding_value = str(row.iloc[0]).strip()   # Spalte A (Holding)
+    universe_value = str(row.iloc[1]).strip()  # Spalte B (Universe)
+    name_value = holding_value if _valid_name(holding_value) else universe_value
+
+    company = {
+        "Name": name_value,
+        "RIC": str(row.iloc[4]).strip(),           # Spalte E
+        "Sub-Industry": str(row.iloc[2]).strip(),  # Spalte C
+        "Focus": str(row.iloc[3]).strip()          # Spalte D
+    }
+    return company, "Holding" if _valid_name(holding_value) else "Universe"
+
+def search_company_by_name(name):
+    """
+    Teilwort-Suche in Holding/Universe über den Trigramm-Index.
+
+    Returns:
+        (Unternehmens-Dict, Spalte des Namens) oder (None, None)
+    """
+    if len(name) < MIN_NAME_QUERY_LENGTH:
+        return None, None
+
+    query = normalize_company_name(name, strip=False)
+    if not query.strip():
+        return None, None
+
+    # Satzzeichen im Suchbegriff müssen auch im Namen stehen (Wortgrenzen allein sind zu unscharf)
+    folded_query = fold_company_name(name, strip=False)
+    if not _PUNCTUATION_RE.search(folded_query):
+        folded_query = None
+
+    for file_path, entries, trigram_index in build_company_index():
+        entry_id = _matching_entry(entries, trigram_index, query, folded_query)
+        if entry_id is not None:
+            _, _, sheet_idx, row_pos, _ = entries[entry_id]
+            return _company_from_row(file_path, sheet_idx, row_pos)
+    return None, None
@@ -1,6 +1,13 @@
 import os
+import json
+import hashlib
 import pandas as pd
-from excel_kennzahlen import fetch_excel_kennzahlen_by_ric, fetch_excel_kennzahlen_by_ric_filtered, fetch_excel_kennzahlen_batch, clear_excel_cache
+import excel_disk_cache
+from excel_kennzahlen import fetch_excel_kennzahlen_batch, clear_excel_cache, get_sector_excel_files, get_data_stamps, refresh_excel_data
+from excel_watcher import start_data_watcher
+from company_index import search_company_by_name, find_company_record_by_ric, select_companies, MIN_NAME_QUERY_LENGTH
+from data_catalog import sector_for_ric, get_ric_sectors
+from group_statistics import get_group_statistics
 from refinitiv_integration import get_refinitiv_kennzahlen_for_companies, get_all_sector_averages
 import glob
 from openpyxl import load_workbook
@@ -9,6 +16,7 @@ from openpyxl.formatting.rule import ColorScaleRule
 from openpyxl.utils.dataframe import dataframe_to_rows
 import time
 import warnings
+from concurrent.futures import ThreadPoolExecutor
 
 # KORRIGIERT: Unterdrücke openpyxl Warnungen über Datums-Formatierung
 warnings.filterwarnings("ignore", category=UserWarning, module="openpyxl")
@@ -16,15 +24,29 @@ warnings.filterwarnings("ignore", category=UserWarning, module="openpyxl")
 DATA_DIR = "excel_data/data"
 
 # 🚀 PERFORMANCE-OPTIMIERUNG: Globale Caches zur Vermeidung doppelter Abfragen
-_COMPANY_CACHE = {}  # Cache für Sub-Industry/Focus-Gruppen
-_EXCEL_KENNZAHLEN_CACHE = {}  # Cache für bereits abgerufene Excel-Kennzahlen
+_COMPANY_CACHE = {}  # Peer-Filter (JSON) → Peer-Gruppe (persistiert, siehe _load_company_cache)
 _SESSION_PROCESSED_GROUPS = set()  # Verhindert doppelte Verarbeitung derselben Gruppen
 
+# Anzahl paralleler Refinitiv-Requests im Abruf-Plan (Peer-Gruppen werden auf so viele
+# Batches verteilt, 1 = ein Batch für alle RICs, 0 = alle Kerne)
+# (überschreibbar über die Umgebungsvariable PEER_GROUP_WORKERS)
+PEER_GROUP_WORKERS = int(os.environ.get("PEER_GROUP_WORKERS", "1"))
+
+# Datenverzeichnis während der Verarbeitung überwachen (für lange laufende Prozesse)
+# (überschreibbar über die Umgebungsvariable EXCEL_WATCH_DATA=1)
+WATCH_DATA_DIR = os.environ.get("EXCEL_WATCH_DATA", "0") == "1"
+
+# Peer-Gruppen (_COMPANY_CACHE) werden neben dem Disk-Cache gespeichert und gelten, solange
+# sich keine Daten-Datei ändert (Fingerprint aus Name, Größe und mtime aller Dateien)
+COMPANY_CACHE_FILE = "company_cache.json"
+COMPANY_CACHE_FORMAT_VERSION = 2
+_COMPANY_CACHE_FINGERPRINT = None  # Datenstand, zu dem _COMPANY_CACHE gehört
+
 def clear_all_caches():
-    """Leert alle Performance-Caches zu Beginn einer neuen Session"""
-    global _COMPANY_CACHE, _EXCEL_KENNZAHLEN_CACHE, _SESSION_PROCESSED_GROUPS
+    """Leert alle Performance-Caches zu Beginn einer neuen Session (gespeicherte Peer-Gruppen bleiben)"""
+    global _COMPANY_CACHE, _SESSION_PROCESSED_GROUPS, _COMPANY_CACHE_FINGERPRINT
     _COMPANY_CACHE.clear()
-    _EXCEL_KENNZAHLEN_CACHE.clear()
+    _COMPANY_CACHE_FINGERPRINT = None
     _SESSION_PROCESSED_GROUPS.clear()
     print("🧹 Performance-Caches geleert")
 
@@ -57,439 +79,412 @@ def cleanup_temp_files():
     if deleted_count > 0:
         print(f"✅ {deleted_count} temporäre Dateien bereinigt")
 
-def process_companies():
-    """Hauptfunktion zur Verarbeitung der Unternehmen"""
-    start_time = time.time()
-    print("🚀 STARTE OPTIMIERTE VERARBEITUNG...")
-
-    try:
-        # 🚀 PERFORMANCE-OPTIMIERUNG: Leere Caches zu Beginn jeder Session
-        clear_all_caches()
+def parse_input(df_input):
+    """
+    Stufe 1: Liest Kennzahlen, Filter-Einstellungen und Input-Unternehmen aus input_user.xlsx
 
-        # 1. Lese input_user.xlsx (SCHNELL)
-        print("📖 Lese input_user.xlsx...")
-        df_input = pd.read_excel("excel_data/input_user.xlsx")
+    Returns:
+        (excel_fields, refinitiv_fields, is_focus, filter_type, input_companies)
+    """
+    # Kennzahlen aus der ersten Zeile
+    first_row = df_input.iloc[0]
+    excel_fields = list(dict.fromkeys(df_input["Kennzahlen aus Excel"].dropna().astype(str).str.strip().tolist()))
+    refinitiv_fields = list(dict.fromkeys(df_input["Kennzahlen aus Refinitiv"].dropna().astype(str).str.strip().tolist()))
+
+    # Filter-Einstellungen
+    sub_industry_filter = str(first_row.get("Sub-Industry", "")).strip().upper()
+    focus_filter = str(first_row.get("Focus", "")).strip().upper()
+
+    if focus_filter == "X":
+        is_focus = True
+        filter_type = "Focus"
+    elif sub_industry_filter == "X":
+        is_focus = False
+        filter_type = "Sub-Industry"
+    else:
+        is_focus = False
+        filter_type = "Sub-Industry (Default)"
 
-        # Kennzahlen aus der ersten Zeile
-        first_row = df_input.iloc[0]
-        excel_fields = list(dict.fromkeys(df_input["Kennzahlen aus Excel"].dropna().astype(str).str.strip().tolist()))
-        refinitiv_fields = list(dict.fromkeys(df_input["Kennzahlen aus Refinitiv"].dropna().astype(str).str.strip().tolist()))
-
-        # Filter-Einstellungen
-        sub_industry_filter = str(first_row.get("Sub-Industry", "")).strip().upper()
-        focus_filter = str(first_row.get("Focus", "")).strip().upper()
-
-        if focus_filter == "X":
-            is_focus = True
-            filter_type = "Focus"
-        elif sub_industry_filter == "X":
-            is_focus = False
-            filter_type = "Sub-Industry"
-        else:
-            is_focus = False
-            filter_type = "Sub-Industry (Default)"
+    print(f"🎯 Filter: {filter_type}")
+    print(f"📋 Excel-Kennzahlen: {len(excel_fields)}")
+    print(f"📊 Refinitiv-Kennzahlen: {len(refinitiv_fields)}")
 
-        print(f"🎯 Filter: {filter_type}")
-        print(f"📋 Excel-Kennzahlen: {len(excel_fields)}")
-        print(f"📊 Refinitiv-Kennzahlen: {len(refinitiv_fields)}")
+    # 2. SAMMLE ALLE INPUT-UNTERNEHMEN (SCHNELL)
+    input_companies = []
+    all_gics_sectors = set()
 
-        # 2. SAMMLE ALLE INPUT-UNTERNEHMEN (SCHNELL)
-        input_companies = []
-        all_gics_sectors = set()
+    for index, row in df_input.iterrows():
+        input_name = str(row.iloc[0] if len(row) > 0 else "").strip()
+        input_ric = str(row.iloc[1] if len(row) > 1 else "").strip()
 
-        for index, row in df_input.iterrows():
-            input_name = str(row.iloc[0] if len(row) > 0 else "").strip()
-            input_ric = str(row.iloc[1] if len(row) > 1 else "").strip()
+        gics_sector = ""
+        if "GICS Sector" in df_input.columns:
+            gics_sector = str(row.get("GICS Sector", "")).strip()
 
-            gics_sector = ""
-            if "GICS Sector" in df_input.columns:
-                gics_sector = str(row.get("GICS Sector", "")).strip()
+        # Überspringe leere Zeilen
+        if not input_name and not input_ric:
+            continue
+        if input_name.lower() in ["", "nan", "none"] and input_ric.lower() in ["", "nan", "none"]:
+            continue
 
-            # Überspringe leere Zeilen
-            if not input_name and not input_ric:
-                continue
-            if input_name.lower() in ["", "nan", "none"] and input_ric.lower() in ["", "nan", "none"]:
-                continue
+        if gics_sector and gics_sector.lower() not in ["", "nan", "none"]:
+            all_gics_sectors.add(gics_sector)
 
-            if gics_sector and gics_sector.lower() not in ["", "nan", "none"]:
-                all_gics_sectors.add(gics_sector)
+        input_companies.append({
+            'name': input_name if input_name.lower() not in ["", "nan", "none"] else None,
+            'ric': input_ric if input_ric.lower() not in ["", "nan", "none"] else None,
+            'gics_sector': gics_sector if gics_sector.lower() not in ["", "nan", "none"] else None,
+            'row_number': index + 1
+        })
 
-            input_companies.append({
-                'name': input_name if input_name.lower() not in ["", "nan", "none"] else None,
-                'ric': input_ric if input_ric.lower() not in ["", "nan", "none"] else None,
-                'gics_sector': gics_sector if gics_sector.lower() not in ["", "nan", "none"] else None,
-                'row_number': index + 1
-            })
+    print(f"📋 {len(input_companies)} Input-Unternehmen")
+    print(f"🏭 GICS Sektoren: {sorted(all_gics_sectors)}")
 
-        print(f"📋 {len(input_companies)} Input-Unternehmen")
-        print(f"🏭 GICS Sektoren: {sorted(all_gics_sectors)}")
+    return excel_fields, refinitiv_fields, is_focus, filter_type, input_companies
 
-        # 3. OPTIMIERTE PEER-GROUP-VERARBEITUNG
-        all_results = []
-        processed_groups = set()
-
-        for i, input_company in enumerate(input_companies, 1):
-            print(f"\n🔍 {i}/{len(input_companies)}: Zeile {input_company['row_number']}")
-
-            # Bestimme Suchstrategie
-            start_company = None
-            if input_company['ric']:
-                print(f"   🎯 RIC: {input_company['ric']}")
-                start_company = find_company_by_ric(input_company['ric'])
-            elif input_company['name']:
-                if len(input_company['name']) >= 4:
-                    print(f"   🎯 Name: {input_company['name']}")
-                    start_company = find_company_by_name(input_company['name'])
-                else:
-                    print(f"   ❌ Name zu kurz: {input_company['name']}")
-                    continue
+def resolve_peer_group_jobs(df_input, input_companies, is_focus, filter_type):
+    """
+    Stufe 2+3: Löst die Startunternehmen auf und bestimmt ihre Peer-Gruppen (in Input-Reihenfolge,
+    jede Gruppe nur einmal). Liefert die Jobs einzeln (Generator).
+    """
+    processed_groups = set()
+
+    for i, input_company in enumerate(input_companies, 1):
+        print(f"\n🔍 {i}/{len(input_companies)}: Zeile {input_company['row_number']}")
+
+        # Bestimme Suchstrategie
+        start_company = None
+        if input_company['ric']:
+            print(f"   🎯 RIC: {input_company['ric']}")
+            start_company = find_company_by_ric(input_company['ric'])
+        elif input_company['name']:
+            if len(input_company['name']) >= 4:
+                print(f"   🎯 Name: {input_company['name']}")
+                start_company = find_company_by_name(input_company['name'])
             else:
-                print("   ❌ Weder RIC noch Name")
+                print(f"   ❌ Name zu kurz: {input_company['name']}")
                 continue
+        else:
+            print("   ❌ Weder RIC noch Name")
+            continue
 
-            if not start_company:
-                print(f"   ❌ Nicht gefunden!")
-                continue
+        if not start_company:
+            print(f"   ❌ Nicht gefunden!")
+            continue
 
-            print(f"   ✅ {start_company['Name']} ({start_company['RIC']})")
+        print(f"   ✅ {start_company['Name']} ({start_company['RIC']})")
 
-            # KORRIGIERT: Bestimme Filter-Typ für JEDE ZEILE INDIVIDUELL
-            current_row = df_input.iloc[input_company['row_number'] - 1]  # -1 wegen 0-basiertem Index
+        # KORRIGIERT: Bestimme Filter-Typ für JEDE ZEILE INDIVIDUELL
+        current_row = df_input.iloc[input_company['row_number'] - 1]  # -1 wegen 0-basiertem Index
 
-            row_sub_industry_filter = str(current_row.get("Sub-Industry", "")).strip().upper()
-            row_focus_filter = str(current_row.get("Focus", "")).strip().upper()
+        row_sub_industry_filter = str(current_row.get("Sub-Industry", "")).strip().upper()
+        row_focus_filter = str(current_row.get("Focus", "")).strip().upper()
 
-            # Entscheide für diese spezifische Zeile
-            if row_focus_filter == "X":
-                use_focus_for_this_row = True
-                current_filter_type = "Focus"
-            elif row_sub_industry_filter == "X":
-                use_focus_for_this_row = False
-                current_filter_type = "Sub-Industry"
-            else:
-                # Fallback: Verwende den globalen Filter
-                use_focus_for_this_row = is_focus
-                current_filter_type = filter_type
+        # Entscheide für diese spezifische Zeile
+        if row_focus_filter == "X":
+            use_focus_for_this_row = True
+            current_filter_type = "Focus"
+        elif row_sub_industry_filter == "X":
+            use_focus_for_this_row = False
+            current_filter_type = "Sub-Industry"
+        else:
+            # Fallback: Verwende den globalen Filter
+            use_focus_for_this_row = is_focus
+            current_filter_type = filter_type
 
-            print(f"   🎯 Filter für diese Zeile: {current_filter_type}")
+        print(f"   🎯 Filter für diese Zeile: {current_filter_type}")
 
-            # KORRIGIERT: Erstelle eindeutigen Gruppenschlüssel der Kollisionen verhindert
-            if use_focus_for_this_row:
-                group_key = f"Focus_{start_company.get('Focus', 'Unknown')}"
-                peer_group_type = "Focus"
-            else:
-                group_key = f"SubIndustry_{start_company.get('Sub-Industry', 'Unknown')}"
-                peer_group_type = "Sub-Industry"
+        # KORRIGIERT: Erstelle eindeutigen Gruppenschlüssel der Kollisionen verhindert
+        if use_focus_for_this_row:
+            group_key = f"Focus_{start_company.get('Focus', 'Unknown')}"
+            peer_group_type = "Focus"
+        else:
+            group_key = f"SubIndustry_{start_company.get('Sub-Industry', 'Unknown')}"
+            peer_group_type = "Sub-Industry"
 
-            # WICHTIG: Überspringe nur wenn die GLEICHE Gruppe bereits verarbeitet wurde
-            # Aber erlaube verschiedene Gruppen-Typen
-            if group_key in processed_groups:
-                print(f"   ⏭️  Peer-Gruppe '{group_key}' bereits verarbeitet - überspringe")
-                continue
+        # WICHTIG: Überspringe nur wenn die GLEICHE Gruppe bereits verarbeitet wurde
+        # Aber erlaube verschiedene Gruppen-Typen
+        if group_key in processed_groups:
+            print(f"   ⏭️  Peer-Gruppe '{group_key}' bereits verarbeitet - überspringe")
+            continue
 
-            print(f"   🆕 Neue Peer-Gruppe wird verarbeitet: {group_key}")
-            processed_groups.add(group_key)
-
-            # 4. FINDE PEER-GRUPPE (KORRIGIERT)
-            print(f"   🔍 Suche {peer_group_type}-Peer-Gruppe...")
-
-            peer_companies = []
-            if use_focus_for_this_row and start_company.get('Focus'):
-                focus_value = start_company['Focus']
-                print(f"     🎯 Focus-Suche: '{focus_value}'")
-                peer_companies = find_companies_by_focus(focus_value)
-            elif start_company.get('Sub-Industry'):
-                sub_industry_value = start_company['Sub-Industry']
-                print(f"     🏭 Sub-Industry-Suche: '{sub_industry_value}'")
-                peer_companies = find_companies_by_sub_industry(sub_industry_value)
-
-            if not peer_companies:
-                print(f"     ⚠️ Keine Peer-Gruppe gefunden, verarbeite nur das Unternehmen")
-                peer_companies = [start_company]
-
-            print(f"     ✅ {peer_group_type}-Peer-Gruppe: {len(peer_companies)} Unternehmen")
-
-            # 5. VERARBEITE PEER-GRUPPE MIT BATCH-OPTIMIERUNG
-            peer_results = []
-
-            # OPTIMIERUNG: Sammle alle RICs für Batch-Verarbeitung
-            all_rics_in_group = [company['RIC'] for company in peer_companies]
-
-            # OPTIMIERUNG: Hole alle Excel-Kennzahlen in einem Batch (NEU!)
-            all_excel_data = {}
-            if excel_fields and all_rics_in_group:
-                print(f"     📊 Hole Excel-Kennzahlen für {len(all_rics_in_group)} Unternehmen in einem Batch...")
-                # Verwende GICS Sector-Filter falls verfügbar
-                gics_filter = [input_company['gics_sector']] if input_company.get('gics_sector') else None
-                all_excel_data = fetch_excel_kennzahlen_batch(all_rics_in_group, excel_fields, gics_filter)
-
-            # OPTIMIERUNG: Hole alle Refinitiv-Daten in einem einzigen API-Call
-            all_refinitiv_data = {}
-            if refinitiv_fields and all_rics_in_group:
-                print(f"     📊 Hole Refinitiv-Daten für {len(all_rics_in_group)} Unternehmen in einem Batch...")
-                company_list_batch = [{'RIC': ric} for ric in all_rics_in_group]
-                all_refinitiv_data = get_refinitiv_kennzahlen_for_companies(company_list_batch, refinitiv_fields)
-
-            for j, company in enumerate(peer_companies, 1):
-                print(f"     🏢 {j}/{len(peer_companies)}: {company['Name']}")
-
-                # Excel-Kennzahlen (OPTIMIERT: Verwende Batch-Daten)
-                excel_data = all_excel_data.get(company['RIC'], {})
-
-                # Refinitiv-Kennzahlen (OPTIMIERT: Verwende Batch-Daten)
-                refinitiv_data = all_refinitiv_data.get(company['RIC'], {})
-
-                # Bestimme GICS Sektor für das Unternehmen
-                gics_sector = determine_gics_sector(company['RIC'])
-
-                # Kombiniere Ergebnisse
-                result_row = {
-                    'Name': company['Name'],
-                    'RIC': company['RIC'],
-                    'GICS Sector': gics_sector,  # GICS Sektor hinzufügen
-                    'Sub-Industry': company.get('Sub-Industry', ''),
-                    'Focus': company.get('Focus', ''),
-                    'Peer_Group_Type': peer_group_type,  # Neu: Kennzeichnung der Gruppe
-                    'Input_Row': f"Zeile {input_company['row_number']}" if peer_group_type in ['Focus', 'Sub-Industry'] else '',  # Zeigt Input-Zeile
-                }
+        print(f"   🆕 Neue Peer-Gruppe wird verarbeitet: {group_key}")
+        processed_groups.add(group_key)
 
-                # Füge Excel-Kennzahlen hinzu
-                for field in excel_fields:
-                    result_row[field] = excel_data.get(field, '')
+        # 4. FINDE PEER-GRUPPE (KORRIGIERT)
+        print(f"   🔍 Suche {peer_group_type}-Peer-Gruppe...")
 
-                # Füge Refinitiv-Kennzahlen hinzu
-                for field in refinitiv_fields:
-                    clean_field = clean_refinitiv_field_name(field)
-                    # KORRIGIERT: Verwende den ursprünglichen Feldnamen für den Lookup
-                    original_field_value = refinitiv_data.get(field, '')
-                    clean_field_value = refinitiv_data.get(clean_field, '')
-                    # Nimm den Wert, der nicht leer ist
-                    final_value = original_field_value if original_field_value else clean_field_value
-                    result_row[clean_field] = final_value
+        peer_companies = []
+        if use_focus_for_this_row and start_company.get('Focus'):
+            focus_value = start_company['Focus']
+            print(f"     🎯 Focus-Suche: '{focus_value}'")
+            peer_companies = find_peer_companies_cached({"Focus": focus_value})
+        elif start_company.get('Sub-Industry'):
+            sub_industry_value = start_company['Sub-Industry']
+            print(f"     🏭 Sub-Industry-Suche: '{sub_industry_value}'")
+            peer_companies = find_peer_companies_cached({"Sub-Industry": sub_industry_value})
 
-                peer_results.append(result_row)
-                print(f"       ✅ {len(excel_data)} Excel + {len(refinitiv_data)} Refinitiv")
+        if not peer_companies:
+            print(f"     ⚠️ Keine Peer-Gruppe gefunden, verarbeite nur das Unternehmen")
+            peer_companies = [start_company]
 
-            # Füge alle Peer-Ergebnisse zur Gesamt-Liste hinzu
-            all_results.extend(peer_results)
-            print(f"   📊 {peer_group_type}-Peer-Gruppe verarbeitet: {len(peer_results)} Unternehmen hinzugefügt")
+        print(f"     ✅ {peer_group_type}-Peer-Gruppe: {len(peer_companies)} Unternehmen")
 
-        # 6. Speichere Output mit schönem Design
-        if all_results:
-            output_path = "excel_data/output.xlsx"
-            df_output = pd.DataFrame(all_results)
-
-            print(f"\n📊 INSGESAMT {len(all_results)} UNTERNEHMEN VERARBEITET")
-            print("💾 Speichere in output.xlsx...")
-
-            # KORRIGIERT: Stelle sicher, dass Output-Verzeichnis existiert
-            output_dir = os.path.dirname(output_path)
-            if not os.path.exists(output_dir):
-                print(f"📁 Erstelle fehlendes Verzeichnis: {output_dir}")
-                os.makedirs(output_dir, exist_ok=True)
-
-            # 🔢 BERECHNE DURCHSCHNITTE FÜR EXCEL-KENNZAHLEN
-            print("\n🔢 BERECHNE DURCHSCHNITTE FÜR EXCEL-KENNZAHLEN...")
-            df_output_with_averages = calculate_excel_averages(df_output, excel_fields)
-
-            # 🔢 BERECHNE REFINITIV-DURCHSCHNITTE NACH SEKTOR
-            print("\n🔢 BERECHNE REFINITIV-DURCHSCHNITTE NACH SEKTOR...")
-            if refinitiv_fields:
-                df_output_with_averages = calculate_refinitiv_averages_by_sector(df_output_with_averages, refinitiv_fields)
-
-            # KORRIGIERT: Filtere Output-DataFrame, um nur angeforderte Kennzahlen zu behalten (WIE IN DER FUNKTIONIERENDEN VERSION)
-            print(f"\n🔍 FILTERE OUTPUT AUF NUR ANGEFORDERTE KENNZAHLEN...")
-
-            # Basis-Spalten die immer beibehalten werden (WIE IN DER FUNKTIONIERENDEN VERSION)
-            base_columns = ['Name', 'RIC', 'GICS Sector', 'Sub-Industry', 'Focus', 'Peer_Group_Type', 'Input_Row']
-
-            # Sammle alle erlaubten Spalten
-            allowed_columns = base_columns.copy()
-            allowed_columns.extend(excel_fields)  # Angeforderte Excel-Kennzahlen
-
-            # Füge Refinitiv-Kennzahlen hinzu (mit und ohne TR. Präfix)
-            for ref_field in refinitiv_fields:
-                allowed_columns.append(ref_field)  # Original (z.B. TR.EBIT)
-                clean_field = clean_refinitiv_field_name(ref_field)
-                allowed_columns.append(clean_field)  # Ohne TR. (z.B. EBIT)
-
-            # Filtere DataFrame auf nur erlaubte Spalten
-            existing_allowed_columns = [col for col in allowed_columns if col in df_output_with_averages.columns]
-            df_output_cleaned = df_output_with_averages[existing_allowed_columns].copy()
-
-            # KORRIGIERT: Entferne leere Spalten (Spalten mit leerem Namen oder nur leeren Werten)
-            columns_to_keep = []
-            for col in df_output_cleaned.columns:
-                # Überspringe Spalten mit leerem Namen
-                if col == '' or str(col).strip() == '':
-                    continue
-                # Überspringe Spalten die nur leere Werte enthalten
-                if df_output_cleaned[col].isna().all() or (df_output_cleaned[col].astype(str).str.strip() == '').all():
-                    continue
-                columns_to_keep.append(col)
-
-            # Filtere DataFrame auf nur sinnvolle Spalten
-            df_output_cleaned = df_output_cleaned[columns_to_keep].copy()
-
-            print(f"   📊 Ursprüngliche Spalten: {len(df_output_with_averages.columns)}")
-            print(f"   ✅ Gefilterte Spalten: {len(df_output_cleaned.columns)}")
-            print(f"   🧹 Leere Spalten entfernt: {len(existing_allowed_columns) - len(columns_to_keep)}")
-            print(f"   📋 Behaltene Spalten: {list(df_output_cleaned.columns)}")
-
-            # Erstelle schön formatierte Excel-Datei (WIE IN DER FUNKTIONIERENDEN VERSION)
-            create_beautiful_excel_output(df_output_cleaned, output_path, excel_fields, len(all_results))
-
-            print(f"\n✅ SCHÖN FORMATIERTES OUTPUT GESPEICHERT: {output_path}")
-            print(f"📊 {len(all_results)} Unternehmen + {len(df_output_cleaned) - len(all_results)} Durchschnittswerte = {len(df_output_cleaned)} Zeilen insgesamt mit {len(df_output_cleaned.columns)} Spalten")
-
-            # Zeige Übersicht (WIE IN DER FUNKTIONIERENDEN VERSION)
-            print(f"\n📋 ERGEBNIS-ÜBERSICHT:")
-            for i, result in enumerate(all_results, 1):
-                print(f"\n{i}. {result['Name']} ({result['RIC']}) - {result.get('Input_Row', '')}")
-                print(f"   GICS Sector: {result.get('GICS Sector', 'N/A')}")
-                print(f"   Sub-Industry: {result.get('Sub-Industry', 'N/A')}")
-                print(f"   Focus: {result.get('Focus', 'N/A')}")
-
-                # Zeige alle Excel-Kennzahlen
-                for field in excel_fields:
-                    value = result.get(field, 'N/A')
-                    if value != 'N/A' and pd.notna(value):
-                        print(f"   [Excel] {field}: {value}")
+        yield {
+            'input_company': input_company,
+            'peer_group_type': peer_group_type,
+            'peer_companies': peer_companies,
+        }
+
+def render_output(all_results, excel_fields, refinitiv_fields, start_time):
+    """Stufe 7: Durchschnitte berechnen, Output filtern, formatiert speichern und Übersicht ausgeben"""
+    if all_results:
+        output_path = "excel_data/output.xlsx"
+        df_output = pd.DataFrame(all_results)
+
+        print(f"\n📊 INSGESAMT {len(all_results)} UNTERNEHMEN VERARBEITET")
+        print("💾 Speichere in output.xlsx...")
+
+        # KORRIGIERT: Stelle sicher, dass Output-Verzeichnis existiert
+        output_dir = os.path.dirname(output_path)
+        if not os.path.exists(output_dir):
+            print(f"📁 Erstelle fehlendes Verzeichnis: {output_dir}")
+            os.makedirs(output_dir, exist_ok=True)
+
+        # 🔢 BERECHNE DURCHSCHNITTE FÜR EXCEL-KENNZAHLEN
+        print("\n🔢 BERECHNE DURCHSCHNITTE FÜR EXCEL-KENNZAHLEN...")
+        df_output_with_averages = calculate_excel_averages(df_output, excel_fields)
+
+        # 🔢 BERECHNE REFINITIV-DURCHSCHNITTE NACH SEKTOR
+        print("\n🔢 BERECHNE REFINITIV-DURCHSCHNITTE NACH SEKTOR...")
+        if refinitiv_fields:
+            df_output_with_averages = calculate_refinitiv_averages_by_sector(df_output_with_averages, refinitiv_fields)
+
+        # KORRIGIERT: Filtere Output-DataFrame, um nur angeforderte Kennzahlen zu behalten (WIE IN DER FUNKTIONIERENDEN VERSION)
+        print(f"\n🔍 FILTERE OUTPUT AUF NUR ANGEFORDERTE KENNZAHLEN...")
+
+        # Basis-Spalten die immer beibehalten werden (WIE IN DER FUNKTIONIERENDEN VERSION)
+        base_columns = ['Name', 'RIC', 'GICS Sector', 'Sub-Industry', 'Focus', 'Peer_Group_Type', 'Input_Row']
+
+        # Sammle alle erlaubten Spalten
+        allowed_columns = base_columns.copy()
+        allowed_columns.extend(excel_fields)  # Angeforderte Excel-Kennzahlen
+
+        # Füge Refinitiv-Kennzahlen hinzu (mit und ohne TR. Präfix)
+        for ref_field in refinitiv_fields:
+            allowed_columns.append(ref_field)  # Original (z.B. TR.EBIT)
+            clean_field = clean_refinitiv_field_name(ref_field)
+            allowed_columns.append(clean_field)  # Ohne TR. (z.B. EBIT)
+
+        # Filtere DataFrame auf nur erlaubte Spalten
+        existing_allowed_columns = [col for col in allowed_columns if col in df_output_with_averages.columns]
+        df_output_cleaned = df_output_with_averages[existing_allowed_columns].copy()
+
+        # KORRIGIERT: Entferne leere Spalten (Spalten mit leerem Namen oder nur leeren Werten)
+        columns_to_keep = []
+        for col in df_output_cleaned.columns:
+            # Überspringe Spalten mit leerem Namen
+            if col == '' or str(col).strip() == '':
+                continue
+            # Überspringe Spalten die nur leere Werte enthalten
+            if df_output_cleaned[col].isna().all() or (df_output_cleaned[col].astype(str).str.strip() == '').all():
+                continue
+            columns_to_keep.append(col)
+
+        # Filtere DataFrame auf nur sinnvolle Spalten
+        df_output_cleaned = df_output_cleaned[columns_to_keep].copy()
+
+        print(f"   📊 Ursprüngliche Spalten: {len(df_output_with_averages.columns)}")
+        print(f"   ✅ Gefilterte Spalten: {len(df_output_cleaned.columns)}")
+        print(f"   🧹 Leere Spalten entfernt: {len(existing_allowed_columns) - len(columns_to_keep)}")
+        print(f"   📋 Behaltene Spalten: {list(df_output_cleaned.columns)}")
+
+        # Erstelle schön formatierte Excel-Datei (WIE IN DER FUNKTIONIERENDEN VERSION)
+        create_beautiful_excel_output(df_output_cleaned, output_path, excel_fields, len(all_results))
+
+        print(f"\n✅ SCHÖN FORMATIERTES OUTPUT GESPEICHERT: {output_path}")
+        print(f"📊 {len(all_results)} Unternehmen + {len(df_output_cleaned) - len(all_results)} Durchschnittswerte = {len(df_output_cleaned)} Zeilen insgesamt mit {len(df_output_cleaned.columns)} Spalten")
+
+        # Zeige Übersicht (WIE IN DER FUNKTIONIERENDEN VERSION)
+        print(f"\n📋 ERGEBNIS-ÜBERSICHT:")
+        for i, result in enumerate(all_results, 1):
+            print(f"\n{i}. {result['Name']} ({result['RIC']}) - {result.get('Input_Row', '')}")
+            print(f"   GICS Sector: {result.get('GICS Sector', 'N/A')}")
+            print(f"   Sub-Industry: {result.get('Sub-Industry', 'N/A')}")
+            print(f"   Focus: {result.get('Focus', 'N/A')}")
+
+            # Zeige alle Excel-Kennzahlen
+            for field in excel_fields:
+                value = result.get(field, 'N/A')
+                if value != 'N/A' and pd.notna(value):
+                    print(f"   [Excel] {field}: {value}")
+                else:
+                    print(f"   [Excel] {field}: ❌ Nicht gefunden")
+
+            # Sammle alle Refinitiv-relevanten Spalten aus dem tatsächlichen DataFrame
+            actual_refinitiv_columns = []
+
+            # 1. Alle ursprünglich angeforderten Refinitiv-Felder
+            for field in refinitiv_fields:
+                actual_refinitiv_columns.append(field)
+
+            # 2. Alle Spalten im result, die wie Refinitiv-Felder aussehen
+            for key in result.keys():
+                # Überspringt Basis-Spalten und Excel-Kennzahlen
+                if key not in ['Name', 'RIC', 'GICS Sector', 'Sub-Industry', 'Focus', 'Peer_Group_Type', 'Input_Row'] and key not in excel_fields:
+                    # Prüft, ob es ein potentielles Refinitiv-Feld ist
+                    if (key.startswith('TR.') or
+                        any(key.upper() == ref_field.replace('TR.', '').upper() for ref_field in refinitiv_fields)):
+                        if key not in actual_refinitiv_columns:
+                            actual_refinitiv_columns.append(key)
+
+            # Entferne Duplikate und behalte Reihenfolge
+            actual_refinitiv_columns = list(dict.fromkeys(actual_refinitiv_columns))
+
+            # Zeige alle gefundenen Refinitiv-Kennzahlen
+            for field in actual_refinitiv_columns:
+                # Suche nach der Spalte im Result
+                found_value = None
+                found_key = None
+
+                # Direkte Suche nach dem Feld
+                if field in result:
+                    found_value = result[field]
+                    found_key = field
+                else:
+                    # Erweiterte Suche für ursprünglich angeforderten Felder
+                    cleaned_field = field.replace("TR.", "") if field.startswith("TR.") else field
+                    if cleaned_field in result:
+                        found_value = result[cleaned_field]
+                        found_key = cleaned_field
                     else:
-                        print(f"   [Excel] {field}: ❌ Nicht gefunden")
-
-                # Sammle alle Refinitiv-relevanten Spalten aus dem tatsächlichen DataFrame
-                actual_refinitiv_columns = []
-
-                # 1. Alle ursprünglich angeforderten Refinitiv-Felder
-                for field in refinitiv_fields:
-                    actual_refinitiv_columns.append(field)
-
-                # 2. Alle Spalten im result, die wie Refinitiv-Felder aussehen
-                for key in result.keys():
-                    # Überspringt Basis-Spalten und Excel-Kennzahlen
-                    if key not in ['Name', 'RIC', 'GICS Sector', 'Sub-Industry', 'Focus', 'Peer_Group_Type', 'Input_Row'] and key not in excel_fields:
-                        # Prüft, ob es ein potentielles Refinitiv-Feld ist
-                        if (key.startswith('TR.') or
-                            any(key.upper() == ref_field.replace('TR.', '').upper() for ref_field in refinitiv_fields)):
-                            if key not in actual_refinitiv_columns:
-                                actual_refinitiv_columns.append(key)
-
-                # Entferne Duplikate und behalte Reihenfolge
-                actual_refinitiv_columns = list(dict.fromkeys(actual_refinitiv_columns))
-
-                # Zeige alle gefundenen Refinitiv-Kennzahlen
-                for field in actual_refinitiv_columns:
-                    # Suche nach der Spalte im Result
-                    found_value = None
-                    found_key = None
-
-                    # Direkte Suche nach dem Feld
-                    if field in result:
-                        found_value = result[field]
-                        found_key = field
+                        # Fuzzy-Suche nach ähnlichen Feldern
+                        for key, value in result.items():
+                            if (field.lower() in key.lower() or
+                                cleaned_field.lower() in key.lower() or
+                                key.lower() in field.lower()):
+                                found_value = value
+                                found_key = key
+                                break
+
+                if found_value is not None and pd.notna(found_value) and str(found_value).strip() != '':
+                    # Bestimme Label für Ausgabe
+                    if field in refinitiv_fields:
+                        display_label = f"[Refinitiv] {field}"
                     else:
-                        # Erweiterte Suche für ursprünglich angeforderten Felder
-                        cleaned_field = field.replace("TR.", "") if field.startswith("TR.") else field
-                        if cleaned_field in result:
-                            found_value = result[cleaned_field]
-                            found_key = cleaned_field
-                        else:
-                            # Fuzzy-Suche nach ähnlichen Feldern
-                            for key, value in result.items():
-                                if (field.lower() in key.lower() or
-                                    cleaned_field.lower() in key.lower() or
-                                    key.lower() in field.lower()):
-                                    found_value = value
-                                    found_key = key
-                                    break
-
-                    if found_value is not None and pd.notna(found_value) and str(found_value).strip() != '':
-                        # Bestimme Label für Ausgabe
-                        if field in refinitiv_fields:
-                            display_label = f"[Refinitiv] {field}"
-                        else:
-                            display_label = f"[Refinitiv*] {field}"  # * für neu erstellte Spalten
+                        display_label = f"[Refinitiv*] {field}"  # * für neu erstellte Spalten
 
-                        if found_key != field:
-                            print(f"   {display_label} (als '{found_key}'): {found_value}")
-                        else:
-                            print(f"   {display_label}: {found_value}")
+                    if found_key != field:
+                        print(f"   {display_label} (als '{found_key}'): {found_value}")
                     else:
-                        print(f"   [Refinitiv] {field}: ❌ Nicht gefunden")
-
-            # Zeige GICS-Sektor-Durchschnitte für Refinitiv-Kennzahlen (VEREINFACHT)
-            if refinitiv_fields:
-                # Sammle alle Sektor-Durchschnitte aus dem DataFrame
-                sector_avg_rows = df_output_cleaned[df_output_cleaned['Name'].str.contains('🏭 Ø', na=False)]
-
-                if not sector_avg_rows.empty:
-                    print(f"\n🏭 GICS-SEKTOR-DURCHSCHNITTE (REFINITIV):")
-                    for _, sector_row in sector_avg_rows.iterrows():
-                        sector_name = sector_row['Name'].replace('🏭 Ø ', '')
-                        print(f"\n📊 {sector_name}:")
-
-                        # Sammle nur verfügbare Kennzahlen für diesen Sektor
-                        available_values = []
-
-                        for field in refinitiv_fields:
-                            clean_field = clean_refinitiv_field_name(field)
-
-                            # VEREINFACHTE SUCHE: Prüfe direkt die wahrscheinlichsten Spaltennamen
-                            value = None
-                            possible_keys = [clean_field, field, field.replace('TR.', '')]
-
-                            for possible_key in possible_keys:
-                                if possible_key in sector_row.index:
-                                    potential_value = sector_row[possible_key]
-                                    if pd.notna(potential_value) and str(potential_value).strip() != '':
-                                        try:
-                                            # Versuche als numerischen Wert zu behandeln
-                                            value = float(potential_value)
+                        print(f"   {display_label}: {found_value}")
+                else:
+                    print(f"   [Refinitiv] {field}: ❌ Nicht gefunden")
+
+        # Zeige GICS-Sektor-Durchschnitte für Refinitiv-Kennzahlen (VEREINFACHT)
+        if refinitiv_fields:
+            # Sammle alle Sektor-Durchschnitte aus dem DataFrame
+            sector_avg_rows = df_output_cleaned[df_output_cleaned['Name'].str.contains('🏭 Ø', na=False)]
+
+            if not sector_avg_rows.empty:
+                print(f"\n🏭 GICS-SEKTOR-DURCHSCHNITTE (REFINITIV):")
+                for _, sector_row in sector_avg_rows.iterrows():
+                    sector_name = sector_row['Name'].replace('🏭 Ø ', '')
+                    print(f"\n📊 {sector_name}:")
+
+                    # Sammle nur verfügbare Kennzahlen für diesen Sektor
+                    available_values = []
+
+                    for field in refinitiv_fields:
+                        clean_field = clean_refinitiv_field_name(field)
+
+                        # VEREINFACHTE SUCHE: Prüfe direkt die wahrscheinlichsten Spaltennamen
+                        value = None
+                        possible_keys = [clean_field, field, field.replace('TR.', '')]
+
+                        for possible_key in possible_keys:
+                            if possible_key in sector_row.index:
+                                potential_value = sector_row[possible_key]
+                                if pd.notna(potential_value) and str(potential_value).strip() != '':
+                                    try:
+                                        # Versuche als numerischen Wert zu behandeln
+                                        value = float(potential_value)
+                                        break
+                                    except (ValueError, TypeError):
+                                        # Falls nicht numerisch, verwende den String-Wert
+                                        if str(potential_value).strip() != '':
+                                            value = potential_value
                                             break
-                                        except (ValueError, TypeError):
-                                            # Falls nicht numerisch, verwende den String-Wert
-                                            if str(potential_value).strip() != '':
-                                                value = potential_value
-                                                break
-
-                            # Nur verfügbare Werte sammeln und anzeigen
-                            if value is not None:
-                                available_values.append((field, value))
-
-                        # Zeige nur verfügbare Kennzahlen
-                        if available_values:
-                            for field, value in available_values:
-                                try:
-                                    # Versuche numerische Formatierung
-                                    if isinstance(value, (int, float)):
-                                        print(f"   📈 {field}: {value:,.4f} (Sektor-Durchschnitt)")
-                                    else:
-                                        print(f"   📈 {field}: {value} (Sektor-Durchschnitt)")
-                                except:
+
+                        # Nur verfügbare Werte sammeln und anzeigen
+                        if value is not None:
+                            available_values.append((field, value))
+
+                    # Zeige nur verfügbare Kennzahlen
+                    if available_values:
+                        for field, value in available_values:
+                            try:
+                                # Versuche numerische Formatierung
+                                if isinstance(value, (int, float)):
+                                    print(f"   📈 {field}: {value:,.4f} (Sektor-Durchschnitt)")
+                                else:
                                     print(f"   📈 {field}: {value} (Sektor-Durchschnitt)")
-                        else:
-                            print(f"   ⚠️ Keine Refinitiv-Durchschnitte für {sector_name} verfügbar")
-                            # DEBUG: Zeige verfügbare Spalten
-                            print(f"   🔍 DEBUG: Verfügbare Spalten für {sector_name}: {list(sector_row.index)}")
-            end_time = time.time()
-            print(f"\n🎉 PEER-GROUP-ANALYSE ERFOLGREICH! Ausführungszeit: {end_time - start_time:.1f}s")
-            print(f"�� Ergebnisse: {len(all_results)} Unternehmen in verschiedenen Peer-Gruppen")
+                            except:
+                                print(f"   📈 {field}: {value} (Sektor-Durchschnitt)")
+                    else:
+                        print(f"   ⚠️ Keine Refinitiv-Durchschnitte für {sector_name} verfügbar")
+                        # DEBUG: Zeige verfügbare Spalten
+                        print(f"   🔍 DEBUG: Verfügbare Spalten für {sector_name}: {list(sector_row.index)}")
+        end_time = time.time()
+        print(f"\n🎉 PEER-GROUP-ANALYSE ERFOLGREICH! Ausführungszeit: {end_time - start_time:.1f}s")
+        print(f"�� Ergebnisse: {len(all_results)} Unternehmen in verschiedenen Peer-Gruppen")
 
-            # Zeige Zusammenfassung der Peer-Gruppen
-            focus_companies = [r for r in all_results if r.get('Peer_Group_Type') == 'Focus']
-            sub_industry_companies = [r for r in all_results if r.get('Peer_Group_Type') == 'Sub-Industry']
+        # Zeige Zusammenfassung der Peer-Gruppen
+        focus_companies = [r for r in all_results if r.get('Peer_Group_Type') == 'Focus']
+        sub_industry_companies = [r for r in all_results if r.get('Peer_Group_Type') == 'Sub-Industry']
 
-            print(f"\n📋 PEER-GRUPPEN ÜBERSICHT:")
-            if focus_companies:
-                print(f"   🎯 Focus-Gruppen: {len(focus_companies)} Unternehmen")
-            if sub_industry_companies:
-                print(f"   🏭 Sub-Industry-Gruppen: {len(sub_industry_companies)} Unternehmen")
+        print(f"\n📋 PEER-GRUPPEN ÜBERSICHT:")
+        if focus_companies:
+            print(f"   🎯 Focus-Gruppen: {len(focus_companies)} Unternehmen")
+        if sub_industry_companies:
+            print(f"   🏭 Sub-Industry-Gruppen: {len(sub_industry_companies)} Unternehmen")
 
-            print(f"\n✅ OUTPUT ERFOLGREICH GESPEICHERT: {output_path}")
+        print(f"\n✅ OUTPUT ERFOLGREICH GESPEICHERT: {output_path}")
 
-        else:
-            print("❌ Keine Ergebnisse zum Schreiben")
+    else:
+        print("❌ Keine Ergebnisse zum Schreiben")
+
+def process_companies():
+    """
+    Hauptfunktion zur Verarbeitung der Unternehmen, in Stufen:
+    Input parsen → Startunternehmen auflösen → Peer-Gruppen bestimmen → Excel-/Refinitiv-Kennzahlen
+    holen (überlappend, siehe process_peer_groups) → Ergebnis-Zeilen bauen → Output rendern
+    """
+    start_time = time.time()
+    print("🚀 STARTE OPTIMIERTE VERARBEITUNG...")
+
+    try:
+        # 🚀 PERFORMANCE-OPTIMIERUNG: Leere Caches zu Beginn jeder Session
+        clear_all_caches()
+
+        # Neue, geänderte oder gelöschte Daten-Dateien erkennen (Größe/mtime), nur diese neu laden
+        refresh_excel_data()
+        if WATCH_DATA_DIR:
+            start_data_watcher()
+
+        # 1. Lese input_user.xlsx (SCHNELL)
+        print("📖 Lese input_user.xlsx...")
+        df_input = pd.read_excel("excel_data/input_user.xlsx")
+        excel_fields, refinitiv_fields, is_focus, filter_type, input_companies = parse_input(df_input)
+
+        # 2.-5. PEER-GRUPPEN AUFLÖSEN UND KENNZAHLEN HOLEN (Ergebnisse in Input-Reihenfolge)
+        jobs = resolve_peer_group_jobs(df_input, input_companies, is_focus, filter_type)
+        all_results = []
+        for peer_results in process_peer_groups(jobs, excel_fields, refinitiv_fields):
+            all_results.extend(peer_results)
+
+        # 6. Speichere Output mit schönem Design
+        render_output(all_results, excel_fields, refinitiv_fields, start_time)
 
         # Bereinige temporäre Dateien
         cleanup_temp_files()
@@ -502,287 +497,214 @@ def process_companies():
         traceback.print_exc()
         cleanup_temp_files()
         return []
-def find_company_by_ric(ric):
-    """Finde Unternehmen anhand des RIC - direkte Index-Positionen"""
-    print(f"🔍 RIC-Suche: '{ric}' (RIC=Spalte E, Focus=Spalte D, Sub-Industry=Spalte C)")
-
-    for file in os.listdir(DATA_DIR):
-        if not file.endswith(".xlsx") or file.startswith("~$"):
-            continue
-
-        file_path = os.path.join(DATA_DIR, file)
-
-        try:
-            xls = pd.ExcelFile(file_path)
-            for sheet_name in xls.sheet_names:
-                # Nur relevante Sheets
-                if not any(pattern in sheet_name.lower() for pattern in ["equity", "key", "revenue", "profitability", "financial", "growth", "figures"]):
-                    continue
-
-                try:
-                    # Lese mit Header=2 (Zeile 3)
-                    df = pd.read_excel(file_path, sheet_name=sheet_name, header=2, nrows=200)
-
-                    # Prüfe ob genügend Spalten vorhanden sind
-                    if len(df.columns) < 5:
-                        continue
-
-                    # RIC ist in Spalte E (Index 4)
-                    ric_col = df.columns[4]
-
-                    # Suche nach dem spezifischen RIC
-                    matches = df[df[ric_col].astype(str).str.upper().str.strip() == ric.upper().strip()]
-
-                    if not matches.empty:
-                        row = matches.iloc[0]
-
-                        # Direkte Index-Zugriffe
-                        sub_industry = str(row.iloc[2]).strip()  # Spalte C
-                        focus_value = str(row.iloc[3]).strip()   # Spalte D
-                        ric_value = str(row.iloc[4]).strip()     # Spalte E
-
-                        # KORRIGIERT: Robuste Name-Extraktion aus Spalte A (Holding) oder B (Universe)
-                        name_value = "Unknown"
-
-                        # Versuche zuerst Spalte A (Holding)
-                        if len(df.columns) > 0:
-                            holding_name = str(row.iloc[0]).strip()
-                            if holding_name and holding_name.lower() not in ['nan', 'none', ''] and len(holding_name) > 2:
-                                name_value = holding_name
-
-                        # Falls Spalte A leer oder ungültig, versuche Spalte B (Universe)
-                        if name_value == "Unknown" and len(df.columns) > 1:
-                            universe_name = str(row.iloc[1]).strip()
-                            if universe_name and universe_name.lower() not in ['nan', 'none', ''] and len(universe_name) > 2:
-                                name_value = universe_name
-
-                        # Falls beide Spalten leer, verwende generischen Fallback-Namen
-                        if name_value == "Unknown":
-                            name_value = f"Company_{ric_value}"
-
-                        company = {
-                            "Name": name_value,
-                            "RIC": ric_value,
-                            "Sub-Industry": sub_industry,
-                            "Focus": focus_value
-                        }
-                        print(f"✅ GEFUNDEN: {company['Name']} ({company['RIC']})")
-                        print(f"   Sub-Industry (Spalte C): '{company['Sub-Industry']}'")
-                        print(f"   Focus (Spalte D): '{company['Focus']}'")
-                        return company
-
-                except Exception as e:
-                    continue
-
-        except Exception as e:
-            continue
-
-    print(f"❌ RIC '{ric}' nicht gefunden")
-    return None
 
+def build_peer_group_rows(job, excel_fields, refinitiv_fields, excel_result, all_refinitiv_data):
+    """Stufe 6: Führt Excel- und Refinitiv-Daten einer Peer-Gruppe zu Ergebnis-Zeilen zusammen"""
+    input_company = job['input_company']
+    peer_group_type = job['peer_group_type']
+    peer_companies = job['peer_companies']
+    all_excel_data, gics_sectors = excel_result
+
+    peer_results = []
+    for j, company in enumerate(peer_companies, 1):
+        print(f"     🏢 {j}/{len(peer_companies)}: {company['Name']}")
+
+        # Excel-Kennzahlen (OPTIMIERT: Verwende Batch-Daten)
+        excel_data = all_excel_data.get(company['RIC'], {})
+
+        # Refinitiv-Kennzahlen (OPTIMIERT: Verwende Batch-Daten)
+        refinitiv_data = all_refinitiv_data.get(company['RIC'], {})
+
+        # GICS Sektor für das Unternehmen
+        gics_sector = gics_sectors[company['RIC']]
+
+        # Kombiniere Ergebnisse
+        result_row = {
+            'Name': company['Name'],
+            'RIC': company['RIC'],
+            'GICS Sector': gics_sector,  # GICS Sektor hinzufügen
+            'Sub-Industry': company.get('Sub-Industry', ''),
+            'Focus': company.get('Focus', ''),
+            'Peer_Group_Type': peer_group_type,  # Neu: Kennzeichnung der Gruppe
+            'Input_Row': f"Zeile {input_company['row_number']}" if peer_group_type in ['Focus', 'Sub-Industry'] else '',  # Zeigt Input-Zeile
+        }
 
-def find_companies_by_focus(focus):
-    """Suche alle Unternehmen mit gleichem Focus (Spalte D)"""
-    companies = []
-    print(f"🔍 Focus-Suche in Spalte D: '{focus}'")
-
-    for file in os.listdir(DATA_DIR):
-        if not file.endswith(".xlsx") or file.startswith("~$"):
-            continue
-
-        file_path = os.path.join(DATA_DIR, file)
-        print(f"📁 Durchsuche: {file}")
-
-        try:
-            xls = pd.ExcelFile(file_path)
+        # Füge Excel-Kennzahlen hinzu
+        for field in excel_fields:
+            result_row[field] = excel_data.get(field, '')
 
-            for sheet_name in xls.sheet_names:
-                # Nur relevante Sheets
-                if not any(pattern in sheet_name.lower() for pattern in ["equity", "key", "revenue", "profitability", "financial", "growth", "figures"]):
-                    continue
+        # Füge Refinitiv-Kennzahlen hinzu
+        for field in refinitiv_fields:
+            clean_field = clean_refinitiv_field_name(field)
+            # KORRIGIERT: Verwende den ursprünglichen Feldnamen für den Lookup
+            original_field_value = refinitiv_data.get(field, '')
+            clean_field_value = refinitiv_data.get(clean_field, '')
+            # Nimm den Wert, der nicht leer ist
+            final_value = original_field_value if original_field_value else clean_field_value
+            result_row[clean_field] = final_value
 
-                try:
-                    # Lese mit Header=2 (Zeile 3)
-                    df = pd.read_excel(file_path, sheet_name=sheet_name, header=2)
-
-                    # Prüfe ob genügend Spalten vorhanden sind
-                    if len(df.columns) < 5:
-                        continue
-
-                    # Suche in Spalte D (Index 3) nach gleichem Focus
-                    found_in_sheet = 0
-                    for _, row in df.iterrows():
-                        if len(row) >= 5 and pd.notna(row.iloc[1]) and pd.notna(row.iloc[3]) and pd.notna(row.iloc[4]):
-                            row_focus = str(row.iloc[3]).strip()  # Spalte D
-
-                            if row_focus == focus.strip():
-                                company = {
-                                    "Name": str(row.iloc[1]).strip(),       # Spalte B
-                                    "RIC": str(row.iloc[4]).strip(),        # Spalte E
-                                    "Sub-Industry": str(row.iloc[2]).strip(), # Spalte C
-                                    "Focus": row_focus                       # Spalte D
-                                }
-
-                                # Vermeide Duplikate
-                                if not any(c["RIC"] == company["RIC"] for c in companies):
-                                    companies.append(company)
-                                    found_in_sheet += 1
-
-                    if found_in_sheet > 0:
-                        print(f"  📄 {sheet_name}: {found_in_sheet} Unternehmen gefunden")
+        peer_results.append(result_row)
+        print(f"       ✅ {len(excel_data)} Excel + {len(refinitiv_data)} Refinitiv")
 
-                except Exception as e:
-                    continue
+    print(f"   📊 {peer_group_type}-Peer-Gruppe verarbeitet: {len(peer_results)} Unternehmen hinzugefügt")
+    return peer_results
 
-        except Exception as e:
-            continue
+def build_fetch_plan(jobs):
+    """
+    Abruf-Plan über alle Peer-Gruppen: jeder RIC einmal pro Excel-Dateiauswahl (GICS-Filter der
+    Input-Zeile) und einmal für Refinitiv, egal in wie vielen Gruppen er vorkommt
 
-    print(f"📊 GESAMT: {len(companies)} Unternehmen mit Focus '{focus}' gefunden")
-    return companies
+    Returns:
+        {'excel': {GICS-Filter (Tuple oder None): [RICs]}, 'refinitiv': [RICs],
+         'refinitiv_groups': [RICs, die pro Job zum ersten Mal vorkommen], 'rows': Anzahl Ergebnis-Zeilen}
+    """
+    excel_rics = {}
+    refinitiv_rics = {}
+    refinitiv_groups = []
+    rows = 0
+    for job in jobs:
+        gics_filter = _gics_filter(job)
+        group_rics = excel_rics.setdefault(gics_filter, {})
+        new_rics = []
+        for company in job['peer_companies']:
+            group_rics[company['RIC']] = None
+            if company['RIC'] not in refinitiv_rics:
+                refinitiv_rics[company['RIC']] = None
+                new_rics.append(company['RIC'])
+            rows += 1
+        refinitiv_groups.append(new_rics)
+    return {
+        'excel': {gics_filter: list(rics) for gics_filter, rics in excel_rics.items()},
+        'refinitiv': list(refinitiv_rics),
+        'refinitiv_groups': refinitiv_groups,
+        'rows': rows,
+    }
 
+def schedule_refinitiv_batches(plan, workers):
+    """
+    Verteilt die Peer-Gruppen des Plans auf höchstens workers Refinitiv-Batches: größte Gruppe
+    zuerst, jeweils in den bisher kleinsten Batch. Innerhalb eines Batches bleiben die RICs in
+    Plan-Reihenfolge; mit workers=1 ist das genau ein Batch mit allen RICs.
+    """
+    groups = sorted((rics for rics in plan['refinitiv_groups'] if rics), key=len, reverse=True)
+    batches = [[] for _ in range(max(1, min(workers, len(groups))))]
+    for rics in groups:
+        min(batches, key=len).extend(rics)
 
-def find_companies_by_sub_industry(sub_industry):
-    """Suche alle Unternehmen mit gleicher Sub-Industry (Spalte C)"""
-    companies = []
-    print(f"🔍 Sub-Industry-Suche in Spalte C: '{sub_industry}'")
+    position = {ric: pos for pos, ric in enumerate(plan['refinitiv'])}
+    batches = [sorted(batch, key=position.get) for batch in batches if batch]
+    return sorted(batches, key=len, reverse=True)
 
-    for file in os.listdir(DATA_DIR):
-        if not file.endswith(".xlsx") or file.startswith("~$"):
-            continue
+def execute_fetch_plan(plan, excel_fields, refinitiv_fields, workers=None):
+    """
+    Holt alle Werte des Plans in zwei überlappenden Stufen:
+    - Refinitiv: die Peer-Gruppen verteilt auf workers (bzw. PEER_GROUP_WORKERS) Batches, die im
+      Hintergrund parallel laufen (größte zuerst, siehe schedule_refinitiv_batches)
+    - Excel: ein Batch pro Dateiauswahl im aufrufenden Thread, während die Requests unterwegs sind
+    Die Excel-Caches werden nur im aufrufenden Thread gelesen und aufgebaut, die Refinitiv-Batches
+    enthalten disjunkte RICs - das Ergebnis ist unabhängig von der Fertigstellungs-Reihenfolge.
+
+    Returns:
+        (GICS-Filter → {RIC: {Feld: Wert}}, RIC → GICS-Sektor, RIC → {Refinitiv-Feld: Wert})
+    """
+    workers = PEER_GROUP_WORKERS if workers is None else workers
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    batches = schedule_refinitiv_batches(plan, workers) if refinitiv_fields else []
+
+    with ThreadPoolExecutor(max_workers=max(1, len(batches)), thread_name_prefix="refinitiv") as executor:
+        if batches:
+            print(f"     📊 Hole Refinitiv-Daten für {len(plan['refinitiv'])} Unternehmen in {len(batches)} "
+                  f"Batch(es) {[len(batch) for batch in batches]}...")
+        refinitiv_futures = [executor.submit(get_refinitiv_kennzahlen_for_companies,
+                                             [{'RIC': ric} for ric in batch], refinitiv_fields)
+                             for batch in batches]
+
+        excel_data = {}
+        for gics_filter, rics in plan['excel'].items():
+            excel_data[gics_filter] = {}
+            if excel_fields and rics:
+                print(f"     📊 Hole Excel-Kennzahlen für {len(rics)} Unternehmen in einem Batch...")
+                excel_data[gics_filter] = fetch_excel_kennzahlen_batch(
+                    rics, excel_fields, list(gics_filter) if gics_filter else None)
+
+        # Bestimme GICS Sektoren der Unternehmen
+        gics_sectors = {ric: determine_gics_sector(ric) for ric in plan['refinitiv']}
+
+        refinitiv_data = {}
+        for future in refinitiv_futures:
+            refinitiv_data.update(future.result())
+    return excel_data, gics_sectors, refinitiv_data
+
+def _gics_filter(job):
+    """Excel-Dateiauswahl einer Peer-Gruppe: GICS Sektor der Input-Zeile (oder None = alle Dateien)"""
+    gics_sector = job['input_company'].get('gics_sector')
+    return (gics_sector,) if gics_sector else None
+
+def process_peer_groups(jobs, excel_fields, refinitiv_fields, workers=None):
+    """
+    Stufe 4-6: Verarbeitet alle Peer-Gruppen (jobs: Liste oder Generator aus resolve_peer_group_jobs)
+    über einen gemeinsamen Abruf-Plan: jedes (RIC, Feld)-Paar wird genau einmal geholt
+    (execute_fetch_plan) und auf alle Gruppen verteilt, die Ergebnis-Zeilen kommen in Job-Reihenfolge.
 
-        file_path = os.path.join(DATA_DIR, file)
-        print(f"📁 Durchsuche: {file}")
+    Returns:
+        Liste der Ergebnis-Zeilen pro Job
+    """
+    jobs = list(jobs)
+    plan = build_fetch_plan(jobs)
+    excel_queries = sum(len(rics) for rics in plan['excel'].values())
+    print(f"\n🗺️ Abruf-Plan: {len(jobs)} Peer-Gruppen, {plan['rows']} Zeilen → {len(plan['refinitiv'])} eindeutige RICs "
+          f"({excel_queries} Excel-Abfragen in {len(plan['excel'])} Dateiauswahlen)")
 
-        try:
-            xls = pd.ExcelFile(file_path)
+    excel_data, gics_sectors, refinitiv_data = execute_fetch_plan(plan, excel_fields, refinitiv_fields, workers)
+    return [build_peer_group_rows(job, excel_fields, refinitiv_fields,
+                                  (excel_data.get(_gics_filter(job), {}), gics_sectors), refinitiv_data)
+            for job in jobs]
 
-            for sheet_name in xls.sheet_names:
-                # Nur relevante Sheets
-                if not any(pattern in sheet_name.lower() for pattern in ["equity", "key", "revenue", "profitability", "financial", "growth", "figures"]):
-                    continue
+def find_company_by_ric(ric):
+    """Finde Unternehmen anhand des RIC - über die Stammdaten-Tabelle"""
+    print(f"🔍 RIC-Suche: '{ric}' (RIC=Spalte E, Focus=Spalte D, Sub-Industry=Spalte C)")
 
-                try:
-                    # Lese mit Header=2 (Zeile 3)
-                    df = pd.read_excel(file_path, sheet_name=sheet_name, header=2)
-
-                    # Prüfe ob genügend Spalten vorhanden sind
-                    if len(df.columns) < 5:
-                        continue
-
-                    # Suche in Spalte C (Index 2) nach gleicher Sub-Industry
-                    found_in_sheet = 0
-                    for _, row in df.iterrows():
-                        if len(row) >= 5 and pd.notna(row.iloc[1]) and pd.notna(row.iloc[2]) and pd.notna(row.iloc[4]):
-                            row_sub_industry = str(row.iloc[2]).strip()  # Spalte C
-
-                            if row_sub_industry == sub_industry.strip():
-                                company = {
-                                    "Name": str(row.iloc[1]).strip(),       # Spalte B
-                                    "RIC": str(row.iloc[4]).strip(),        # Spalte E
-                                    "Sub-Industry": row_sub_industry,        # Spalte C
-                                    "Focus": str(row.iloc[3]).strip()       # Spalte D
-                                }
-
-                                # Vermeide Duplikate
-                                if not any(c["RIC"] == company["RIC"] for c in companies):
-                                    companies.append(company)
-                                    found_in_sheet += 1
-
-                    if found_in_sheet > 0:
-                        print(f"  📄 {sheet_name}: {found_in_sheet} Unternehmen gefunden")
+    company = find_company_record_by_ric(ric)
+    if company is None:
+        print(f"❌ RIC '{ric}' nicht gefunden")
+        return None
 
-                except Exception as e:
-                    continue
+    print(f"✅ GEFUNDEN: {company['Name']} ({company['RIC']})")
+    print(f"   Sub-Industry (Spalte C): '{company['Sub-Industry']}'")
+    print(f"   Focus (Spalte D): '{company['Focus']}'")
+    return company
 
-        except Exception as e:
-            continue
 
-    print(f"📊 GESAMT: {len(companies)} Unternehmen mit Sub-Industry '{sub_industry}' gefunden")
+def find_peer_companies(peer_filter):
+    """
+    Suche alle Unternehmen zu einem Peer-Filter über den Bitmap-Index der Stammdaten,
+    z.B. {"Focus": ..., "Sector": ...} oder {"Sub-Industry": [A, B]} (siehe company_index.filter_mask)
+    """
+    print(f"🔍 Peer-Filter: {peer_filter}")
+    companies = select_companies(peer_filter)
+    print(f"📊 GESAMT: {len(companies)} Unternehmen für Peer-Filter gefunden")
     return companies
 
 
-def get_kennzahlen_for_company(ric, fields):
-    """Sammelt alle gewünschten Kennzahlen für ein Unternehmen basierend auf RIC (nutzt robusten Import aus excel_kennzahlen.py)"""
-    return fetch_excel_kennzahlen_by_ric(ric, fields)
-
 def find_company_by_name(name):
-    """Finde Unternehmen anhand des Namens - Suche in Holding/Universe"""
+    """Finde Unternehmen anhand des Namens - Suche in Holding/Universe (Trigramm-Index)"""
     print(f"🔍 Name-Suche: '{name}' (Teilwort-Suche in Holding/Universe)")
 
     # Prüfe 4-Zeichen-Regel
-    if len(name) < 4:
-        print(f"❌ Name '{name}' zu kurz (mindestens 4 Zeichen erforderlich)")
+    if len(name) < MIN_NAME_QUERY_LENGTH:
+        print(f"❌ Name '{name}' zu kurz (mindestens {MIN_NAME_QUERY_LENGTH} Zeichen erforderlich)")
         return None
 
-    for file in os.listdir(DATA_DIR):
-        if not file.endswith(".xlsx") or file.startswith("~$"):
-            continue
-
-        file_path = os.path.join(DATA_DIR, file)
-
-        try:
-            xls = pd.ExcelFile(file_path)
-            for sheet_name in xls.sheet_names:
-                # Nur relevante Sheets
-                if not any(pattern in sheet_name.lower() for pattern in ["equity", "key", "revenue", "profitability", "financial", "growth", "figures"]):
-                    continue
-
-                try:
-                    # Lese mit Header=2 (Zeile 3)
-                    df = pd.read_excel(file_path, sheet_name=sheet_name, header=2)
-
-                    # Prüfe ob genügend Spalten vorhanden sind
-                    if len(df.columns) < 5:
-                        continue
-
-                    # KORRIGIERT: Suche sowohl in Spalte A (Holding) als auch Spalte B (Universe)
-                    holding_col = df.columns[0]  # Spalte A (Holding)
-                    universe_col = df.columns[1]  # Spalte B (Universe)
-
-                    # Suche in beiden Spalten
-                    holding_matches = df[df[holding_col].astype(str).str.contains(name, case=False, na=False)]
-                    universe_matches = df[df[universe_col].astype(str).str.contains(name, case=False, na=False)]
-
-                    # Kombiniere beide Ergebnisse, bevorzuge aber Holding-Treffer
-                    matches = holding_matches if not holding_matches.empty else universe_matches
-
-                    if not matches.empty:
-                        row = matches.iloc[0]
-
-                        # Direkte Index-Zugriffe
-                        holding_value = str(row.iloc[0]).strip()   # Spalte A (Holding)
-                        universe_value = str(row.iloc[1]).strip()  # Spalte B (Universe)
-                        sub_industry = str(row.iloc[2]).strip()    # Spalte C
-                        focus_value = str(row.iloc[3]).strip()     # Spalte D
-                        ric_value = str(row.iloc[4]).strip()       # Spalte E
-
-                        # Bestimme den Namen (Holding hat Priorität)
-                        if holding_value and holding_value != 'nan' and len(holding_value.strip()) > 2:
-                            name_value = holding_value
-                            found_in = "Holding"
-                        else:
-                            name_value = universe_value
-                            found_in = "Universe"
-
-                        company = {
-                            "Name": name_value,
-                            "RIC": ric_value,
-                            "Sub-Industry": sub_industry,
-                            "Focus": focus_value
-                        }
-                        print(f"✅ GEFUNDEN: {company['Name']} ({company['RIC']}) in {found_in}-Spalte")
-                        print(f"   Sub-Industry (Spalte C): '{company['Sub-Industry']}'")
-                        print(f"   Focus (Spalte D): '{company['Focus']}'")
-                        return company
-
-                except Exception as e:
-                    continue
-
-        except Exception as e:
-            continue
+    company, found_in = search_company_by_name(name)
+    if company is None:
+        print(f"❌ Name '{name}' nicht gefunden")
+        return None
 
-    print(f"❌ Name '{name}' nicht gefunden")
-    return None
+    print(f"✅ GEFUNDEN: {company['Name']} ({company['RIC']}) in {found_in}-Spalte")
+    print(f"   Sub-Industry (Spalte C): '{company['Sub-Industry']}'")
+    print(f"   Focus (Spalte D): '{company['Focus']}'")
+    return company
 
 def create_beautiful_excel_output(df, output_path, excel_fields, actual_company_count=None):
     """Erstellt eine wunderschön formatierte Excel-Datei mit professionellem Design"""
@@ -978,7 +900,7 @@ def create_beautiful_excel_output(df, output_path, excel_fields, actual_company_
     print(f"  💾 Datei gespeichert: {output_path}")
 
 def calculate_excel_averages(df, excel_fields):
-    """🚀 OPTIMIERTE VERSION: Berechnet die Durchschnitte für Excel-Kennzahlen nach Sub-Industry und Focus-Gruppen (mit Caching)"""
+    """🚀 OPTIMIERTE VERSION: Berechnet die Durchschnitte für Excel-Kennzahlen nach Sub-Industry und Focus-Gruppen (ein groupby für alle Gruppen)"""
     print("🔢 BERECHNE DURCHSCHNITTE FÜR EXCEL-KENNZAHLEN...")
 
     # Filtere nur die Spalten, die mit Excel-Kennzahlen gefüllt sind
@@ -990,158 +912,62 @@ def calculate_excel_averages(df, excel_fields):
 
     print(f"📊 Berechne Durchschnitte für: {excel_columns}")
 
-    # Konvertiere Excel-Kennzahlen zu numerischen Werten
-    df_numeric = df.copy()
-    for col in excel_columns:
-        df_numeric[col] = pd.to_numeric(df_numeric[col], errors='coerce')
-
-    # 1. SUB-INDUSTRY DURCHSCHNITTE (🚀 OPTIMIERT: Verwende Caching)
-    print("   🏭 Berechne Sub-Industry Durchschnitte (alle verfügbaren Unternehmen)...")
-
-    # Hole alle eindeutigen Sub-Industries aus dem Output
-    unique_sub_industries = df_numeric['Sub-Industry'].dropna().unique()
-
-    for sub_industry in unique_sub_industries:
-        if sub_industry and sub_industry.strip():
-            print(f"     🔍 Suche alle Unternehmen der Sub-Industry: '{sub_industry}'")
-
-            # 🚀 OPTIMIERT: Verwende Cached-Version
-            all_companies_in_sub_industry = find_companies_by_sub_industry_cached(sub_industry)
-
-            if len(all_companies_in_sub_industry) > 1:
-                # Sammle Excel-Kennzahlen für ALLE Unternehmen der Sub-Industry
-                all_sub_industry_data = []
-                print(f"       💾 Verarbeite {len(all_companies_in_sub_industry)} Unternehmen...")
-
-                for i, company in enumerate(all_companies_in_sub_industry, 1):
-                    if i <= 5 or i % 20 == 0:  # Zeige nur jeden 20. nach den ersten 5
-                        print(f"         {i}/{len(all_companies_in_sub_industry)}: {company['Name']}")
-
-                    # 🚀 OPTIMIERT: Verwende Cached-Version
-                    company_data = get_kennzahlen_for_company_cached(company['RIC'], excel_columns)
-                    if company_data:
-                        # Füge Basis-Informationen hinzu
-                        company_data.update({
-                            'Name': company['Name'],
-                            'RIC': company['RIC'],
-                            'Sub-Industry': company.get('Sub-Industry', ''),
-                            'Focus': company.get('Focus', '')
-                        })
-                        all_sub_industry_data.append(company_data)
-
-                if all_sub_industry_data:
-                    # Erstelle DataFrame für alle Sub-Industry Unternehmen
-                    df_sub_industry = pd.DataFrame(all_sub_industry_data)
-
-                    # Konvertiere zu numerischen Werten
-                    for col in excel_columns:
-                        df_sub_industry[col] = pd.to_numeric(df_sub_industry[col], errors='coerce')
-
-                    # Berechne Durchschnitte
-                    avg_row = {
-                        'Name': f'💼 Ø {sub_industry}',
-                        'RIC': '',
-                        'GICS Sector': '',  # Hinzufügen der GICS Sector Spalte
-                        'Sub-Industry': sub_industry,
-                        'Focus': '',
-                        'Peer_Group_Type': '',  # Leeres Peer_Group_Type für Sub-Industry-Durchschnitte
-                        'Input_Row': '',  # Leeres Input_Row für Durchschnitte
-                        'Input_Source': 'Durchschnitt (Branche)'
-                    }
-
-                    for col in excel_columns:
-                        valid_values = df_sub_industry[col].dropna()
-                        if len(valid_values) > 0:
-                            avg_row[col] = valid_values.mean()
-                            print(f"       📈 {col}: {avg_row[col]:.4f} (aus {len(valid_values)} von {len(df_sub_industry)} Unternehmen)")
-                        else:
-                            avg_row[col] = ''
-
-                    # Füge die Durchschnitts-Zeile zum DataFrame hinzu
-                    df = pd.concat([df, pd.DataFrame([avg_row])], ignore_index=True)
+    # 1. ALLE BENÖTIGTEN GRUPPEN: Sub-Industries und Focus-Werte aus dem Output
+    sub_industries = [value for value in df['Sub-Industry'].dropna().unique() if value and value.strip()]
+    focus_values = [value for value in df['Focus'].dropna().unique() if value and value.strip()]
+    print(f"   🏭 {len(sub_industries)} Sub-Industries, 🎯 {len(focus_values)} Focus-Gruppen")
+
+    # 2. STATISTIKEN ALLER GRUPPEN AUS DEM AGGREGATIONS-WÜRFEL (keine Unternehmens-Zeilen lesen)
+    stats = get_group_statistics(excel_columns)
+    means = stats['mean'].unstack('Metric')
+    counts = stats['count'].unstack('Metric')
+    sizes = stats['members'].groupby(level=['Level', 'Group'], sort=False).first()
+
+    avg_rows = []
+    for group_type, groups in (("Sub-Industry", sub_industries), ("Focus", focus_values)):
+        for group in groups:
+            key = (group_type, str(group).strip())
+            size = int(sizes.get(key, 0))
+            if size <= 1:
+                print(f"   ⚠️ Zu wenige Unternehmen für {group_type}: {group} (gefunden: {size})")
+                continue
 
-                    print(f"   ✅ Sub-Industry-Durchschnitt für '{sub_industry}' berechnet und hinzugefügt")
-                else:
-                    print(f"   ⚠️ Keine gültigen Daten für Sub-Industry: {sub_industry}")
+            if group_type == "Sub-Industry":
+                avg_row = {
+                    'Name': f'💼 Ø {group}',
+                    'RIC': '',
+                    'GICS Sector': '',  # Hinzufügen der GICS Sector Spalte
+                    'Sub-Industry': group,
+                    'Focus': '',
+                    'Peer_Group_Type': '',  # Leeres Peer_Group_Type für Sub-Industry-Durchschnitte
+                    'Input_Row': '',  # Leeres Input_Row für Durchschnitte
+                    'Input_Source': 'Durchschnitt (Branche)'
+                }
             else:
-                print(f"   ⚠️ Zu wenige Unternehmen für Sub-Industry: {sub_industry} (gefunden: {len(all_companies_in_sub_industry)})")
-
-    # 2. FOCUS DURCHSCHNITTE (🚀 OPTIMIERT: Verwende Caching)
-    print("   🎯 Berechne Focus Durchschnitte (nur für Gruppen mit Fokus)...")
-
-    # Filtere nur die Zeilen mit vorhandenen Fokus-Werten
-    df_focus_groups = df_numeric[df_numeric['Focus'].notna()]
-
-    if not df_focus_groups.empty:
-        # Hole alle eindeutigen Fokus-Werte
-        unique_focus_values = df_focus_groups['Focus'].dropna().unique()
-
-        for focus in unique_focus_values:
-            if focus and focus.strip():
-                print(f"     🔍 Suche alle Unternehmen mit Fokus: '{focus}'")
-
-                # 🚀 OPTIMIERT: Verwende Cached-Version
-                all_companies_with_focus = find_companies_by_focus_cached(focus)
-
-                if len(all_companies_with_focus) > 1:
-                    # Sammle Excel-Kennzahlen für ALLE Unternehmen mit diesem Fokus
-                    all_focus_data = []
-                    print(f"       💾 Verarbeite {len(all_companies_with_focus)} Unternehmen...")
-
-                    for i, company in enumerate(all_companies_with_focus, 1):
-                        if i <= 5 or i % 20 == 0:  # Zeige nur jeden 20. nach den ersten 5
-                            print(f"         {i}/{len(all_companies_with_focus)}: {company['Name']}")
-
-                        # 🚀 OPTIMIERT: Verwende Cached-Version
-                        company_data = get_kennzahlen_for_company_cached(company['RIC'], excel_columns)
-                        if company_data:
-                            # Füge Basis-Informationen hinzu
-                            company_data.update({
-                                'Name': company['Name'],
-                                'RIC': company['RIC'],
-                                'Sub-Industry': company.get('Sub-Industry', ''),
-                                'Focus': company.get('Focus', '')
-                            })
-                            all_focus_data.append(company_data)
-
-                    if all_focus_data:
-                        # Erstelle DataFrame für alle Unternehmen mit diesem Fokus
-                        df_focus = pd.DataFrame(all_focus_data)
-
-                        # Konvertiere zu numerischen Werten
-                        for col in excel_columns:
-                            df_focus[col] = pd.to_numeric(df_focus[col], errors='coerce')
-
-                        # Berechne Durchschnitte
-                        avg_row = {
-                            'Name': f'🎯 Ø {focus}',
-                            'RIC': '',
-                            'GICS Sector': '',  # Hinzufügen der GICS Sector Spalte
-                            'Sub-Industry': '',
-                            'Focus': focus,
-                            'Peer_Group_Type': 'Focus-Durchschnitt',
-                            'Input_Row': f"Focus-Ø ({len(all_focus_data)} Unternehmen)",
-                            'Input_Source': 'Durchschnitt (Fokus)'
-                        }
-
-                        for col in excel_columns:
-                            valid_values = df_focus[col].dropna()
-                            if len(valid_values) > 0:
-                                avg_row[col] = valid_values.mean()
-                                print(f"       📈 {col}: {avg_row[col]:.4f} (aus {len(valid_values)} Werten)")
-                            else:
-                                avg_row[col] = ''
-
-                        # Füge die Durchschnitts-Zeile zum DataFrame hinzu
-                        df = pd.concat([df, pd.DataFrame([avg_row])], ignore_index=True)
-
-                        print(f"   ✅ Focus-Durchschnitt für '{focus}' berechnet und hinzugefügt")
-                    else:
-                        print(f"   ⚠️ Keine gültigen Daten für Fokus: {focus}")
-                else:
-                    print(f"   ⚠️ Zu wenige Unternehmen für Fokus: {focus} (gefunden: {len(all_companies_with_focus)})")
-    else:
-        print("   ⚠️ Keine Daten für Focus-Gruppen gefunden")
+                avg_row = {
+                    'Name': f'🎯 Ø {group}',
+                    'RIC': '',
+                    'GICS Sector': '',  # Hinzufügen der GICS Sector Spalte
+                    'Sub-Industry': '',
+                    'Focus': group,
+                    'Peer_Group_Type': 'Focus-Durchschnitt',
+                    'Input_Row': f"Focus-Ø ({size} Unternehmen)",
+                    'Input_Source': 'Durchschnitt (Fokus)'
+                }
+
+            for col in excel_columns:
+                count = int(counts.at[key, col])
+                avg_row[col] = means.at[key, col] if count > 0 else ''
+                if count > 0:
+                    print(f"       📈 {col}: {avg_row[col]:.4f} (aus {count} von {size} Unternehmen)")
+
+            avg_rows.append(avg_row)
+            print(f"   ✅ {group_type}-Durchschnitt für '{group}' berechnet")
+
+    # 4. ALLE DURCHSCHNITTS-ZEILEN MIT EINEM CONCAT ANHÄNGEN
+    if avg_rows:
+        df = pd.concat([df, pd.DataFrame(avg_rows)], ignore_index=True)
+        print(f"   ✅ {len(avg_rows)} Durchschnitts-Zeilen hinzugefügt")
 
     return df
 
@@ -1283,128 +1109,28 @@ def save_beautiful_output(df, output_path):
     # 2. VERBESSERTE SEKTOR-INFORMATION HINZUFÜGEN
     print("   🏭 Verbessere GICS-Sektor-Information...")
 
-    # Sammle alle GICS Sectoren für jede Zeile
-    sectors = []
-    for _, row in df_formatted.iterrows():
-        ric = row.get('RIC', '')
-        sector = ''
-
-        if ric and not row['Name'].startswith('🏭 Ø') and not row['Name'].startswith('💼 Ø') and not row['Name'].startswith('🎯 Ø'):
-            # Ermittle Sektor für echte Unternehmen anhand der Excel-Dateien
-            for file in os.listdir(DATA_DIR):
-                if file.endswith(".xlsx") and not file.startswith("~$"):
-                    # Bestimme Sektor aus Dateiname (KORRIGIERT: Vollständige Mapping)
-                    if "Consumer" in file and "Basic" not in file:
-                        potential_sector = "Consumer Discretionary"
-                    elif "Basic" in file and "Consumer" in file:
-                        potential_sector = "Consumer Staples"
-                    elif "Health" in file:
-                        potential_sector = "Health Care"
-                    elif "IT" in file or "Technology" in file:
-                        potential_sector = "Information Technology"
-                    elif "Materials" in file:
-                        potential_sector = "Materials"
-                    elif "Housing" in file:
-                        potential_sector = "Real Estate"
-                    elif "Utilities" in file:
-                        potential_sector = "Utilities"
-                    elif "Energy" in file:
-                        potential_sector = "Energy"
-                    elif "Financial" in file or "Bank" in file:
-                        potential_sector = "Financials"
-                    elif "Industrial" in file or "Manufacturing" in file:
-                        potential_sector = "Industrials"
-                    elif "Communication" in file or "Telecom" in file or "Media" in file:
-                        potential_sector = "Communication Services"
-                    else:
-                        continue
+    # Sektoren für alle Zeilen in einem Durchgang über die RIC → Sektor-Zuordnung des Daten-Katalogs
+    names = df_formatted['Name'].fillna('').astype(str)
+    if 'RIC' in df_formatted.columns:
+        ric_keys = df_formatted['RIC'].map(lambda ric: str(ric).upper().strip() if ric else '')
+    else:
+        ric_keys = pd.Series('', index=df_formatted.index)
+    row_sectors = ric_keys.map(get_ric_sectors()).fillna('')
 
-                    # Prüfe ob RIC in dieser Datei ist
-                    file_path = os.path.join(DATA_DIR, file)
-                    try:
-                        xls = pd.ExcelFile(file_path)
-                        for sheet_name in xls.sheet_names:
-                            if any(pattern in sheet_name.lower() for pattern in ["equity", "key", "revenue", "profitability", "financial", "growth", "figures"]):
-                                try:
-                                    df_check = pd.read_excel(file_path, sheet_name=sheet_name, header=2, nrows=100)
-                                    if len(df_check.columns) >= 5:
-                                        ric_col = df_check.columns[4]
-                                        if any(df_check[ric_col].astype(str).str.upper().str.strip() == ric.upper().strip()):
-                                            sector = potential_sector
-                                            break
-                                except:
-                                    continue
-                        if sector:
-                            break
-                    except:
-                        continue
-
-        elif row['Name'].startswith('🏭 Ø'):
-            # Sektor-Durchschnitt - verwende den Sektor-Namen aus dem Name-Feld
-            sector_name = row['Name'].replace('🏭 Ø ', '')
-            sector = sector_name
-        elif row['Name'].startswith('💼 Ø') or row['Name'].startswith('🎯 Ø'):
-            # Sub-Industry oder Focus-Durchschnitte - versuche Sektor zu ermitteln
-            # Schaue nach dem dominanten Sektor in der aktuellen Analyse
-            non_avg_rows = df_formatted[~df_formatted['Name'].str.contains('Ø', na=False)]
-            if not non_avg_rows.empty:
-                # Nimm den häufigsten Sektor
-                sector_counts = {}
-                for _, non_avg_row in non_avg_rows.iterrows():
-                    non_avg_ric = non_avg_row.get('RIC', '')
-                    if non_avg_ric:
-                        # Ermittle Sektor für diesen RIC
-                        for file in os.listdir(DATA_DIR):
-                            if file.endswith(".xlsx") and not file.startswith("~$"):
-                                if "Consumer" in file and "Basic" not in file:
-                                    check_sector = "Consumer Discretionary"
-                                elif "Basic" in file and "Consumer" in file:
-                                    check_sector = "Consumer Staples"
-                                elif "Health" in file:
-                                    check_sector = "Health Care"
-                                elif "IT" in file or "Technology" in file:
-                                    check_sector = "Information Technology"
-                                elif "Materials" in file:
-                                    check_sector = "Materials"
-                                elif "Housing" in file:
-                                    check_sector = "Real Estate"
-                                elif "Utilities" in file:
-                                    check_sector = "Utilities"
-                                elif "Energy" in file:
-                                    check_sector = "Energy"
-                                elif "Financial" in file or "Bank" in file:
-                                    check_sector = "Financials"
-                                elif "Industrial" in file or "Manufacturing" in file:
-                                    check_sector = "Industrials"
-                                elif "Communication" in file or "Telecom" in file or "Media" in file:
-                                    check_sector = "Communication Services"
-                                else:
-                                    continue
-
-                                file_path = os.path.join(DATA_DIR, file)
-                                try:
-                                    xls = pd.ExcelFile(file_path)
-                                    for sheet_name in xls.sheet_names:
-                                        if any(pattern in sheet_name.lower() for pattern in ["equity", "key", "revenue", "profitability", "financial", "growth", "figures"]):
-                                            try:
-                                                df_check = pd.read_excel(file_path, sheet_name=sheet_name, header=2, nrows=100)
-                                                if len(df_check.columns) >= 5:
-                                                    ric_col = df_check.columns[4]
-                                                    if any(df_check[ric_col].astype(str).str.upper().str.strip() == non_avg_ric.upper().strip()):
-                                                        sector_counts[check_sector] = sector_counts.get(check_sector, 0) + 1
-                                                        break
-                                            except:
-                                                continue
-                                    if check_sector in sector_counts:
-                                        break
-                                except:
-                                    continue
+    is_sector_avg = names.str.startswith('🏭 Ø')
+    is_group_avg = names.str.startswith('💼 Ø') | names.str.startswith('🎯 Ø')
+    is_company = ~(is_sector_avg | is_group_avg)
 
-                # Verwende den häufigsten Sektor
-                if sector_counts:
-                    sector = max(sector_counts, key=sector_counts.get)
+    # Sub-Industry- und Focus-Durchschnitte erhalten den häufigsten Sektor der echten Unternehmen
+    company_sectors = row_sectors[~names.str.contains('Ø') & (row_sectors != '')]
+    dominant_sector = company_sectors.value_counts(sort=False).idxmax() if not company_sectors.empty else ''
 
-        sectors.append(sector)
+    sectors = pd.Series('', index=df_formatted.index, dtype=object)
+    sectors[is_company] = row_sectors[is_company]
+    # Sektor-Durchschnitt - verwende den Sektor-Namen aus dem Name-Feld
+    sectors[is_sector_avg] = names[is_sector_avg].str.replace('🏭 Ø ', '', regex=False)
+    sectors[is_group_avg] = dominant_sector
+    sectors = sectors.tolist()
 
     # Überschreibe oder füge GICS Sektor-Spalte hinzu
     df_formatted['GICS\nSektor'] = sectors
@@ -1593,59 +1319,8 @@ def save_beautiful_output(df, output_path):
     print(f"   💾 Verbesserte Excel-Ausgabe gespeichert: {output_path}")
 
 def determine_gics_sector(ric):
-    """Bestimmt den GICS Sektor für einen RIC anhand der Excel-Dateien"""
-    if not ric:
-        return ""
-
-    for file in os.listdir(DATA_DIR):
-        if not file.endswith(".xlsx") or file.startswith("~$"):
-            continue
-
-        # Bestimme Sektor aus Dateiname
-        sector = None
-        if "Consumer" in file and "Basic" not in file:
-            sector = "Consumer Discretionary"
-        elif "Basic" in file and "Consumer" in file:
-            sector = "Consumer Staples"
-        elif "Health" in file:
-            sector = "Health Care"
-        elif "IT" in file or "Technology" in file:
-            sector = "Information Technology"
-        elif "Materials" in file:
-            sector = "Materials"
-        elif "Housing" in file:
-            sector = "Real Estate"
-        elif "Utilities" in file:
-            sector = "Utilities"
-        elif "Energy" in file:
-            sector = "Energy"
-        elif "Financial" in file or "Bank" in file:
-            sector = "Financials"
-        elif "Industrial" in file or "Manufacturing" in file:
-            sector = "Industrials"
-        elif "Communication" in file or "Telecom" in file or "Media" in file:
-            sector = "Communication Services"
-        else:
-            continue
-
-        # Prüfe ob RIC in dieser Datei ist
-        file_path = os.path.join(DATA_DIR, file)
-        try:
-            xls = pd.ExcelFile(file_path)
-            for sheet_name in xls.sheet_names:
-                if any(pattern in sheet_name.lower() for pattern in ["equity", "key", "revenue", "profitability", "financial", "growth", "figures"]):
-                    try:
-                        df_check = pd.read_excel(file_path, sheet_name=sheet_name, header=2, nrows=100)
-                        if len(df_check.columns) >= 5:
-                            ric_col = df_check.columns[4]
-                            if any(df_check[ric_col].astype(str).str.upper().str.strip() == ric.upper().strip()):
-                                return sector
-                    except:
-                        continue
-        except:
-            continue
-
-    return ""
+    """Bestimmt den GICS Sektor für einen RIC anhand der Excel-Dateien (über den Daten-Katalog)"""
+    return sector_for_ric(ric)
 
 def get_gics_sector_mapping():
     """Mapping von GICS Sektor-Namen zu Refinitiv GICS Sektor-Nummern"""
@@ -1669,50 +1344,71 @@ def fetch_refinitiv_sector_averages(sector_name, refinitiv_fields):
     from refinitiv_integration import fetch_refinitiv_sector_averages as new_fetch_function
     return new_fetch_function(sector_name, refinitiv_fields)
 
-def find_companies_by_focus_cached(focus):
-    """🚀 OPTIMIERTE VERSION: Suche alle Unternehmen mit gleichem Focus (mit Caching)"""
-    global _COMPANY_CACHE
+def _data_dir_fingerprint():
+    """Fingerprint des Datenstands: Name, Größe und mtime aller Daten-Dateien"""
+    stamps = get_data_stamps(get_sector_excel_files(None))
+    entries = sorted([os.path.basename(path), size, mtime] for path, (size, mtime) in stamps.items())
+    return hashlib.sha1(json.dumps(entries).encode("utf-8")).hexdigest()
 
-    cache_key = f"focus_{focus}"
-    if cache_key in _COMPANY_CACHE:
-        print(f"🔄 Cache-Hit für Focus '{focus}': {len(_COMPANY_CACHE[cache_key])} Unternehmen")
-        return _COMPANY_CACHE[cache_key]
+def _company_cache_path():
+    return os.path.join(excel_disk_cache.CACHE_DIR, COMPANY_CACHE_FILE)
 
-    # Falls nicht im Cache, normale Suche durchführen
-    companies = find_companies_by_focus(focus)
-    _COMPANY_CACHE[cache_key] = companies
-    print(f"💾 Focus '{focus}' in Cache gespeichert: {len(companies)} Unternehmen")
-    return companies
+def _load_company_cache():
+    """
+    Stellt sicher, dass _COMPANY_CACHE zum aktuellen Datenstand gehört: bei geändertem Fingerprint
+    wird der Cache geleert und, falls vorhanden, der gespeicherte Stand dieses Fingerprints geladen
+    """
+    global _COMPANY_CACHE_FINGERPRINT
+    fingerprint = _data_dir_fingerprint()
+    if fingerprint == _COMPANY_CACHE_FINGERPRINT:
+        return
 
-def find_companies_by_sub_industry_cached(sub_industry):
-    """🚀 OPTIMIERTE VERSION: Suche alle Unternehmen mit gleicher Sub-Industry (mit Caching)"""
-    global _COMPANY_CACHE
+    _COMPANY_CACHE.clear()
+    _COMPANY_CACHE_FINGERPRINT = fingerprint
+    if not excel_disk_cache.DISK_CACHE_ENABLED:
+        return
+    try:
+        with open(_company_cache_path(), "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return
+    if data.get("version") == COMPANY_CACHE_FORMAT_VERSION and data.get("fingerprint") == fingerprint:
+        _COMPANY_CACHE.update(data.get("groups", {}))
+        print(f"💾 {len(_COMPANY_CACHE)} Peer-Gruppen aus Disk-Cache geladen (Daten unverändert)")
+
+def _save_company_cache():
+    """Schreibt _COMPANY_CACHE atomar (erst Temp-Datei, dann umbenennen)"""
+    if not excel_disk_cache.DISK_CACHE_ENABLED:
+        return
+    try:
+        os.makedirs(excel_disk_cache.CACHE_DIR, exist_ok=True)
+        tmp_path = _company_cache_path() + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": COMPANY_CACHE_FORMAT_VERSION, "fingerprint": _COMPANY_CACHE_FINGERPRINT,
+                       "groups": _COMPANY_CACHE}, f, ensure_ascii=False)
+        os.replace(tmp_path, _company_cache_path())
+    except OSError as e:
+        print(f"⚠️ Konnte Peer-Gruppen-Cache nicht schreiben: {e}")
+
+def _peer_filter_key(peer_filter):
+    """Schlüssel eines Peer-Filters für _COMPANY_CACHE (unabhängig von der Reihenfolge der Spalten)"""
+    return json.dumps(peer_filter, sort_keys=True, ensure_ascii=False, default=list)
+
+def find_peer_companies_cached(peer_filter):
+    """
+    🚀 OPTIMIERTE VERSION: Peer-Gruppe zu einem Peer-Filter (mit Caching). Der Cache wird über
+    Läufe hinweg gespeichert und gilt, solange sich keine Daten-Datei ändert.
+    """
+    _load_company_cache()
 
-    cache_key = f"sub_industry_{sub_industry}"
+    cache_key = _peer_filter_key(peer_filter)
     if cache_key in _COMPANY_CACHE:
-        print(f"🔄 Cache-Hit für Sub-Industry '{sub_industry}': {len(_COMPANY_CACHE[cache_key])} Unternehmen")
+        print(f"🔄 Cache-Hit für Peer-Filter {peer_filter}: {len(_COMPANY_CACHE[cache_key])} Unternehmen")
         return _COMPANY_CACHE[cache_key]
 
     # Falls nicht im Cache, normale Suche durchführen
-    companies = find_companies_by_sub_industry(sub_industry)
+    companies = find_peer_companies(peer_filter)
     _COMPANY_CACHE[cache_key] = companies
-    print(f"💾 Sub-Industry '{sub_industry}' in Cache gespeichert: {len(companies)} Unternehmen")
+    _save_company_cache()
+    print(f"💾 Peer-Filter {peer_filter} in Cache gespeichert: {len(companies)} Unternehmen")
     return companies
-
-def get_kennzahlen_for_company_cached(ric, fields):
-    """🚀 OPTIMIERTE VERSION: Sammelt Kennzahlen für ein Unternehmen (mit Caching)"""
-    global _EXCEL_KENNZAHLEN_CACHE
-
-    # Erstelle eindeutigen Cache-Key
-    fields_key = "_".join(sorted(fields))
-    cache_key = f"{ric}_{fields_key}"
-
-    if cache_key in _EXCEL_KENNZAHLEN_CACHE:
-        print(f"🔄 Cache-Hit für RIC '{ric}': Excel-Kennzahlen bereits vorhanden")
-        return _EXCEL_KENNZAHLEN_CACHE[cache_key]
-
-    # Falls nicht im Cache, normale Kennzahlen-Abfrage
-    kennzahlen = get_kennzahlen_for_company(ric, fields)
-    _EXCEL_KENNZAHLEN_CACHE[cache_key] = kennzahlen
-    return kennzahlen
-
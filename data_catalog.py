@@ -0,0 +1,186 @@
+import os
+import json
+import excel_disk_cache
+from excel_kennzahlen import (
+    get_sector_excel_files, load_excel_files_once, apply_pending_changes,
+    get_loaded_sheet_names, get_sheet_schema, get_sheet_frame, register_invalidation_hook
+)
+
+# Katalog der Daten-Dateien (Sektor, Sheets mit Header-Zeile, enthaltene RICs),
+# liegt neben dem Disk-Cache und wird über Größe/mtime der Dateien validiert
+CATALOG_FILE = "catalog.json"
+CATALOG_FORMAT_VERSION = 1
+
+# Sheets, deren Spalte E (RIC) die Sektor-Zugehörigkeit eines Unternehmens bestimmt
+SECTOR_SHEET_KEYWORDS = ["equity", "key", "revenue", "profitability", "financial", "growth", "figures"]
+
+_catalog = None  # absoluter Dateipfad → Katalog-Eintrag (siehe _catalog_entry)
+_ric_sectors = None  # normalisierter RIC → GICS-Sektor
+
+def sector_for_file(file_name):
+    """GICS-Sektor einer Daten-Datei anhand des Dateinamens (oder None)"""
+    file_name = os.path.basename(file_name)
+    if "Consumer" in file_name and "Basic" not in file_name:
+        return "Consumer Discretionary"
+    elif "Basic" in file_name and "Consumer" in file_name:
+        return "Consumer Staples"
+    elif "Health" in file_name:
+        return "Health Care"
+    elif "IT" in file_name or "Technology" in file_name:
+        return "Information Technology"
+    elif "Materials" in file_name:
+        return "Materials"
+    elif "Housing" in file_name:
+        return "Real Estate"
+    elif "Utilities" in file_name:
+        return "Utilities"
+    elif "Energy" in file_name:
+        return "Energy"
+    elif "Financial" in file_name or "Bank" in file_name:
+        return "Financials"
+    elif "Industrial" in file_name or "Manufacturing" in file_name:
+        return "Industrials"
+    elif "Communication" in file_name or "Telecom" in file_name or "Media" in file_name:
+        return "Communication Services"
+    return None
+
+def _catalog_path():
+    return os.path.join(excel_disk_cache.CACHE_DIR, CATALOG_FILE)
+
+def _load_catalog():
+    """Lädt den gespeicherten Katalog einmalig pro Session"""
+    global _catalog
+    if _catalog is not None:
+        return _catalog
+
+    _catalog = {}
+    if not excel_disk_cache.DISK_CACHE_ENABLED:
+        return _catalog
+    try:
+        with open(_catalog_path(), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") == CATALOG_FORMAT_VERSION:
+            _catalog = data.get("files", {})
+    except (OSError, ValueError):
+        pass
+    return _catalog
+
+def _save_catalog():
+    """Schreibt den Katalog atomar (erst Temp-Datei, dann umbenennen)"""
+    if not excel_disk_cache.DISK_CACHE_ENABLED:
+        return
+    try:
+        os.makedirs(excel_disk_cache.CACHE_DIR, exist_ok=True)
+        tmp_path = _catalog_path() + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": CATALOG_FORMAT_VERSION, "files": _catalog}, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, _catalog_path())
+    except OSError as e:
+        print(f"⚠️ Konnte Daten-Katalog nicht schreiben: {e}")
+
+def _entry_is_current(entry, file_path):
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return False
+    return entry.get("size") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns
+
+def _catalog_entry(file_path):
+    """Katalog-Eintrag einer Datei: Sektor, Sheets mit Header-Zeile, RICs der Stammdaten-Sheets"""
+    stat = os.stat(file_path)
+    load_excel_files_once([file_path])
+
+    sheets = {}
+    rics = {}
+    for sheet_name in get_loaded_sheet_names(file_path):
+        schema = get_sheet_schema(file_path, sheet_name)
+        sheets[sheet_name] = schema["header_row"] if schema else None
+
+        if not any(pattern in sheet_name.lower() for pattern in SECTOR_SHEET_KEYWORDS):
+            continue
+        df = get_sheet_frame(file_path, sheet_name)
+        if df is None or len(df.columns) < 5:
+            continue
+        for value in df.iloc[:, 4].dropna():
+            ric_key = str(value).upper().strip()
+            if ric_key:
+                rics[ric_key] = None
+
+    return {
+        "file": os.path.basename(file_path),
+        "sector": sector_for_file(file_path) or "",
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sheets": sheets,
+        "rics": list(rics),
+    }
+
+def build_data_catalog():
+    """
+    Aktualisiert den Katalog für alle Daten-Dateien. Nur neue oder geänderte Dateien
+    werden (über den Excel-Cache) gelesen; unveränderte Einträge kommen aus catalog.json.
+    Baut anschließend die Zuordnung RIC → Sektor auf.
+    """
+    global _ric_sectors
+    apply_pending_changes()
+    files = get_sector_excel_files(None)
+    catalog = _load_catalog()
+
+    changed = False
+    current_keys = set()
+    for file_path in files:
+        key = os.path.abspath(file_path)
+        current_keys.add(key)
+        entry = catalog.get(key)
+        if entry is not None and _entry_is_current(entry, file_path):
+            continue
+        try:
+            catalog[key] = _catalog_entry(file_path)
+            changed = True
+        except OSError as e:
+            print(f"⚠️ Katalog: {os.path.basename(file_path)} nicht lesbar: {e}")
+
+    for key in [key for key in catalog if key not in current_keys]:
+        del catalog[key]
+        changed = True
+
+    if changed:
+        _save_catalog()
+
+    # Erster Treffer in Datei-Reihenfolge gewinnt (Dateien ohne Sektor zählen nicht)
+    _ric_sectors = {}
+    for file_path in files:
+        entry = catalog.get(os.path.abspath(file_path))
+        if not entry or not entry["sector"]:
+            continue
+        for ric_key in entry["rics"]:
+            _ric_sectors.setdefault(ric_key, entry["sector"])
+
+    print(f"🗃️ Daten-Katalog: {len(files)} Dateien, {len(_ric_sectors)} RICs mit Sektor")
+    return catalog
+
+def get_data_catalog():
+    """Liefert den (aktuellen) Katalog: absoluter Dateipfad → Eintrag"""
+    if _ric_sectors is None:
+        return build_data_catalog()
+    return _catalog
+
+def get_ric_sectors():
+    """Liefert die Zuordnung normalisierter RIC → GICS-Sektor"""
+    apply_pending_changes()
+    if _ric_sectors is None:
+        build_data_catalog()
+    return _ric_sectors
+
+def sector_for_ric(ric):
+    """GICS-Sektor eines Unternehmens anhand der Datei, in der sein RIC geführt wird ('' wenn unbekannt)"""
+    if not ric:
+        return ""
+    return get_ric_sectors().get(str(ric).upper().strip(), "")
+
+def _on_data_invalidated(file_path):
+    """Zuordnung beim nächsten Zugriff neu aufbauen (Einträge werden über Größe/mtime validiert)"""
+    global _ric_sectors
+    _ric_sectors = None
+
+register_invalidation_hook(_on_data_invalidated)
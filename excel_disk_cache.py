@@ -0,0 +1,177 @@
+import os
+import sys
+import json
+import shutil
+import hashlib
+import pandas as pd
+
+# Verzeichnis für den persistenten Cache der geparsten Daten-Workbooks
+# (überschreibbar über die Umgebungsvariable EXCEL_CACHE_DIR oder set_cache_dir)
+CACHE_DIR = os.environ.get("EXCEL_CACHE_DIR", os.path.join("excel_data", "cache"))
+
+# Mit EXCEL_DISK_CACHE=0 wird der Disk-Cache komplett deaktiviert
+DISK_CACHE_ENABLED = os.environ.get("EXCEL_DISK_CACHE", "1") != "0"
+
+MANIFEST_FILE = "manifest.json"
+CACHE_FORMAT_VERSION = 1
+
+_manifest = None
+
+def set_cache_dir(path):
+    """Setzt das Cache-Verzeichnis (z.B. für Batch-Hosts mit eigenem Scratch-Laufwerk)"""
+    global CACHE_DIR, _manifest
+    CACHE_DIR = path
+    _manifest = None
+
+def _manifest_path():
+    return os.path.join(CACHE_DIR, MANIFEST_FILE)
+
+def _load_manifest():
+    """Lädt das Manifest (Datei → Fingerprint + Sheets) einmalig pro Session"""
+    global _manifest
+    if _manifest is not None:
+        return _manifest
+
+    _manifest = {}
+    try:
+        with open(_manifest_path(), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") == CACHE_FORMAT_VERSION:
+            _manifest = data.get("files", {})
+    except (OSError, ValueError):
+        pass
+    return _manifest
+
+def _save_manifest():
+    """Schreibt das Manifest atomar (erst Temp-Datei, dann umbenennen)"""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = _manifest_path() + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": CACHE_FORMAT_VERSION, "files": _manifest}, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, _manifest_path())
+
+def _cache_key(file_path):
+    return os.path.abspath(file_path)
+
+def content_hash(file_path):
+    """SHA-1 über den Dateiinhalt"""
+    sha1 = hashlib.sha1()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+def file_fingerprint(file_path, with_hash=True):
+    """Fingerprint einer Datei: Größe, mtime und (optional) Inhalts-Hash"""
+    stat = os.stat(file_path)
+    fingerprint = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    if with_hash:
+        fingerprint["sha1"] = content_hash(file_path)
+    return fingerprint
+
+def _valid_entry(file_path):
+    """
+    Liefert den Manifest-Eintrag, falls der Cache für die Datei noch gültig ist.
+    Größe + mtime unverändert → gültig; sonst entscheidet der Inhalts-Hash.
+    """
+    entry = _load_manifest().get(_cache_key(file_path))
+    if not entry:
+        return None
+
+    try:
+        current = file_fingerprint(file_path, with_hash=False)
+    except OSError:
+        return None
+
+    if current["size"] == entry["size"] and current["mtime_ns"] == entry["mtime_ns"]:
+        return entry
+
+    if current["size"] != entry["size"]:
+        return None
+
+    # Nur mtime geändert (z.B. Kopie/Checkout) → Inhalt vergleichen
+    if content_hash(file_path) == entry["sha1"]:
+        entry["mtime_ns"] = current["mtime_ns"]
+        _save_manifest()
+        return entry
+    return None
+
+def _sheet_path(sha1, sheet_idx):
+    return os.path.join(CACHE_DIR, sha1, f"{sheet_idx}.pkl")
+
+def load_cached_workbook(file_path):
+    """
+    Lädt die geparsten Sheets einer Datei aus dem Disk-Cache.
+    Gibt None zurück, wenn kein gültiger Cache-Eintrag existiert.
+    """
+    if not DISK_CACHE_ENABLED:
+        return None
+
+    entry = _valid_entry(file_path)
+    if entry is None:
+        return None
+
+    sheets = {}
+    try:
+        for sheet_idx, sheet_name in enumerate(entry["sheets"]):
+            sheets[sheet_name] = pd.read_pickle(_sheet_path(entry["sha1"], sheet_idx))
+    except Exception as e:
+        print(f"⚠️ Disk-Cache für {os.path.basename(file_path)} unbrauchbar: {e}")
+        return None
+    return sheets
+
+def store_cached_workbook(file_path, sheets):
+    """Schreibt die geparsten Sheets einer Datei (Sheet-Name → DataFrame) in den Disk-Cache"""
+    if not DISK_CACHE_ENABLED:
+        return
+
+    try:
+        fingerprint = file_fingerprint(file_path)
+        sheet_dir = os.path.join(CACHE_DIR, fingerprint["sha1"])
+        os.makedirs(sheet_dir, exist_ok=True)
+
+        for sheet_idx, df in enumerate(sheets.values()):
+            target = _sheet_path(fingerprint["sha1"], sheet_idx)
+            df.to_pickle(target + ".tmp", compression=None)
+            os.replace(target + ".tmp", target)
+
+        manifest = _load_manifest()
+        old_entry = manifest.get(_cache_key(file_path))
+        fingerprint["sheets"] = list(sheets.keys())
+        manifest[_cache_key(file_path)] = fingerprint
+        _save_manifest()
+
+        # Veraltete Sheet-Dateien der vorherigen Version entfernen
+        if old_entry and old_entry["sha1"] != fingerprint["sha1"]:
+            still_used = any(e["sha1"] == old_entry["sha1"] for e in manifest.values())
+            if not still_used:
+                shutil.rmtree(os.path.join(CACHE_DIR, old_entry["sha1"]), ignore_errors=True)
+
+    except Exception as e:
+        print(f"⚠️ Konnte Disk-Cache für {os.path.basename(file_path)} nicht schreiben: {e}")
+
+def purge_disk_cache():
+    """Löscht den kompletten Disk-Cache"""
+    global _manifest
+    _manifest = None
+    if os.path.isdir(CACHE_DIR):
+        shutil.rmtree(CACHE_DIR)
+        print(f"🧹 Disk-Cache gelöscht: {CACHE_DIR}")
+    else:
+        print(f"ℹ️ Kein Disk-Cache vorhanden: {CACHE_DIR}")
+
+def print_cache_info():
+    """Zeigt die Einträge des Disk-Caches"""
+    manifest = _load_manifest()
+    print(f"💾 Disk-Cache: {CACHE_DIR} ({len(manifest)} Dateien)")
+    for path, entry in sorted(manifest.items()):
+        print(f"   📁 {os.path.basename(path)}: {len(entry['sheets'])} Sheets, {entry['size']} Bytes, SHA-1 {entry['sha1'][:12]}")
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "info"
+    if command == "purge":
+        purge_disk_cache()
+    elif command == "info":
+        print_cache_info()
+    else:
+        print("Verwendung: python excel_disk_cache.py [info|purge]")
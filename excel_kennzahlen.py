@@ -1,7 +1,10 @@
 import pandas as pd
+import numpy as np
 import os
 import re
 from functools import lru_cache
+from excel_disk_cache import load_cached_workbook, store_cached_workbook
+from excel_reader import read_workbook, read_workbook_projected, read_workbooks_parallel, resolve_engine, resolve_workers
 
 DATA_DIR = "excel_data/data"
 
@@ -9,11 +12,80 @@ DATA_DIR = "excel_data/data"
 _excel_cache = {}
 _files_loaded = set()
 
+_sheet_frames = {}  # (Datei, Sheet) → DataFrame mit erkannter Header-Zeile
+_sheet_schemas = {}  # (Datei, Sheet) → beim Laden erkanntes Schema (siehe detect_sheet_schema)
+_ric_sheets = {}  # Datei → Sheets mit RIC-Spalte in Workbook-Reihenfolge
+_sheet_ric_rows = {}  # (Datei, Sheet) → Series normalisierter RIC → Zeilenposition (für Batch-Joins)
+_projected_files = {}  # Datei → Felder, für die nur projiziert geladen wurde
+
+# Änderungserkennung: Datei → (Größe, mtime_ns) beim Laden, zuletzt gesehene Dateiliste,
+# vom Watcher gemeldete Änderungen und Hooks für abgeleitete Strukturen anderer Module
+_file_stats = {}
+_known_files = None
+_pending_changes = set()
+_invalidation_hooks = []
+
+# Mit EXCEL_PROJECTED_LOAD=1 lädt die RIC-Suche nur die für die Felder benötigten Spalten
+PROJECTED_LOADING = os.environ.get("EXCEL_PROJECTED_LOAD", "0") == "1"
+
+# Konsolidierte Tabellen (eine Zeile pro RIC): Datei → Tabelle, Dateiauswahl (Tuple) → Wide-Tabelle
+_file_tables = {}
+_wide_tables = {}
+
+# Feld-Auflösung pro Wide-Tabelle: Dateiauswahl → normalisierte Spalten, (Dateiauswahl, Feld) → Kandidaten
+_column_keys_cache = {}
+_field_columns_cache = {}
+
+# Aufgelöste Kennzahlen-Zeilen: Dateiauswahl → (Wide-Tabelle, {Feld: Spaltenposition je RIC}),
+# Obermenge über alle bisher angefragten Felder (siehe _resolved_field_columns)
+_resolved_columns = {}
+
+# Namens-/RIC-Zuordnung (aus den gecachten Frames, siehe get_name_ric_maps)
+_sheet_lookup_rows = {}  # (Datei, Sheet) → (normalisierter Name → Zeile, normalisierter RIC → Zeile)
+_name_ric_maps = {}  # Dateiliste → (normalisierter Name → RIC, normalisierter RIC → Name)
+
+# Spalten mit Unternehmensnamen
+NAME_COLUMNS = ['holding', 'universe']
+
+# Stammdaten-Spalten, die bei der Bereinigung der Kennzahlen unangetastet bleiben
+IDENTITY_COLUMNS = ['Holding', 'Universe', 'Sub-Industry', 'Focus', 'RIC']
+
+# Fehlermeldungen aus dem Datenexport (Teilstring-Match, Großschreibung) → NaN
+ERROR_MESSAGES = [
+    "THE RECORD COULD NOT BE FOUND",
+    "ERROR CODE: 0",
+    "NO DATA AVAILABLE",
+    "DATA NOT AVAILABLE",
+    "N/A",
+    "#N/A",
+    "#ERROR",
+    "NULL"
+]
+_ERROR_MESSAGE_RE = re.compile("|".join(re.escape(msg) for msg in ERROR_MESSAGES))
+
+# Werte, die wie ein RIC aussehen: Buchstaben + Punkt + Buchstabe (wie "RL.N")
+# oder nur Buchstaben ohne Punkt (wie "APD", "CLN")
+_RIC_LIKE_RE = re.compile(r'[A-Z]{1,6}\.[A-Z]{1,3}|[A-Z]{1,6}')
+
 def clear_excel_cache():
     """Leert den Excel-Cache"""
     global _excel_cache, _files_loaded
     _excel_cache.clear()
     _files_loaded.clear()
+    _sheet_frames.clear()
+    _sheet_schemas.clear()
+    _ric_sheets.clear()
+    _sheet_ric_rows.clear()
+    _projected_files.clear()
+    _file_tables.clear()
+    _wide_tables.clear()
+    _column_keys_cache.clear()
+    _field_columns_cache.clear()
+    _resolved_columns.clear()
+    _sheet_lookup_rows.clear()
+    _name_ric_maps.clear()
+    _file_stats.clear()
+    _notify_invalidation(None)
     print("🧹 Excel-Cache geleert")
 
 @lru_cache(maxsize=32)
@@ -71,35 +143,151 @@ def get_sector_excel_files(gics_sectors_tuple):
     print(f"📊 {len(filtered_files)} Excel-Dateien für Sektoren {gics_sectors}")
     return tuple(filtered_files)
 
-def load_excel_files_once(file_paths):
+def load_excel_files_once(file_paths, workers=None):
     """
-    Lädt alle Excel-Dateien einmalig in den Cache
+    Lädt alle Excel-Dateien einmalig in den Cache.
+    Mit workers > 1 (bzw. EXCEL_LOAD_WORKERS) werden nicht gecachte Dateien parallel geparst.
     """
     global _excel_cache, _files_loaded
 
+    apply_pending_changes()
+
     newly_loaded = 0
+    to_parse = []
     for file_path in file_paths:
+        if file_path in to_parse:
+            continue
         if file_path in _files_loaded:
+            if file_path not in _projected_files:
+                continue
+            # Nur projiziert geladen → vollständig nachladen
+            _forget_file(file_path)
+
+        # Zuerst im persistenten Disk-Cache nachsehen (kein xlsx-Parsing nötig)
+        if _load_from_disk_cache(file_path):
+            newly_loaded += 1
             continue
 
+        _remember_file_stat(file_path)
+        to_parse.append(file_path)
+
+    workers = resolve_workers(workers)
+    if workers > 1 and to_parse:
+        print(f"⚡ Parse {len(to_parse)} Dateien parallel mit {min(workers, len(to_parse))} Prozessen (Engine: {resolve_engine()})")
+        results, errors = read_workbooks_parallel(to_parse, workers=workers)
+    else:
+        results, errors = None, {}
+
+    for file_path in to_parse:
         file = os.path.basename(file_path)
-        print(f"📁 Lade Datei in Cache: {file}")
 
         try:
-            xls = pd.ExcelFile(file_path)
-            _excel_cache[file_path] = {}
+            if results is None:
+                print(f"📁 Lade Datei in Cache: {file} (Engine: {resolve_engine()})")
+                sheets, all_sheets_read = read_workbook(file_path)
+            elif file_path in errors:
+                raise RuntimeError(errors[file_path])
+            else:
+                print(f"📁 Lade Datei in Cache: {file}")
+                sheets, all_sheets_read = results[file_path]
+
+            _excel_cache[file_path] = sheets
+            _build_sheet_structures(file_path)
+            _files_loaded.add(file_path)
+            newly_loaded += 1
+
+            # Nur vollständig gelesene Dateien persistieren
+            if all_sheets_read:
+                store_cached_workbook(file_path, _excel_cache[file_path])
+
+        except Exception as e:
+            print(f"❌ Fehler beim Öffnen von {file}: {e}")
+            continue
+
+    if newly_loaded > 0:
+        print(f"✅ {newly_loaded} neue Dateien in Cache geladen")
+
+def _load_from_disk_cache(file_path):
+    """Übernimmt eine Datei aus dem persistenten Disk-Cache (True bei Treffer)"""
+    _remember_file_stat(file_path)
+    cached_sheets = load_cached_workbook(file_path)
+    if cached_sheets is None:
+        return False
+
+    print(f"💾 Lade Datei aus Disk-Cache: {os.path.basename(file_path)}")
+    _excel_cache[file_path] = cached_sheets
+    _build_sheet_structures(file_path)
+    _files_loaded.add(file_path)
+    return True
+
+def _projection_for_fields(fields):
+    """
+    Spaltenauswahl für read_workbook_projected: nur Sheets mit RIC-Spalte und mindestens einer
+    zu den Feldern passenden Spalte; geladen werden die Stammdaten-Spalten plus alle
+    Kandidaten-Spalten der Felder
+    """
+    identity = {col.lower() for col in IDENTITY_COLUMNS}
+
+    def select_columns(sheet_name, df_head):
+        schema = detect_sheet_schema(df_head)
+        if schema["ric_col"] is None:
+            return None
+
+        # Gesucht wird (wie in der Wide-Tabelle) über die reparierten Spaltennamen
+        column_keys = _normalized_column_keys(schema["repaired_columns"])
+        matched = {pos for field in fields for pos, _, _ in _match_field_columns(column_keys, field)}
+        if not matched:
+            return None
 
-            for sheet_name in xls.sheet_names:
-                try:
-                    df_raw = pd.read_excel(xls, sheet_name=sheet_name, header=None)
-                    _excel_cache[file_path][sheet_name] = df_raw
-                except Exception as e:
-                    print(f"❌ Fehler beim Lesen von Sheet {sheet_name}: {e}")
-                    continue
+        selected = matched | {schema["ric_col"], schema["name_col"]}
+        selected |= {pos for pos, _, _, col_lower in column_keys if col_lower in identity}
 
+        # Gleichnamige Spalten gemeinsam laden, damit die Nummerierung (.1, .2) wie beim vollen Laden bleibt
+        labels = [str(cell).strip() for cell in df_head.iloc[schema["header_row"]].values]
+        selected_labels = {labels[pos] for pos in selected}
+        selected |= {pos for pos, label in enumerate(labels) if label in selected_labels}
+        return selected
+
+    return select_columns
+
+def load_excel_files_projected(file_paths, fields):
+    """
+    Lädt Dateien nur mit den Spalten, die für die gewünschten Felder gebraucht werden
+    (Stammdaten + passende Kennzahlen-Spalten); Sheets ohne passende Spalten werden übersprungen.
+    Vollständig geladene Dateien und Disk-Cache-Treffer werden unverändert verwendet.
+    """
+    apply_pending_changes()
+
+    fields = frozenset(fields)
+    newly_loaded = 0
+
+    for file_path in file_paths:
+        if file_path in _files_loaded:
+            if file_path not in _projected_files or fields <= _projected_files[file_path]:
+                continue
+            # Bisherige Projektion deckt die Felder nicht ab → mit allen Feldern neu laden
+            wanted = fields | _projected_files[file_path]
+            _forget_file(file_path)
+        else:
+            wanted = fields
+            # Ein gültiger Disk-Cache ist günstiger als jedes xlsx-Parsing
+            if _load_from_disk_cache(file_path):
+                newly_loaded += 1
+                continue
+
+        file = os.path.basename(file_path)
+        _remember_file_stat(file_path)
+        try:
+            sheets, _ = read_workbook_projected(file_path, _projection_for_fields(wanted))
+            _excel_cache[file_path] = sheets
+            _build_sheet_structures(file_path)
             _files_loaded.add(file_path)
+            _projected_files[file_path] = wanted
             newly_loaded += 1
 
+            column_count = sum(len(df.columns) for df in sheets.values())
+            print(f"✂️ Lade Datei projiziert: {file} ({len(sheets)} Sheets, {column_count} Spalten)")
+
         except Exception as e:
             print(f"❌ Fehler beim Öffnen von {file}: {e}")
             continue
@@ -107,175 +295,568 @@ def load_excel_files_once(file_paths):
     if newly_loaded > 0:
         print(f"✅ {newly_loaded} neue Dateien in Cache geladen")
 
-def fetch_excel_kennzahlen_by_ric_filtered(ric: str, fields: list, gics_sectors=None) -> dict:
+def _forget_file(file_path):
+    """Entfernt eine Datei mit allen abgeleiteten Strukturen (Schema, Frames, Index) aus dem Cache"""
+    _excel_cache.pop(file_path, None)
+    _files_loaded.discard(file_path)
+    _projected_files.pop(file_path, None)
+    _ric_sheets.pop(file_path, None)
+
+    for cache in (_sheet_frames, _sheet_schemas, _sheet_ric_rows, _sheet_lookup_rows):
+        for key in [key for key in cache if key[0] == file_path]:
+            del cache[key]
+
+    # Wide-Tabellen mit dieser Datei sind veraltet
+    _file_tables.pop(file_path, None)
+    for table_key in [key for key in _wide_tables if file_path in key]:
+        del _wide_tables[table_key]
+    for key in [key for key in _column_keys_cache if file_path in key]:
+        del _column_keys_cache[key]
+    for key in [key for key in _field_columns_cache if file_path in key[0]]:
+        del _field_columns_cache[key]
+    for key in [key for key in _resolved_columns if file_path in key]:
+        del _resolved_columns[key]
+    for key in [key for key in _name_ric_maps if file_path in key]:
+        del _name_ric_maps[key]
+
+    _file_stats.pop(file_path, None)
+    _notify_invalidation(file_path)
+
+def register_invalidation_hook(callback):
     """
-    KORRIGIERT: Suche Kennzahlen direkt über RIC mit exakter Header-Übereinstimmung
+    Registriert eine Funktion, die aufgerufen wird, wenn Daten einer Datei verworfen werden
+    (callback(file_path); file_path ist None, wenn der komplette Cache geleert wurde).
+    Damit können abgeleitete Strukturen anderer Module gezielt aktualisiert werden.
     """
-    result = {}
+    if callback not in _invalidation_hooks:
+        _invalidation_hooks.append(callback)
 
-    # Konvertiere zu Tuple für Caching
-    gics_sectors_tuple = tuple(gics_sectors) if gics_sectors else None
+def _notify_invalidation(file_path):
+    for callback in _invalidation_hooks:
+        try:
+            callback(file_path)
+        except Exception as e:
+            print(f"⚠️ Fehler in Invalidierungs-Hook {getattr(callback, '__name__', callback)}: {e}")
 
-    # Hole gefilterte Excel-Dateien (cached)
-    excel_files = get_sector_excel_files(gics_sectors_tuple)
+def _stat_key(file_path):
+    """Änderungsmerkmal einer Datei: (Größe, mtime_ns)"""
+    stat = os.stat(file_path)
+    return stat.st_size, stat.st_mtime_ns
 
-    # Lade alle Dateien einmalig in Cache
-    load_excel_files_once(excel_files)
+def _remember_file_stat(file_path):
+    """Merkt sich Größe und mtime einer Datei vor dem Einlesen (für refresh_excel_data)"""
+    try:
+        _file_stats[file_path] = _stat_key(file_path)
+    except OSError:
+        _file_stats.pop(file_path, None)
 
-    for file_path in excel_files:
+def get_data_stamps(file_paths):
+    """
+    Datenstand (Größe, mtime_ns) der Dateien: für geladene Dateien der Stand beim Einlesen,
+    sonst der aktuelle Stand auf der Platte (fehlende Dateien werden ausgelassen)
+    """
+    stamps = {}
+    for file_path in file_paths:
+        if file_path in _files_loaded and file_path in _file_stats:
+            stamps[file_path] = _file_stats[file_path]
+            continue
         try:
-            # Lese Excel-Datei und teste verschiedene Sheets
-            xls = pd.ExcelFile(file_path)
-
-            for sheet_name in xls.sheet_names:
-                # Priorisiere bestimmte Sheet-Namen
-                if not any(keyword in sheet_name.lower() for keyword in ['equity', 'key', 'figures', 'data', 'working', 'capital', 'stability', 'cashflow']):
-                    continue
-
-                try:
-                    # Finde die richtige Header-Zeile dynamisch
-                    df_raw = pd.read_excel(file_path, sheet_name=sheet_name, header=None)
-
-                    # Suche nach Header-Zeile mit RIC
-                    header_row = None
-                    for i in range(min(10, len(df_raw))):
-                        row = df_raw.iloc[i]
-                        # Prüfe jede Zelle in der Zeile
-                        for cell in row.values:
-                            if pd.notna(cell) and str(cell).strip().upper() == "RIC":
-                                header_row = i
-                                break
-                        if header_row is not None:
-                            break
+            stamps[file_path] = _stat_key(file_path)
+        except OSError:
+            pass
+    return stamps
 
-                    if header_row is None:
-                        continue
+def _list_data_files():
+    return {os.path.join(DATA_DIR, f) for f in os.listdir(DATA_DIR)
+            if f.endswith(".xlsx") and not f.startswith("~$")}
 
-                    # Lese mit korrektem Header
-                    df = pd.read_excel(file_path, sheet_name=sheet_name, header=header_row)
+def mark_data_changed():
+    """Meldet eine Änderung im Datenverzeichnis (z.B. vom Watcher); verarbeitet beim nächsten Zugriff"""
+    _pending_changes.add(True)
 
-                    # Prüfe ob RIC-Spalte vorhanden
-                    if "RIC" not in df.columns:
-                        continue
+def apply_pending_changes():
+    """Verarbeitet vom Watcher gemeldete Änderungen (ohne Meldung: keine Dateisystem-Zugriffe)"""
+    if _pending_changes:
+        refresh_excel_data()
 
-                    # Suche nach der Zeile mit dem spezifischen RIC
-                    matching_rows = df[df['RIC'].astype(str).str.upper().str.strip() == ric.upper().strip()]
+def refresh_excel_data():
+    """
+    Prüft DATA_DIR auf neue, gelöschte und geänderte Dateien (Größe/mtime) und lädt nur
+    geänderte Dateien neu. Index, Schema, Frames und Wide-Tabellen werden nur für diese
+    Dateien neu aufgebaut; die gecachte Dateiliste von get_sector_excel_files wird bei neuen
+    oder gelöschten Dateien verworfen.
 
-                    if matching_rows.empty:
-                        continue
+    Returns:
+        Liste der neu geladenen bzw. entfernten Dateien
+    """
+    global _known_files
+    _pending_changes.clear()
+
+    current_files = _list_data_files()
+    if _known_files is None or current_files != _known_files:
+        if _known_files is not None:
+            added = sorted(os.path.basename(f) for f in current_files - _known_files)
+            removed = sorted(os.path.basename(f) for f in _known_files - current_files)
+            print(f"🔄 Datenverzeichnis geändert (neu: {added}, entfernt: {removed})")
+        get_sector_excel_files.cache_clear()
+    _known_files = current_files
+
+    affected = []
+    for file_path in list(_files_loaded):
+        if file_path not in current_files:
+            print(f"🗑️ Datei entfernt: {os.path.basename(file_path)}")
+            _forget_file(file_path)
+            affected.append(file_path)
+            continue
 
-                    # Verwende die erste passende Zeile
-                    matched_row = matching_rows.iloc[0]
-                    print(f"✅ RIC {ric} gefunden in {os.path.basename(file_path)} → {sheet_name}")
-
-                    # Sammle alle gewünschten Felder aus dieser Zeile
-                    for field in fields:
-                        if field in result:
-                            continue  # Bereits gefunden
-
-                        # KORRIGIERT: Bereinige Feldname von Zeilenumbrüchen für Suche
-                        clean_field = field.replace('\n', ' ').replace('\r', ' ').strip()
-
-                        found = False
-                        found_value = None
-
-                        # 1. EXAKTE ÜBEREINSTIMMUNG (höchste Priorität)
-                        if field in df.columns:
-                            value = matched_row[field]
-                            if pd.notna(value) and str(value).strip() != "":
-                                found_value = value
-                                found = True
-                                print(f"✅ Exakte Übereinstimmung: {field} = {value}")
-
-                        # 2. BEREINIGTE ÜBEREINSTIMMUNG (ohne Zeilenumbrüche)
-                        if not found:
-                            for col in df.columns:
-                                col_clean = str(col).replace('\n', ' ').replace('\r', ' ').strip()
-                                if col_clean == clean_field:
-                                    value = matched_row[col]
-                                    if pd.notna(value) and str(value).strip() != "":
-                                        found_value = value
-                                        found = True
-                                        print(f"✅ Bereinigte Übereinstimmung: {col} → {field} = {value}")
-                                        break
-
-                        # 3. CASE-INSENSITIVE ÜBEREINSTIMMUNG
-                        if not found:
-                            for col in df.columns:
-                                col_clean = str(col).replace('\n', ' ').replace('\r', ' ').strip()
-                                if col_clean.lower() == clean_field.lower():
-                                    value = matched_row[col]
-                                    if pd.notna(value) and str(value).strip() != "":
-                                        found_value = value
-                                        found = True
-                                        print(f"✅ Case-insensitive Übereinstimmung: {col} → {field} = {value}")
-                                        break
-
-                        # 4. TEILSTRING-SUCHE nur für spezielle Fälle (niedrigste Priorität)
-                        if not found and len(clean_field) > 4:  # Nur für längere Feldnamen
-                            for col in df.columns:
-                                col_clean = str(col).replace('\n', ' ').replace('\r', ' ').strip()
-                                # Beide Richtungen prüfen: Feldname in Spalte oder Spalte in Feldname
-                                if (clean_field.lower() in col_clean.lower() or col_clean.lower() in clean_field.lower()) and len(col_clean) > 3:
-                                    value = matched_row[col]
-                                    if pd.notna(value) and str(value).strip() != "":
-                                        found_value = value
-                                        found = True
-                                        print(f"✅ Teilstring-Übereinstimmung: {col} → {field} = {value}")
-                                        break
-
-                        # Verarbeite gefundenen Wert
-                        if found and found_value is not None:
-                            str_value = str(found_value).strip().upper()
-
-                            # Prüfe auf Fehlermeldungen ZUERST
-                            error_messages = [
-                                "THE RECORD COULD NOT BE FOUND",
-                                "ERROR CODE: 0",
-                                "NO DATA AVAILABLE",
-                                "DATA NOT AVAILABLE",
-                                "N/A",
-                                "#N/A",
-                                "#ERROR",
-                                "NULL"
-                            ]
-
-                            # Wenn eine Fehlermeldung enthalten ist, setze leeren Wert
-                            is_error_message = any(error_msg in str_value for error_msg in error_messages)
-
-                            if is_error_message:
-                                print(f"⚠️ Fehlermeldung '{found_value}' erkannt, setze leeren Wert")
-                                result[field] = ""  # Leerer String
-                                continue
-
-                            # Prüfe ob der Wert wie ein RIC aussieht (nur für echte RIC-Codes)
-                            is_ric_like = (
-                                # Exakter Match mit dem gesuchten RIC
-                                str_value == ric.upper().strip() or
-                                # Andere typische RIC-Muster (Buchstaben + Punkt + Buchstabe)
-                                bool(re.match(r'^[A-Z]{1,6}\.[A-Z]{1,3}$', str_value)) or
-                                # Nur Buchstaben ohne Punkt (wie "APD", "CLN")
-                                (bool(re.match(r'^[A-Z]{1,6}$', str_value)) and len(str_value) <= 6)
-                            )
-
-                            if not is_ric_like:
-                                result[field] = found_value
-                            else:
-                                print(f"⚠️ Wert '{found_value}' sieht wie ein RIC aus, überspringe")
-
-                    # Wenn Kennzahlen gefunden wurden, breche Sheet-Schleife ab
-                    if result:
-                        break
-
-                except Exception as e:
-                    continue
+        try:
+            changed = _file_stats.get(file_path) != _stat_key(file_path)
+        except OSError:
+            continue
+        if not changed:
+            continue
 
-        except Exception as e:
-            # Debug: Zeige welche Datei Probleme macht
-            print(f"❌ Fehler in {file_path}: {e}")
+        print(f"🔄 Datei geändert, lade neu: {os.path.basename(file_path)}")
+        projected_fields = _projected_files.get(file_path)
+        _forget_file(file_path)
+
+        if projected_fields is not None:
+            load_excel_files_projected([file_path], projected_fields)
+        else:
+            load_excel_files_once([file_path])
+        affected.append(file_path)
+
+    return affected
+
+def normalize_ric(ric) -> str:
+    """Normalisiert einen RIC für Vergleiche (Großschreibung, ohne Leerzeichen)"""
+    return str(ric).upper().strip()
+
+def detect_sheet_schema(df_raw):
+    """
+    Erkennt einmalig die Struktur eines Roh-Sheets (header=None):
+    Header-Zeile, Spaltennamen (wie pd.read_excel), reparierte Spaltennamen,
+    Positionen der Namens- und RIC-Spalte sowie den Bereich der Datenzeilen
+    """
+    schema = {
+        "header_row": None,
+        "columns": [],
+        "repaired_columns": [],
+        "name_col": None,
+        "ric_col": None,
+        "data_start": None,
+        "data_end": len(df_raw),
+    }
+
+    # Suche in den ersten 10 Zeilen nach der Header-Zeile: bevorzugt mit "RIC",
+    # sonst mit einer Namensspalte (Holding/Universe)
+    header_candidates = []
+    for i in range(min(10, len(df_raw))):
+        row_str = [str(cell).strip().lower() if pd.notna(cell) else "" for cell in df_raw.iloc[i].values]
+        if "ric" in row_str:
+            header_candidates.insert(0, (i, row_str))
+            break
+        if not header_candidates and any(cell in ["holding", "universe"] for cell in row_str):
+            header_candidates.append((i, row_str))
+
+    if not header_candidates:
+        return schema
+
+    header_row, row_str = header_candidates[0]
+    schema["header_row"] = header_row
+    schema["data_start"] = header_row + 1
+
+    if "ric" in row_str:
+        schema["ric_col"] = row_str.index("ric")
+
+    # Bestimme die Namensspalte (bevorzuge Holding/Universe über RIC)
+    for j, col_name in enumerate(row_str):
+        if col_name in ["holding", "universe"]:
+            schema["name_col"] = j
+            break
+    if schema["name_col"] is None:
+        schema["name_col"] = schema["ric_col"]
+
+    schema["columns"] = _header_columns(df_raw, header_row)
+    schema["repaired_columns"] = _repair_columns(df_raw, header_row, schema["columns"])
+    return schema
+
+def _header_columns(df_raw, header_row):
+    """Spaltennamen wie bei pd.read_excel(..., header=header_row)"""
+    columns = []
+    seen = {}
+    for i, col in zip(df_raw.columns, df_raw.iloc[header_row].values):
+        if pd.isna(col) or str(col).strip() == "":
+            col = f"Unnamed: {i}"
+        # Doppelte Spaltennamen wie pandas durchnummerieren (per Share, per Share.1, ...)
+        count = seen.get(col, 0)
+        while count > 0:
+            seen[col] = count + 1
+            col = f"{col}.{count}"
+            count = seen.get(col, 0)
+        seen[col] = count + 1
+        columns.append(col)
+    return columns
+
+def _repair_columns(df_raw, header_row, columns):
+    """Korrigiert 'Unnamed'-Spalten mit Kennzahlen-Namen aus den Zeilen oberhalb des Headers"""
+    if header_row == 0:
+        return list(columns)
+
+    repaired = []
+    for col_idx, orig_col in enumerate(columns):
+        # Prüfe die Zeilen oberhalb des Headers für bessere Spaltennamen
+        better_name = None
+        for row_above in range(header_row):
+            cell_value = df_raw.iloc[row_above, col_idx]
+            if pd.notna(cell_value) and str(cell_value).strip() != "":
+                cell_str = str(cell_value).strip()
+                # Prüfe auf wichtige Kennzahlen-Namen
+                cell_upper = cell_str.upper()
+                if any(keyword in cell_upper for keyword in ["ISIN", "FLOAT", "FREE", "MARKET", "CURRENCY", "P/E", "P/B", "ROE", "ROA", "EBIT", "EBITDA"]):
+                    better_name = cell_str
+                    break
+
+        if better_name and str(orig_col).startswith("Unnamed"):
+            repaired.append(better_name)
+        else:
+            repaired.append(str(orig_col).strip())
+    return repaired
+
+def _build_sheet_structures(file_path):
+    """
+    Erkennt Schema, Daten-Frame und (bei Sheets mit RIC-Spalte) die Zeile jedes RICs für alle
+    Sheets einer geladenen Datei (einmalig)
+    """
+    for sheet_name, df_raw in _excel_cache.get(file_path, {}).items():
+        schema = detect_sheet_schema(df_raw)
+        _sheet_schemas[(file_path, sheet_name)] = schema
+
+        if schema["header_row"] is None:
+            continue
+
+        df = df_raw.iloc[schema["data_start"]:schema["data_end"]].reset_index(drop=True)
+        df.columns = schema["columns"]
+        df = sanitize_metric_values(df.infer_objects(), schema)
+        _sheet_frames[(file_path, sheet_name)] = df
+
+        if schema["ric_col"] is None or "RIC" not in df.columns:
             continue
 
-    # KORRIGIERT: Für nicht gefundene Felder explizit leeren Wert setzen
+        # Pro Sheet zählt (wie bisher) nur das erste Vorkommen eines RICs
+        rics = df["RIC"].dropna().astype(str).str.upper().str.strip()
+        rics = rics[rics != ""].drop_duplicates()
+        _sheet_ric_rows[(file_path, sheet_name)] = pd.Series(rics.index, index=rics.values)
+        _ric_sheets.setdefault(file_path, []).append(sheet_name)
+
+def sanitize_metric_values(df, schema):
+    """
+    Maskiert Fehlermeldungen und RIC-artige Werte in den Kennzahlen-Spalten eines Sheets
+    spaltenweise als NaN (einmalig beim Laden statt pro Zelle bei jeder Suche)
+    """
+    identity = {col.lower() for col in IDENTITY_COLUMNS}
+    ric_values = None
+    if schema["ric_col"] is not None:
+        ric_values = df.iloc[:, schema["ric_col"]].astype(str).str.strip().str.upper()
+
+    masked = {}
+    for col_pos, col in enumerate(df.columns):
+        if str(col).strip().lower() in identity:
+            continue
+        series = df.iloc[:, col_pos]
+        # Nur Text-/gemischte Spalten können Fehlermeldungen oder RICs enthalten
+        if pd.api.types.is_numeric_dtype(series) or pd.api.types.is_datetime64_any_dtype(series):
+            continue
+
+        str_values = series.astype(str).str.strip().str.upper()
+        noise = (
+            str_values.str.contains(_ERROR_MESSAGE_RE, na=False)
+            | str_values.str.fullmatch(_RIC_LIKE_RE, na=False)
+        )
+        if ric_values is not None:
+            # Der RIC der eigenen Zeile ist kein Kennzahlen-Wert
+            noise |= str_values == ric_values
+        noise &= series.notna()
+
+        if noise.any():
+            masked[col_pos] = series.mask(noise).infer_objects()
+
+    for col_pos, series in masked.items():
+        df.isetitem(col_pos, series)
+    return df
+
+def get_loaded_sheet_names(file_path):
+    """Sheet-Namen einer gecachten Datei in Workbook-Reihenfolge"""
+    return list(_excel_cache.get(file_path, {}))
+
+def get_sheet_schema(file_path, sheet_name):
+    """Liefert das beim Laden erkannte Schema eines Sheets (oder None)"""
+    return _sheet_schemas.get((file_path, sheet_name))
+
+def get_sheet_frame(file_path, sheet_name, repaired=False):
+    """
+    Liefert die Datenzeilen eines Sheets mit erkannter Header-Zeile (oder None).
+    Mit repaired=True werden die reparierten Spaltennamen verwendet.
+    """
+    df = _sheet_frames.get((file_path, sheet_name))
+    if df is None or not repaired:
+        return df
+    df = df.copy(deep=False)
+    df.columns = _sheet_schemas[(file_path, sheet_name)]["repaired_columns"]
+    return df
+
+def _load_files(file_paths, fields=None):
+    """
+    Lädt die Dateien einmalig pro Session in den Cache; mit fields und PROJECTED_LOADING werden
+    nur die dafür benötigten Spalten geladen.
+    """
+    if fields is not None and PROJECTED_LOADING:
+        load_excel_files_projected(file_paths, fields)
+    else:
+        load_excel_files_once(file_paths)
+
+def _normalized_column_keys(columns):
+    """Normalisierte Spaltennamen: (Position, Spalte, bereinigt, klein)"""
+    keys = []
+    for col_pos, col in enumerate(columns):
+        col_clean = str(col).replace('\n', ' ').replace('\r', ' ').strip()
+        keys.append((col_pos, col, col_clean, col_clean.lower()))
+    return keys
+
+def _match_field_columns(column_keys, field):
+    """Kandidaten-Spalten eines Feldes in der Reihenfolge der vier Match-Stufen"""
+    # Bereinige Feldname von Zeilenumbrüchen für Suche
+    clean_field = field.replace('\n', ' ').replace('\r', ' ').strip()
+    clean_lower = clean_field.lower()
+
+    candidates = []
+    # 1. EXAKTE ÜBEREINSTIMMUNG (höchste Priorität)
+    candidates += [(pos, col, 1) for pos, col, _, _ in column_keys if col == field]
+    # 2. BEREINIGTE ÜBEREINSTIMMUNG (ohne Zeilenumbrüche)
+    candidates += [(pos, col, 2) for pos, col, col_clean, _ in column_keys if col_clean == clean_field]
+    # 3. CASE-INSENSITIVE ÜBEREINSTIMMUNG
+    candidates += [(pos, col, 3) for pos, col, _, col_lower in column_keys if col_lower == clean_lower]
+    # 4. TEILSTRING-SUCHE nur für längere Feldnamen (niedrigste Priorität), beide Richtungen
+    if len(clean_field) > 4:
+        candidates += [(pos, col, 4) for pos, col, col_clean, col_lower in column_keys
+                       if (clean_lower in col_lower or col_lower in clean_lower) and len(col_clean) > 3]
+    return candidates
+
+def resolve_field_columns(excel_files, field):
+    """
+    Löst ein Feld für die Wide-Tabelle einer Dateiauswahl in Kandidaten-Spalten auf, sortiert
+    nach den vier Stufen exakt → bereinigt → case-insensitive → Teilstring.
+    Spaltennamen werden einmal pro Tabelle normalisiert, das Ergebnis pro Feld gecacht.
+
+    Returns:
+        Liste von (Spaltenposition, Spaltenname, Stufe)
+    """
+    table_key = tuple(excel_files)
+    if table_key not in _column_keys_cache:
+        _column_keys_cache[table_key] = _normalized_column_keys(get_wide_table(excel_files).columns)
+
+    key = (table_key, field)
+    if key not in _field_columns_cache:
+        _field_columns_cache[key] = _match_field_columns(_column_keys_cache[table_key], field)
+    return _field_columns_cache[key]
+
+def _combine_first_wins(parts):
+    """
+    Kombiniert Tabellen mit RIC-Index: Zeilen und Spalten in Reihenfolge des ersten Auftretens,
+    bei gleichem Spaltennamen gewinnt der erste nicht-leere Wert.
+
+    Returns:
+        (kombinierte Tabelle, Anzahl Zellen mit abweichenden Werten in mehreren Quellen)
+    """
+    if not parts:
+        return pd.DataFrame(), 0
+
+    # Untereinander stapeln und pro RIC den ersten nicht-leeren Wert je Spalte nehmen
+    grouped = pd.concat(parts, sort=False).groupby(level=0, sort=False)
+    combined = grouped.first()
+    conflicts = int((grouped.nunique() > 1).to_numpy().sum()) if len(parts) > 1 else 0
+    return combined, conflicts
+
+def _build_file_table(file_path):
+    """Führt alle RIC-Sheets einer Datei zu einer Tabelle mit einer Zeile pro RIC zusammen"""
+    parts = []
+    for sheet_name in _ric_sheets.get(file_path, ()):
+        rows = _sheet_ric_rows[(file_path, sheet_name)]
+        df = get_sheet_frame(file_path, sheet_name, repaired=True)
+        part = df.iloc[rows.to_numpy()]
+        part.index = rows.index
+
+        # Unbenannte Spalten lassen sich nicht über Sheets/Dateien hinweg zuordnen
+        keep = ~part.columns.duplicated() & ~part.columns.astype(str).str.startswith("Unnamed")
+        parts.append(part.loc[:, keep])
+
+    table, _ = _combine_first_wins(parts)
+    return table
+
+def get_wide_table(excel_files, fields=None):
+    """
+    Konsolidierte Tabelle über alle Dateien einer Auswahl: eine Zeile pro (normalisiertem) RIC,
+    alle Kennzahlen-Spalten aller RIC-Sheets.
+
+    Konfliktregel: Kommt eine Spalte in mehreren Quellen vor, gewinnt der erste nicht-leere
+    Wert in Datei-Reihenfolge (wie get_sector_excel_files), innerhalb einer Datei in
+    Sheet-Reihenfolge.
+
+    Mit fields wird (bei PROJECTED_LOADING) nur für diese Felder geladen.
+    """
+    table_key = tuple(excel_files)
+    if table_key in _wide_tables:
+        return _wide_tables[table_key]
+
+    _load_files(excel_files, fields)
+    for file_path in excel_files:
+        if file_path not in _file_tables and file_path in _files_loaded:
+            _file_tables[file_path] = _build_file_table(file_path)
+
+    parts = [_file_tables[file_path] for file_path in excel_files if file_path in _file_tables]
+    wide, conflicts = _combine_first_wins(parts)
+    _wide_tables[table_key] = wide
+
+    print(f"🧩 Wide-Tabelle: {len(wide)} RICs × {len(wide.columns)} Spalten aus {len(parts)} Dateien")
+    if conflicts:
+        print(f"⚠️ {conflicts} abweichende Werte in mehreren Quellen - erste Quelle gewinnt")
+    return wide
+
+def _non_empty(values):
+    """Maske für Werte, die als gefunden gelten (nicht NaN und nicht leerer Text)"""
+    mask = values.notna()
+    if not pd.api.types.is_numeric_dtype(values):
+        mask &= values.astype(str).str.strip() != ""
+    return mask.to_numpy()
+
+def _resolved_field_columns(excel_files, fields):
+    """
+    Aufgelöste Kennzahlen-Zeilen aller RICs einer Dateiauswahl: pro Feld und RIC die Spalte der
+    Wide-Tabelle mit dem ersten nicht-leeren Kandidaten-Wert (-1 wenn nicht gefunden).
+    Der Cache ist eine Obermenge über alle bisher angefragten Felder: neue Felder werden einmal für
+    alle RICs aufgelöst und ergänzt, jede Teilmenge bekannter Felder kommt ohne erneute Suche zurück.
+
+    Returns:
+        (Wide-Tabelle, {Feld: Array der Spaltenpositionen in Zeilen-Reihenfolge der Wide-Tabelle})
+    """
+    table_key = tuple(excel_files)
+    wide = get_wide_table(excel_files, fields)
+    cached = _resolved_columns.get(table_key)
+    if cached is None or cached[0] is not wide:
+        cached = (wide, {})
+        _resolved_columns[table_key] = cached
+
+    positions = cached[1]
+    for field in dict.fromkeys(fields):
+        if field in positions:
+            continue
+        field_positions = np.full(len(wide), -1)
+        remaining = np.ones(len(wide), dtype=bool)
+        for col_pos, _, _ in resolve_field_columns(excel_files, field):
+            hit = remaining & _non_empty(wide.iloc[:, col_pos])
+            field_positions[hit] = col_pos
+            remaining &= ~hit
+            if not remaining.any():
+                break
+        positions[field] = field_positions
+    return wide, positions
+
+def _lookup_positions(wide, positions, ric_keys, field):
+    """Spaltenposition des Werts von field für jeden RIC aus ric_keys (-1 wenn leer oder RIC unbekannt)"""
+    row_positions = wide.index.get_indexer(ric_keys)
+    known = row_positions >= 0
+    field_positions = np.full(len(ric_keys), -1)
+    field_positions[known] = positions[field][row_positions[known]]
+    return row_positions, field_positions
+
+def _collect_excel_values(ric_keys, fields, excel_files):
+    """
+    Sammelt die Felder für viele RICs auf einmal aus den aufgelösten Kennzahlen-Zeilen der
+    Wide-Tabelle (pro Feld der erste nicht-leere Wert der Kandidaten-Spalten).
+
+    Returns:
+        Dict normalisierter RIC → {Feld: Wert} (nur gefundene Felder, in Feld-Reihenfolge)
+    """
+    wide, positions = _resolved_field_columns(excel_files, fields)
+    ric_keys = pd.Index(list(dict.fromkeys(ric_keys)))
+    results = {ric_key: {} for ric_key in ric_keys}
+
+    for field in fields:
+        row_positions, field_positions = _lookup_positions(wide, positions, ric_keys, field)
+        for col_pos in np.unique(field_positions[field_positions >= 0]):
+            hit = field_positions == col_pos
+            column = wide.iloc[row_positions[hit], col_pos].to_numpy()
+            for ric_key, value in zip(ric_keys[hit], column):
+                results[ric_key][field] = value
+
+    return results
+
+def _cell_sources(rows, excel_files):
+    """
+    Quell-Datei jeder Zelle von Wide-Tabellen-Zeilen (Position in excel_files, -1 wenn leer):
+    wie in _combine_first_wins die erste Datei mit einem Wert in dieser Spalte
+    """
+    sources = np.full(rows.shape, -1)
+    for file_pos, file_path in enumerate(excel_files):
+        table = _file_tables.get(file_path)
+        if table is None:
+            continue
+        present = table.reindex(index=rows.index, columns=rows.columns).notna().to_numpy()
+        sources[(sources < 0) & present] = file_pos
+    return sources
+
+def _collect_excel_frame(ric_keys, fields, excel_files, with_sources=False):
+    """
+    Wie _collect_excel_values, aber als DataFrame (Index: normalisierte RICs, Spalten: Felder,
+    nicht gefundene Werte NaN) - für spaltenweise Auswertungen ohne Dict pro RIC.
+    Mit with_sources zusätzlich ein DataFrame mit der Quell-Datei jedes Werts (None wenn leer).
+    """
+    wide, positions = _resolved_field_columns(excel_files, fields)
+    ric_keys = pd.Index(list(dict.fromkeys(ric_keys)))
+    cell_sources = _cell_sources(wide.reindex(ric_keys), excel_files) if with_sources else None
+    result = {}
+    result_sources = {}
+
+    for field in fields:
+        values = np.full(len(ric_keys), np.nan, dtype=object)
+        sources = np.full(len(ric_keys), -1)
+        row_positions, field_positions = _lookup_positions(wide, positions, ric_keys, field)
+        for col_pos in np.unique(field_positions[field_positions >= 0]):
+            hit = field_positions == col_pos
+            values[hit] = wide.iloc[row_positions[hit], col_pos].to_numpy()
+            if with_sources:
+                sources[hit] = cell_sources[hit, col_pos]
+        result[field] = values
+        result_sources[field] = sources
+
+    columns = list(dict.fromkeys(fields))
+    frame = pd.DataFrame(result, index=ric_keys, columns=columns)
+    if not with_sources:
+        return frame
+
+    file_names = np.array(list(excel_files) + [None], dtype=object)
+    source_frame = pd.DataFrame({field: file_names[result_sources[field]] for field in columns},
+                                index=ric_keys, columns=columns)
+    return frame, source_frame
+
+def fetch_excel_kennzahlen_by_ric_filtered(ric: str, fields: list, gics_sectors=None) -> dict:
+    """
+    Suche Kennzahlen direkt über RIC (eine Zeile der Wide-Tabelle der gefilterten Dateien)
+    """
+    # Konvertiere zu Tuple für Caching
+    gics_sectors_tuple = tuple(gics_sectors) if gics_sectors else None
+
+    # Hole gefilterte Excel-Dateien (cached)
+    apply_pending_changes()
+    excel_files = get_sector_excel_files(gics_sectors_tuple)
+
+    # Lade alle Dateien einmalig in Cache
+    # (nur für die gefilterten Dateien - andere Sektoren werden nicht geöffnet)
+    _load_files(excel_files, fields)
+
+    result = _collect_excel_values([normalize_ric(ric)], fields, excel_files)[normalize_ric(ric)]
+
+    # Für nicht gefundene Felder explizit leeren Wert setzen
     for field in fields:
         if field not in result:
             print(f"⚠️ Kennzahl '{field}' nicht gefunden für RIC {ric}")
@@ -284,115 +865,154 @@ def fetch_excel_kennzahlen_by_ric_filtered(ric: str, fields: list, gics_sectors=
     return result
 
 
+def normalize_company_key(name) -> str:
+    """Normalisiert einen Unternehmensnamen für exakte Vergleiche (Kleinschreibung, ohne Rand-Leerzeichen)"""
+    return str(name).lower().strip()
+
+def _first_rows(keys):
+    """Series Schlüssel → erste Zeilenposition (leere Werte werden ignoriert)"""
+    keys = keys[keys.notna() & (keys != "") & (keys != "nan")]
+    keys = keys.drop_duplicates()
+    return pd.Series(keys.index, index=keys.values)
+
+def get_sheet_lookup_rows(file_path, sheet_name):
+    """
+    Liefert für ein gecachtes Sheet (Name → erste Zeile, RIC → erste Zeile), Namen aus der
+    Namensspalte des Schemas. Wird einmalig pro Sheet berechnet; None ohne Header-Zeile.
+    """
+    key = (file_path, sheet_name)
+    if key in _sheet_lookup_rows:
+        return _sheet_lookup_rows[key]
+
+    schema = get_sheet_schema(file_path, sheet_name)
+    df = get_sheet_frame(file_path, sheet_name)
+    if df is None or schema["name_col"] is None:
+        return None
+
+    name_rows = _first_rows(df.iloc[:, schema["name_col"]].astype(str).str.lower().str.strip())
+    ric_rows = pd.Series(dtype=object)
+    if "RIC" in df.columns:
+        ric_rows = _first_rows(df["RIC"].astype(str).str.upper().str.strip())
+
+    _sheet_lookup_rows[key] = (name_rows, ric_rows)
+    return _sheet_lookup_rows[key]
+
+def _sheet_name_entries(file_path, sheet_name):
+    """Alle (Name, RIC)-Paare eines Sheets mit RIC- und Holding/Universe-Spalte (oder None)"""
+    schema = get_sheet_schema(file_path, sheet_name)
+    df = get_sheet_frame(file_path, sheet_name)
+    if df is None or schema["ric_col"] is None:
+        return None
+
+    name_cols = [pos for pos, col in enumerate(schema["columns"]) if str(col).strip().lower() in NAME_COLUMNS]
+    if not name_cols:
+        return None
+
+    rics = df.iloc[:, schema["ric_col"]].astype(str).str.strip()
+    names = [df.iloc[:, pos].where(df.iloc[:, pos].notna(), "").astype(str).str.strip() for pos in name_cols]
+    entries = pd.DataFrame({"ric": rics, "ric_key": rics.str.upper()})
+    for i, name_values in enumerate(names):
+        entries[f"name_{i}"] = name_values
+    return entries[(entries["ric"] != "") & (entries["ric"] != "nan")]
+
+def get_name_ric_maps(excel_files=None):
+    """
+    Bidirektionale Zuordnung Name ↔ RIC über alle (bzw. die angegebenen) Dateien, einmalig aus den
+    gecachten Frames aufgebaut. Bei Mehrfachvorkommen gewinnt der erste Treffer in Datei- und
+    Sheet-Reihenfolge; Holding- und Universe-Namen verweisen beide auf den RIC, als Name eines RICs
+    gilt die erste Namensspalte (Holding), leer → Universe.
+
+    Returns:
+        (normalisierter Name → RIC, normalisierter RIC → Name)
+    """
+    apply_pending_changes()
+    excel_files = tuple(excel_files) if excel_files is not None else get_sector_excel_files(None)
+    maps = _name_ric_maps.get(excel_files)
+    if maps is not None:
+        return maps
+
+    load_excel_files_once(excel_files)
+
+    name_parts = []
+    ric_parts = []
+    for file_path in excel_files:
+        for sheet_name in _excel_cache.get(file_path, {}):
+            entries = _sheet_name_entries(file_path, sheet_name)
+            if entries is None or entries.empty:
+                continue
+            name_cols = [col for col in entries.columns if col.startswith("name_")]
+
+            display_names = entries[name_cols[0]]
+            for col in name_cols[1:]:
+                display_names = display_names.where(display_names != "", entries[col])
+            ric_parts.append(pd.DataFrame({"key": entries["ric_key"], "value": display_names}))
+
+            for col in name_cols:
+                name_parts.append(pd.DataFrame({"key": entries[col].str.lower(), "value": entries["ric"]}))
+
+    def first_wins(parts):
+        if not parts:
+            return {}
+        pairs = pd.concat(parts, ignore_index=True)
+        pairs = pairs[(pairs["key"] != "") & (pairs["value"] != "")].drop_duplicates("key")
+        return dict(zip(pairs["key"], pairs["value"]))
+
+    maps = (first_wins(name_parts), first_wins(ric_parts))
+    _name_ric_maps[excel_files] = maps
+    print(f"🔗 Name↔RIC-Zuordnung aufgebaut: {len(maps[0])} Namen, {len(maps[1])} RICs")
+    return maps
+
+def resolve_rics_by_names(names, excel_files=None):
+    """Batch-Auflösung Name → RIC (exakter Vergleich ohne Groß-/Kleinschreibung); unbekannt → ''"""
+    name_to_ric, _ = get_name_ric_maps(excel_files)
+    return {name: name_to_ric.get(normalize_company_key(name), "") for name in names}
+
+def resolve_names_by_rics(rics, excel_files=None):
+    """Batch-Auflösung RIC → Name; unbekannt → ''"""
+    _, ric_to_name = get_name_ric_maps(excel_files)
+    return {ric: ric_to_name.get(normalize_ric(ric), "") for ric in rics}
+
 def fetch_excel_kennzahlen(name: str, gruppe: str, fields: list) -> dict:
     result = {}
     print(f"🔍 Suche nach Kennzahlen für: {name}")
     print(f"📋 Gewünschte Felder: {fields}")
 
-    for file in os.listdir(DATA_DIR):
-        if not file.endswith(".xlsx") or file.startswith("~$"):
-            continue
-        print(f"📁 Durchsuche Datei: {file}")
-        path = os.path.join(DATA_DIR, file)
-        xls = pd.ExcelFile(path)
-
-        for sheet_name in xls.sheet_names:
-            print(f"📄 Sheet: {sheet_name}")
+    apply_pending_changes()
+    excel_files = get_sector_excel_files(None)
+    load_excel_files_once(excel_files)
 
-            # Lese erst ohne Header, um dynamisch zu suchen
-            df_raw = pd.read_excel(xls, sheet_name=sheet_name, header=None)
+    # Fallback für Namen aus der anderen Namensspalte (bzw. direkt angegebene RICs): über den RIC
+    name_key = normalize_company_key(name)
+    name_to_ric, _ = get_name_ric_maps(excel_files)
+    ric_key = normalize_ric(name_to_ric.get(name_key) or name)
 
-            # Suche nach Header-Zeile mit einer Namensspalte oder RIC
-            header_row = None
-            name_column = None
+    for file_path in excel_files:
+        print(f"📁 Durchsuche Datei: {os.path.basename(file_path)}")
 
-            for i in range(min(10, len(df_raw))):
-                row = df_raw.iloc[i]
-                row_str = row.astype(str).str.lower().str.strip()
+        for sheet_name in _excel_cache.get(file_path, {}):
+            print(f"📄 Sheet: {sheet_name}")
 
-                # Prüfe auf typische Namensspalten oder RIC
-                if any(col in ["holding", "universe", "ric"] for col in row_str.values):
-                    header_row = i
-                    # Bestimme die Namensspalte (bevorzuge Holding/Universe über RIC)
-                    for j, col_name in enumerate(row_str.values):
-                        if col_name in ["holding", "universe"]:
-                            name_column = j
-                            break
-                    # Falls keine Holding/Universe gefunden, nutze RIC als Fallback
-                    if name_column is None:
-                        for j, col_name in enumerate(row_str.values):
-                            if col_name == "ric":
-                                name_column = j
-                                break
-                    if name_column is not None:
-                        break
-
-            if header_row is None or name_column is None:
+            # Header-Zeile, Namensspalte und reparierte Spaltennamen stammen aus dem Schema
+            lookup_rows = get_sheet_lookup_rows(file_path, sheet_name)
+            if lookup_rows is None:
                 print(f"⚠️ Keine passende Header-Zeile in {sheet_name}")
                 continue
 
-            # Lese mit dem gefundenen Header
-            df = pd.read_excel(xls, sheet_name=sheet_name, header=header_row)
-
-            # Korrigiere Spaltennamen mit Informationen aus vorherigen Zeilen
-            if header_row > 0:
-                new_columns = []
-                for col_idx, orig_col in enumerate(df.columns):
-                    # Prüfe die Zeilen oberhalb des Headers für bessere Spaltennamen
-                    better_name = None
-                    for row_above in range(header_row):
-                        if col_idx < len(df_raw.columns):
-                            cell_value = df_raw.iloc[row_above, col_idx]
-                            if pd.notna(cell_value) and str(cell_value).strip() != "":
-                                cell_str = str(cell_value).strip()
-                                # Prüfe auf wichtige Kennzahlen-Namen
-                                cell_upper = cell_str.upper()
-                                if any(keyword in cell_upper for keyword in ["ISIN", "FLOAT", "FREE", "MARKET", "CURRENCY", "P/E", "P/B", "ROE", "ROA", "EBIT", "EBITDA"]):
-                                    better_name = cell_str
-                                    break
-
-                    if better_name and str(orig_col).startswith("Unnamed"):
-                        new_columns.append(better_name)
-                        print(f"🔧 Spalte korrigiert: '{orig_col}' → '{better_name}'")
-                    else:
-                        new_columns.append(str(orig_col).strip())
-
-                df.columns = new_columns
-
-            # Bestimme den echten Spaltennamen für die Namenssuche
-            name_col_name = df.columns[name_column]
-            print(f"🎯 Verwende Namensspalte: {name_col_name}")
-
-            # Suche nach der Zeile mit dem passenden Namen (auch RIC als Fallback)
-            matching_rows = []
-
-            # Zuerst versuche Name-Match
-            for idx, row in df.iterrows():
-                cell_value = row[name_col_name]
-                if pd.notna(cell_value):
-                    cell_str = str(cell_value).lower().strip()
-                    if cell_str == name.lower().strip():
-                        matching_rows.append(idx)
-                        break  # Nehme den ersten gefundenen Match
-
-            # Falls kein Name-Match, versuche RIC-Match falls verfügbar
-            if not matching_rows and "RIC" in df.columns:
-                print(f"🔄 Kein Name-Match, versuche RIC-Match...")
-                for idx, row in df.iterrows():
-                    ric_value = row.get("RIC")
-                    if pd.notna(ric_value) and str(ric_value).strip() != "":
-                        # Extrahiere RIC aus dem ursprünglichen Namen falls vorhanden
-                        # (manchmal ist der RIC Teil des Namens oder in der Gruppe)
-                        print(f"🔍 Prüfe RIC: {ric_value}")
-                        matching_rows.append(idx)
-                        break
-
-            if not matching_rows:
+            header_row = get_sheet_schema(file_path, sheet_name)["header_row"]
+            name_rows, ric_rows = lookup_rows
+
+            # Erst Name-Match in der Namensspalte, sonst über den RIC
+            match_idx = name_rows.get(name_key)
+            if match_idx is None:
+                match_idx = ric_rows.get(ric_key)
+                if match_idx is not None:
+                    print(f"🔄 Kein Name-Match, gefunden über RIC {ric_key}")
+
+            if match_idx is None:
                 print(f"⚠️ Name '{name}' nicht in {sheet_name} gefunden")
                 continue
 
-            # Verwende die erste passende Zeile
-            match_idx = matching_rows[0]
+            df = get_sheet_frame(file_path, sheet_name, repaired=True)
             matched_row = df.iloc[match_idx]
             print(f"✅ Name gefunden in Zeile {match_idx + header_row + 1}")
 
@@ -433,75 +1053,19 @@ def fetch_excel_kennzahlen(name: str, gruppe: str, fields: list) -> dict:
 
     print(f"📊 Gesammelte Kennzahlen: {list(result.keys())}")
     return result
+
 def resolve_ric_by_name(name: str) -> str:
-    for file in os.listdir(DATA_DIR):
-        if not file.endswith(".xlsx") or file.startswith("~$"):
-            continue
-        path = os.path.join(DATA_DIR, file)
-        df = pd.read_excel(path)
-        name_column = None
-        for col in df.columns:
-            if str(col).strip().lower() in ["holding", "universe"]:
-                name_column = col
-                break
-        if not name_column:
-            continue
-        if "RIC" not in df.columns:
-            continue
-        match = df[df[name_column].astype(str).str.lower() == name.lower()]
-        if not match.empty:
-            return match["RIC"].iloc[0]
-    return ""
+    """Liefert den RIC zu einem Unternehmensnamen (Holding oder Universe) oder ''"""
+    return resolve_rics_by_names([name])[name]
 
 def resolve_name_by_ric(ric: str) -> str:
-    print("📁 Starte RIC-Suche in Excel-Dateien...")
-
-    for file in os.listdir(DATA_DIR):
-        if not file.endswith(".xlsx") or file.startswith("~$"):
-            continue
-
-        print(f"🔍 Öffne Datei: {file}")
-        path = os.path.join(DATA_DIR, file)
-        xls = pd.ExcelFile(path)
-        for sheet_name in xls.sheet_names:
-            # Dynamisch nach Header mit "RIC" suchen (bis Zeile 10)
-            df_raw = pd.read_excel(xls, sheet_name=sheet_name, header=None)
-            header_row = None
-            for i in range(min(10, len(df_raw))):
-                row = df_raw.iloc[i]
-                # Neue Erkennung: prüfe, ob einer der Werte exakt "RIC" ist (Großschreibung, ohne Leerzeichen)
-                if row.astype(str).str.upper().str.strip().isin(["RIC"]).any():
-                    header_row = i
-                    break
-            if header_row is None:
-                print(f"⚠️ Keine Kopfzeile mit 'RIC' in Sheet {sheet_name}")
-                continue
-            df = pd.read_excel(xls, sheet_name=sheet_name, header=header_row)
-            print(f"📄 [Sheet: {sheet_name}] Spalten:", df.columns.tolist())
-
-            if "RIC" not in df.columns:
-                print("⚠️ RIC-Spalte fehlt")
-                continue
-
-            # Clean RIC-Spalte
-            df["RIC_clean"] = df["RIC"].astype(str).str.upper().str.strip()
-            ric_clean = ric.upper().strip()
-            print("📃 Enthaltene RICs:", df["RIC_clean"].dropna().unique())
-
-            match = df[df["RIC_clean"] == ric_clean]
-            if not match.empty:
-                name_column = None
-                for col in df.columns:
-                    if str(col).strip().lower() in ["holding", "universe"]:
-                        name_column = col
-                        break
-                if name_column:
-                    print(f"✅ Treffer: {ric_clean} → {match[name_column].iloc[0]}")
-                    return match[name_column].iloc[0]
-                else:
-                    print(f"⚠️ Kein Name-Spaltenmatch in {file}")
-    print(f"❌ Kein Treffer für RIC '{ric}' gefunden.")
-    return ""
+    """Liefert den Unternehmensnamen zu einem RIC oder ''"""
+    name = resolve_names_by_rics([ric])[ric]
+    if name:
+        print(f"✅ Treffer: {normalize_ric(ric)} → {name}")
+    else:
+        print(f"❌ Kein Treffer für RIC '{ric}' gefunden.")
+    return name
 
 def fetch_excel_kennzahlen_by_ric(ric: str, fields: list) -> dict:
     """
@@ -512,29 +1076,77 @@ def fetch_excel_kennzahlen_by_ric(ric: str, fields: list) -> dict:
 
 def fetch_excel_kennzahlen_batch(rics, excel_fields, gics_sectors=None):
     """
-    KORRIGIERTE BATCH-FUNKTION: Verwendet die gleiche robuste Suchlogik wie die Einzelsuche
+    Batch-Suche: alle RICs und Felder auf einmal per Join gegen die Wide-Tabelle
+    (gleiche Suchlogik wie die Einzelsuche, Ergebnis als Dict RIC → {Feld: Wert})
     """
     print(f"📊 BATCH-VERARBEITUNG: {len(rics)} RICs für {len(excel_fields)} Excel-Kennzahlen")
 
-    # Sammle alle Ergebnisse
-    all_results = {}
-
-    # Verwende die bewährte Einzelsuche für jeden RIC
-    for ric in rics:
-        try:
-            ric_results = fetch_excel_kennzahlen_by_ric_filtered(ric, excel_fields, gics_sectors)
-            all_results[ric] = ric_results
+    gics_sectors_tuple = tuple(gics_sectors) if gics_sectors else None
+    apply_pending_changes()
+    excel_files = get_sector_excel_files(gics_sectors_tuple)
+    _load_files(excel_files, excel_fields)
 
-            if ric_results:
-                found_count = len([v for v in ric_results.values() if v != ""])
-                print(f"     ✅ {ric}: {found_count}/{len(excel_fields)} Kennzahlen gefunden")
-            else:
-                print(f"     ❌ {ric}: Keine Kennzahlen gefunden")
+    ric_keys = list(dict.fromkeys(normalize_ric(ric) for ric in rics))
+    collected = _collect_excel_values(ric_keys, excel_fields, excel_files)
 
-        except Exception as e:
-            print(f"     ❌ {ric}: Fehler bei der Suche - {e}")
-            all_results[ric] = {}
+    all_results = {}
+    for ric in rics:
+        # Jeder RIC bekommt ein eigenes Dict (nicht gefundene Felder als leerer String)
+        ric_results = dict(collected[normalize_ric(ric)])
+        for field in excel_fields:
+            ric_results.setdefault(field, "")
+        all_results[ric] = ric_results
+
+        found_count = len([v for v in ric_results.values() if v != ""])
+        if found_count:
+            print(f"     ✅ {ric}: {found_count}/{len(excel_fields)} Kennzahlen gefunden")
+        else:
+            print(f"     ❌ {ric}: Keine Kennzahlen gefunden")
 
     successful_results = len([r for r in all_results.values() if any(v != "" for v in r.values())])
     print(f"📊 BATCH-ERGEBNIS: {successful_results} von {len(rics)} RICs mit Daten")
     return all_results
+
+def fetch_excel_kennzahlen_frame(rics, excel_fields, gics_sectors=None):
+    """
+    Batch-Suche wie fetch_excel_kennzahlen_batch, Ergebnis als DataFrame
+    (Index: normalisierte RICs, Spalten: Felder, nicht gefundene Werte NaN)
+    """
+    gics_sectors_tuple = tuple(gics_sectors) if gics_sectors else None
+    apply_pending_changes()
+    excel_files = get_sector_excel_files(gics_sectors_tuple)
+    _load_files(excel_files, excel_fields)
+
+    ric_keys = [normalize_ric(ric) for ric in rics]
+    return _collect_excel_frame(ric_keys, excel_fields, excel_files)
+
+def fetch_excel_kennzahlen_sources(rics, excel_fields, gics_sectors=None):
+    """
+    Wie fetch_excel_kennzahlen_frame, zusätzlich mit der Datei, aus der jeder Wert stammt
+    (für Auswertungen, die pro Quell-Datei geführt werden)
+
+    Returns:
+        (Werte-DataFrame, Quellen-DataFrame mit Dateipfad bzw. None), beide mit normalisiertem RIC-Index
+    """
+    gics_sectors_tuple = tuple(gics_sectors) if gics_sectors else None
+    apply_pending_changes()
+    excel_files = get_sector_excel_files(gics_sectors_tuple)
+    _load_files(excel_files, excel_fields)
+
+    ric_keys = [normalize_ric(ric) for ric in rics]
+    return _collect_excel_frame(ric_keys, excel_fields, excel_files, with_sources=True)
+
+def get_field_columns(excel_fields, gics_sectors=None):
+    """Kandidaten-Spaltennamen je Feld (in Match-Reihenfolge) für die Wide-Tabelle der Dateiauswahl"""
+    gics_sectors_tuple = tuple(gics_sectors) if gics_sectors else None
+    excel_files = get_sector_excel_files(gics_sectors_tuple)
+    get_wide_table(excel_files, excel_fields)
+    return {field: tuple(col for _, col, _ in resolve_field_columns(excel_files, field)) for field in excel_fields}
+
+def get_file_rics(file_path):
+    """Normalisierte RICs, die eine Datei in ihren RIC-Sheets führt"""
+    _load_files([file_path])
+    if file_path not in _file_tables and file_path in _files_loaded:
+        _file_tables[file_path] = _build_file_table(file_path)
+    table = _file_tables.get(file_path)
+    return pd.Index([]) if table is None else table.index
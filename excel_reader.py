@@ -0,0 +1,435 @@
+import os
+import re
+import zipfile
+import datetime
+import importlib.util
+import posixpath
+from concurrent.futures import ProcessPoolExecutor
+import xml.etree.ElementTree as ET
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+# Lese-Engine für die Daten-Workbooks: "auto", "calamine", "stream" oder "openpyxl"
+# (überschreibbar über die Umgebungsvariable EXCEL_READ_ENGINE)
+READ_ENGINE = os.environ.get("EXCEL_READ_ENGINE", "auto")
+
+# Reihenfolge, in der "auto" die Engines ausprobiert
+AUTO_ENGINE_ORDER = ["calamine", "stream", "openpyxl"]
+
+# Anzahl Prozesse für das parallele Einlesen: 1 = sequentiell, 0 = alle Kerne
+# (überschreibbar über die Umgebungsvariable EXCEL_LOAD_WORKERS)
+LOAD_WORKERS = int(os.environ.get("EXCEL_LOAD_WORKERS", "1"))
+
+# Dateien ab dieser Größe werden sheetweise auf mehrere Prozesse verteilt
+SPLIT_SHEETS_MIN_BYTES = 256 * 1024
+
+NS_MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+NS_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+NS_PKG_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+def _calamine_available():
+    """calamine wird von pandas ab 2.2 über das Paket python-calamine unterstützt"""
+    if importlib.util.find_spec("python_calamine") is None:
+        return False
+    major, minor = (int(part) for part in pd.__version__.split(".")[:2])
+    return (major, minor) >= (2, 2)
+
+def available_engines():
+    """Liefert alle in dieser Umgebung nutzbaren Engines (schnellste zuerst)"""
+    engines = []
+    if _calamine_available():
+        engines.append("calamine")
+    engines.append("stream")
+    engines.append("openpyxl")
+    return engines
+
+def resolve_engine(engine=None):
+    """Bestimmt die tatsächlich verwendete Engine (Fallback auf openpyxl)"""
+    engine = (engine or READ_ENGINE or "auto").lower()
+    available = available_engines()
+
+    if engine == "auto":
+        return next(e for e in AUTO_ENGINE_ORDER if e in available)
+    if engine not in available:
+        print(f"⚠️ Lese-Engine '{engine}' nicht verfügbar, verwende openpyxl")
+        return "openpyxl"
+    return engine
+
+def read_workbook(file_path, engine=None):
+    """
+    Liest alle Sheets einer xlsx-Datei ohne Header (wie pd.read_excel(header=None)).
+
+    Returns:
+        (sheets, all_sheets_read): Dict Sheet-Name → DataFrame und ob alle Sheets gelesen wurden
+    """
+    engine = resolve_engine(engine)
+    if engine == "stream":
+        return _read_workbook_stream(file_path)
+    return _read_workbook_pandas(file_path, engine)
+
+def resolve_workers(workers=None):
+    """Bestimmt die Anzahl der Lese-Prozesse (0 oder negativ = alle verfügbaren Kerne)"""
+    workers = LOAD_WORKERS if workers is None else workers
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    return workers
+
+def list_sheet_names(file_path, engine=None):
+    """Sheet-Namen einer xlsx-Datei in Workbook-Reihenfolge (ohne Zellen zu lesen)"""
+    engine = resolve_engine(engine)
+    if engine == "stream":
+        with zipfile.ZipFile(file_path) as zf:
+            targets, _ = _read_sheet_targets(zf)
+        return list(targets)
+    with pd.ExcelFile(file_path, engine=engine) as xls:
+        return list(xls.sheet_names)
+
+def read_sheet(file_path, sheet_name, engine=None):
+    """Liest ein einzelnes Sheet ohne Header (wie pd.read_excel(header=None))"""
+    engine = resolve_engine(engine)
+    if engine == "stream":
+        sheets, all_sheets_read = _read_workbook_stream(file_path, [sheet_name])
+        if not all_sheets_read:
+            raise ValueError(f"Sheet {sheet_name} konnte nicht gelesen werden")
+        return sheets[sheet_name]
+    return pd.read_excel(file_path, sheet_name=sheet_name, header=None, engine=engine)
+
+def _read_sheet_task(file_path, sheet_name, engine):
+    """Worker: ein Sheet lesen; Fehler werden als Text an den Hauptprozess zurückgegeben"""
+    try:
+        return read_sheet(file_path, sheet_name, engine), None
+    except Exception as e:
+        return None, str(e)
+
+def read_workbooks_parallel(file_paths, engine=None, workers=None):
+    """
+    Liest mehrere xlsx-Dateien parallel in einem Prozess-Pool. Kleine Dateien werden als
+    Ganzes gelesen, große Dateien (ab SPLIT_SHEETS_MIN_BYTES) sheetweise verteilt.
+    Die DataFrames werden per Pickle an den Hauptprozess zurückgegeben.
+
+    Returns:
+        (results, errors): Datei → (sheets, all_sheets_read) in Eingabe-Reihenfolge,
+        Datei → Fehlermeldung für Dateien, die nicht geöffnet werden konnten
+    """
+    engine = resolve_engine(engine)
+    workers = min(resolve_workers(workers), max(len(file_paths), 1))
+
+    results = {}
+    errors = {}
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        file_futures = {}
+        sheet_futures = {}
+        for file_path in file_paths:
+            try:
+                split = os.path.getsize(file_path) >= SPLIT_SHEETS_MIN_BYTES and workers > 1
+                if split:
+                    sheet_futures[file_path] = [
+                        (sheet_name, pool.submit(_read_sheet_task, file_path, sheet_name, engine))
+                        for sheet_name in list_sheet_names(file_path, engine)
+                    ]
+                else:
+                    file_futures[file_path] = pool.submit(read_workbook, file_path, engine)
+            except Exception as e:
+                errors[file_path] = str(e)
+
+        # Ergebnisse in Eingabe-Reihenfolge einsammeln (deterministischer Cache-Aufbau)
+        for file_path in file_paths:
+            try:
+                if file_path in file_futures:
+                    results[file_path] = file_futures[file_path].result()
+                elif file_path in sheet_futures:
+                    sheets = {}
+                    all_sheets_read = True
+                    for sheet_name, future in sheet_futures[file_path]:
+                        df, error = future.result()
+                        if error is not None:
+                            print(f"❌ Fehler beim Lesen von Sheet {sheet_name}: {error}")
+                            all_sheets_read = False
+                            continue
+                        sheets[sheet_name] = df
+                    results[file_path] = (sheets, all_sheets_read)
+            except Exception as e:
+                errors[file_path] = str(e)
+
+    return results, errors
+
+def read_workbook_projected(file_path, select_columns, engine=None, header_rows=10):
+    """
+    Liest nur ausgewählte Spalten ausgewählter Sheets einer xlsx-Datei.
+
+    select_columns(sheet_name, df_head) bekommt die ersten header_rows Zeilen eines Sheets
+    (ohne Header) und liefert die benötigten Spaltenpositionen oder None (Sheet überspringen).
+    Die Spalten der gelieferten DataFrames tragen die Original-Positionen als Label.
+
+    Returns:
+        (sheets, all_sheets_read) wie read_workbook (nur die ausgewählten Sheets)
+    """
+    engine = resolve_engine(engine)
+    if engine == "stream":
+        return _read_workbook_stream(file_path, select_columns=select_columns, header_rows=header_rows)
+
+    sheets = {}
+    all_sheets_read = True
+    with pd.ExcelFile(file_path, engine=engine) as xls:
+        for sheet_name in xls.sheet_names:
+            try:
+                df_head = pd.read_excel(xls, sheet_name=sheet_name, header=None, nrows=header_rows)
+                positions = select_columns(sheet_name, df_head)
+                if not positions:
+                    continue
+                positions = sorted(positions)
+                df = pd.read_excel(xls, sheet_name=sheet_name, header=None, usecols=positions)
+                df.columns = positions
+                sheets[sheet_name] = df
+            except Exception as e:
+                print(f"❌ Fehler beim Lesen von Sheet {sheet_name}: {e}")
+                all_sheets_read = False
+    return sheets, all_sheets_read
+
+def _read_workbook_pandas(file_path, engine):
+    """openpyxl bzw. calamine über pd.ExcelFile"""
+    sheets = {}
+    all_sheets_read = True
+
+    with pd.ExcelFile(file_path, engine=engine) as xls:
+        for sheet_name in xls.sheet_names:
+            try:
+                sheets[sheet_name] = pd.read_excel(xls, sheet_name=sheet_name, header=None)
+            except Exception as e:
+                print(f"❌ Fehler beim Lesen von Sheet {sheet_name}: {e}")
+                all_sheets_read = False
+    return sheets, all_sheets_read
+
+# ---------------------------------------------------------------------------
+# Streaming-Reader: liest sharedStrings und Sheet-XML direkt mit iterparse,
+# ohne openpyxl-Zellobjekte aufzubauen
+# ---------------------------------------------------------------------------
+
+# Eingebaute Excel-Zahlenformate, die Datumswerte darstellen
+BUILTIN_DATE_FORMATS = {14, 15, 16, 17, 18, 19, 20, 21, 22, 45, 46, 47}
+_FORMAT_STRIP_RE = re.compile(r'"[^"]*"|\[(?!hh?\]|mm?\]|ss?\])[^\]]*\]')
+_DATE_CHARS_RE = re.compile(r"(?<![_\\])[dmhysDMHYS]")
+
+WINDOWS_EPOCH = datetime.datetime(1899, 12, 30)
+MAC_EPOCH = datetime.datetime(1904, 1, 1)
+
+def _is_date_format(fmt):
+    """Erkennt Datumsformate wie openpyxl (Text in Anführungszeichen/Klammern ignoriert)"""
+    if fmt is None:
+        return False
+    fmt = fmt.split(";")[0]
+    return bool(_DATE_CHARS_RE.search(_FORMAT_STRIP_RE.sub("", fmt)))
+
+def _from_excel_date(value, epoch):
+    """Wandelt eine Excel-Seriennummer in datetime um (inkl. 1900-Schaltjahr-Fehler)"""
+    day, fraction = divmod(value, 1)
+    diff = datetime.timedelta(milliseconds=round(fraction * 86400 * 1000))
+    if 0 <= value < 1 and diff.days == 0:
+        return (datetime.datetime.min + diff).time()
+    if 0 < value < 60 and epoch == WINDOWS_EPOCH:
+        day += 1
+    return epoch + datetime.timedelta(days=day) + diff
+
+def _column_index(cell_ref):
+    """'BU12' → 72 (0-basiert)"""
+    index = 0
+    for char in cell_ref:
+        if char.isalpha():
+            index = index * 26 + (ord(char.upper()) - 64)
+        else:
+            break
+    return index - 1
+
+def _text_of(element):
+    """Text eines <si>/<is>-Elements (Rich-Text-Runs zusammengefügt, Phonetik ignoriert)"""
+    parts = []
+    for child in element:
+        if child.tag == NS_MAIN + "t":
+            parts.append(child.text or "")
+        elif child.tag == NS_MAIN + "r":
+            for t in child.iter(NS_MAIN + "t"):
+                parts.append(t.text or "")
+    return "".join(parts)
+
+def _read_shared_strings(zf):
+    if "xl/sharedStrings.xml" not in zf.namelist():
+        return []
+    strings = []
+    with zf.open("xl/sharedStrings.xml") as f:
+        for _, element in ET.iterparse(f):
+            if element.tag == NS_MAIN + "si":
+                strings.append(_text_of(element))
+                element.clear()
+    return strings
+
+def _read_date_styles(zf):
+    """Menge der Style-Indizes (cellXfs), deren Zahlenformat ein Datum ist"""
+    if "xl/styles.xml" not in zf.namelist():
+        return set()
+    root = ET.fromstring(zf.read("xl/styles.xml"))
+
+    custom_formats = {}
+    num_fmts = root.find(NS_MAIN + "numFmts")
+    if num_fmts is not None:
+        for num_fmt in num_fmts:
+            custom_formats[int(num_fmt.get("numFmtId"))] = num_fmt.get("formatCode")
+
+    date_styles = set()
+    cell_xfs = root.find(NS_MAIN + "cellXfs")
+    if cell_xfs is not None:
+        for style_idx, xf in enumerate(cell_xfs):
+            fmt_id = int(xf.get("numFmtId", 0))
+            if fmt_id in custom_formats:
+                if _is_date_format(custom_formats[fmt_id]):
+                    date_styles.add(style_idx)
+            elif fmt_id in BUILTIN_DATE_FORMATS:
+                date_styles.add(style_idx)
+    return date_styles
+
+def _read_sheet_targets(zf):
+    """Sheet-Name → Pfad der Sheet-XML im Archiv (in Workbook-Reihenfolge)"""
+    workbook = ET.fromstring(zf.read("xl/workbook.xml"))
+    rels = ET.fromstring(zf.read("xl/_rels/workbook.xml.rels"))
+    rel_targets = {rel.get("Id"): rel.get("Target") for rel in rels.iter(NS_PKG_REL + "Relationship")}
+
+    workbook_pr = workbook.find(NS_MAIN + "workbookPr")
+    date1904 = workbook_pr is not None and workbook_pr.get("date1904") in ("1", "true")
+
+    targets = {}
+    for sheet in workbook.iter(NS_MAIN + "sheet"):
+        target = rel_targets[sheet.get(NS_REL + "id")]
+        if target.startswith("/"):
+            target = target.lstrip("/")
+        else:
+            target = posixpath.normpath(posixpath.join("xl", target))
+        targets[sheet.get("name")] = target
+    return targets, (MAC_EPOCH if date1904 else WINDOWS_EPOCH)
+
+def _convert_number(text, is_date, epoch):
+    """Zahl wie pandas/openpyxl: ganzzahlige Werte als int, Datumsformate als datetime"""
+    value = float(text) if any(c in text for c in ".eE") else int(text)
+    if is_date:
+        try:
+            return _from_excel_date(value, epoch)
+        except (OverflowError, ValueError):
+            # openpyxl behandelt ungültige Datumswerte als Fehlerzelle → NaN
+            return float("nan")
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+def _read_sheet_rows(zf, target, shared_strings, date_styles, epoch, usecols=None, nrows=None):
+    """
+    Liest eine Sheet-XML zeilenweise; liefert Listen im Format von pandas' get_sheet_data.
+    Optional nur die Spaltenpositionen aus usecols und nur die ersten nrows Zeilen.
+    """
+    data = []
+    last_row_with_data = -1
+    column_map = {pos: idx for idx, pos in enumerate(sorted(usecols))} if usecols is not None else None
+
+    with zf.open(target) as f:
+        for _, element in ET.iterparse(f):
+            if element.tag != NS_MAIN + "row":
+                continue
+
+            row_idx = int(element.get("r", len(data) + 1)) - 1
+            if nrows is not None and row_idx >= nrows:
+                break
+            while len(data) < row_idx:
+                data.append([])
+
+            row = []
+            next_col = 0
+            for cell in element.iter(NS_MAIN + "c"):
+                ref = cell.get("r")
+                col_idx = _column_index(ref) if ref else next_col
+                next_col = col_idx + 1
+                if column_map is not None:
+                    if col_idx not in column_map:
+                        continue
+                    col_idx = column_map[col_idx]
+
+                cell_type = cell.get("t", "n")
+                value_el = cell.find(NS_MAIN + "v")
+                text = value_el.text if value_el is not None else None
+
+                if cell_type == "inlineStr":
+                    is_el = cell.find(NS_MAIN + "is")
+                    value = _text_of(is_el) if is_el is not None else ""
+                elif text is None:
+                    value = ""
+                elif cell_type == "s":
+                    value = shared_strings[int(text)]
+                elif cell_type == "str":
+                    value = text
+                elif cell_type == "b":
+                    value = bool(int(text))
+                elif cell_type == "e":
+                    value = float("nan")
+                elif cell_type == "d":
+                    value = datetime.datetime.fromisoformat(text)
+                else:
+                    is_date = int(cell.get("s", 0)) in date_styles
+                    value = _convert_number(text, is_date, epoch)
+
+                while len(row) < col_idx:
+                    row.append("")
+                row.append(value)
+
+            # Wie pandas: leere Zellen am Zeilenende abschneiden
+            while row and row[-1] == "":
+                row.pop()
+            if row:
+                last_row_with_data = row_idx
+
+            data.append(row)
+            element.clear()
+
+    # Leere Zeilen am Ende entfernen und auf gleiche Breite auffüllen
+    data = data[:last_row_with_data + 1]
+    max_width = max((len(row) for row in data), default=0)
+    if column_map is not None and data:
+        max_width = len(column_map)
+    return [row + [""] * (max_width - len(row)) for row in data]
+
+def _rows_to_frame(data):
+    """Gleiche Typ-Inferenz und NA-Behandlung wie pd.read_excel(header=None)"""
+    if data:
+        return TextParser(data, header=None).read()
+    return pd.DataFrame()
+
+def _read_workbook_stream(file_path, sheet_names=None, select_columns=None, header_rows=10):
+    """
+    Streaming-Engine: parst sharedStrings und Sheet-XML direkt
+    (optional nur ausgewählte Sheets bzw. projiziert, siehe read_workbook_projected)
+    """
+    sheets = {}
+    all_sheets_read = True
+
+    with zipfile.ZipFile(file_path) as zf:
+        shared_strings = _read_shared_strings(zf)
+        date_styles = _read_date_styles(zf)
+        targets, epoch = _read_sheet_targets(zf)
+
+        for sheet_name, target in targets.items():
+            if sheet_names is not None and sheet_name not in sheet_names:
+                continue
+            try:
+                if select_columns is None:
+                    sheets[sheet_name] = _rows_to_frame(_read_sheet_rows(zf, target, shared_strings, date_styles, epoch))
+                    continue
+
+                # Erst die Kopfzeilen lesen, dann nur die benötigten Spalten
+                df_head = _rows_to_frame(_read_sheet_rows(zf, target, shared_strings, date_styles, epoch, nrows=header_rows))
+                positions = select_columns(sheet_name, df_head)
+                if not positions:
+                    continue
+                positions = sorted(positions)
+                df = _rows_to_frame(_read_sheet_rows(zf, target, shared_strings, date_styles, epoch, usecols=positions))
+                df.columns = positions[:len(df.columns)]
+                sheets[sheet_name] = df
+            except Exception as e:
+                print(f"❌ Fehler beim Lesen von Sheet {sheet_name}: {e}")
+                all_sheets_read = False
+    return sheets, all_sheets_read
@@ -0,0 +1,95 @@
+import os
+import threading
+import importlib.util
+import excel_kennzahlen
+
+# Abfrageintervall (Sekunden) für den Polling-Watcher
+# (überschreibbar über die Umgebungsvariable EXCEL_WATCH_INTERVAL)
+WATCH_INTERVAL = float(os.environ.get("EXCEL_WATCH_INTERVAL", "2.0"))
+
+_watcher = None
+
+def _watchdog_available():
+    """Dateisystem-Events (inotify/FSEvents/ReadDirectoryChangesW) über das Paket watchdog"""
+    return importlib.util.find_spec("watchdog") is not None
+
+def _snapshot(data_dir):
+    """Dateiliste mit (Größe, mtime_ns) für den Polling-Watcher"""
+    snapshot = {}
+    for file in os.listdir(data_dir):
+        if file.endswith(".xlsx") and not file.startswith("~$"):
+            try:
+                stat = os.stat(os.path.join(data_dir, file))
+                snapshot[file] = (stat.st_size, stat.st_mtime_ns)
+            except OSError:
+                pass
+    return snapshot
+
+class _PollingWatcher(threading.Thread):
+    """Fallback ohne watchdog: vergleicht regelmäßig Größe/mtime aller Daten-Dateien"""
+
+    def __init__(self, data_dir, interval):
+        super().__init__(name="excel-data-watcher", daemon=True)
+        self.data_dir = data_dir
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        last = _snapshot(self.data_dir)
+        while not self._stop_event.wait(self.interval):
+            try:
+                current = _snapshot(self.data_dir)
+            except OSError:
+                continue
+            if current != last:
+                excel_kennzahlen.mark_data_changed()
+                last = current
+
+    def stop(self):
+        self._stop_event.set()
+
+def _start_watchdog(data_dir):
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+
+    class _DataDirHandler(FileSystemEventHandler):
+        def on_any_event(self, event):
+            paths = [getattr(event, "src_path", ""), getattr(event, "dest_path", "")]
+            if any(str(p).endswith(".xlsx") and not os.path.basename(str(p)).startswith("~$") for p in paths):
+                excel_kennzahlen.mark_data_changed()
+
+    observer = Observer()
+    observer.schedule(_DataDirHandler(), data_dir, recursive=False)
+    observer.daemon = True
+    observer.start()
+    return observer
+
+def start_data_watcher(interval=None):
+    """
+    Überwacht das Datenverzeichnis auf neue, geänderte und gelöschte Dateien.
+    Änderungen werden nur gemeldet; das Neuladen der betroffenen Dateien passiert beim
+    nächsten Zugriff im aufrufenden Thread (excel_kennzahlen.apply_pending_changes).
+    """
+    global _watcher
+    if _watcher is not None:
+        return
+
+    data_dir = excel_kennzahlen.DATA_DIR
+    if _watchdog_available():
+        _watcher = _start_watchdog(data_dir)
+        print(f"👀 Überwache {data_dir} (watchdog)")
+    else:
+        _watcher = _PollingWatcher(data_dir, interval or WATCH_INTERVAL)
+        _watcher.start()
+        print(f"👀 Überwache {data_dir} (Polling alle {_watcher.interval}s)")
+
+def stop_data_watcher():
+    """Beendet die Überwachung des Datenverzeichnisses"""
+    global _watcher
+    if _watcher is None:
+        return
+    _watcher.stop()
+    if hasattr(_watcher, "join"):
+        _watcher.join()
+    _watcher = None
+    print("👀 Überwachung beendet")
@@ -0,0 +1,359 @@
+import os
+import datetime
+import numpy as np
+import pandas as pd
+import excel_disk_cache
+from excel_kennzahlen import (
+    get_sector_excel_files, get_wide_table, fetch_excel_kennzahlen_sources, get_field_columns,
+    get_file_rics, get_data_stamps, apply_pending_changes, normalize_ric, IDENTITY_COLUMNS
+)
+from company_index import group_members_frame, group_values
+
+# Materialisierte Gruppen-Statistiken (Aggregations-Würfel), liegt neben dem Disk-Cache
+CUBE_FILE = "aggregation_cube.pkl"
+CUBE_FORMAT_VERSION = 4
+
+# Ebenen des Würfels (Gruppierungs-Spalten der Stammdaten-Tabelle)
+CUBE_LEVELS = ["Sub-Industry", "Focus", "Sector"]
+
+# Statistiken pro (Ebene, Gruppe, Kennzahl); members = Anzahl Unternehmen der Gruppe,
+# count = Anzahl numerischer Werte
+CUBE_QUANTILES = {"q25": 0.25, "median": 0.5, "q75": 0.75}
+CUBE_STATISTICS = ["members", "count", "sum", "mean", "std", "min", "max"] + list(CUBE_QUANTILES)
+
+# count/sum/mean/m2 (Summe der quadrierten Abweichungen vom Mittelwert) sind pro Quell-Datei
+# zusammensetzbar (Teil-Zustände, siehe _merge_moments), min/max/Quantile werden nur für die
+# Gruppen neu berechnet, deren Mitglieder sich geändert haben
+PARTIAL_STATISTICS = ["count", "sum", "mean", "m2"]
+ORDER_STATISTICS = ["min", "max"] + list(CUBE_QUANTILES)
+
+_state = None  # Zustand des Würfels (siehe _build_state), wird als Ganzes gespeichert
+_cube = None  # aus _state zusammengesetzter DataFrame mit Index (Level, Group, Metric)
+
+def _cube_path():
+    return os.path.join(excel_disk_cache.CACHE_DIR, CUBE_FILE)
+
+def _load_state():
+    """Lädt den gespeicherten Zustand (ohne Prüfung des Datenstands, siehe _sync_state)"""
+    if not excel_disk_cache.DISK_CACHE_ENABLED:
+        return None
+    try:
+        state = pd.read_pickle(_cube_path())
+    except Exception:
+        return None
+    if not isinstance(state, dict) or state.get("version") != CUBE_FORMAT_VERSION:
+        return None
+    return state
+
+def _save_state():
+    """Schreibt den Zustand atomar (erst Temp-Datei, dann umbenennen)"""
+    if not excel_disk_cache.DISK_CACHE_ENABLED:
+        return
+    try:
+        os.makedirs(excel_disk_cache.CACHE_DIR, exist_ok=True)
+        tmp_path = _cube_path() + ".tmp"
+        pd.to_pickle(_state, tmp_path, compression=None)
+        os.replace(tmp_path, _cube_path())
+    except Exception as e:
+        print(f"⚠️ Konnte Aggregations-Würfel nicht schreiben: {e}")
+
+def _all_metrics():
+    """Alle Kennzahlen-Spalten der Wide-Tabelle über alle Dateien"""
+    wide = get_wide_table(get_sector_excel_files(None))
+    identity = {col.lower() for col in IDENTITY_COLUMNS}
+    return [col for col in wide.columns if str(col).strip().lower() not in identity]
+
+def _memberships():
+    """Alle Gruppen-Mitgliedschaften der Stammdaten-Tabelle: eine Zeile pro (RIC, Ebene, Gruppe)"""
+    members = pd.concat([group_members_frame(level, group_values(level)).assign(Level=level)
+                         for level in CUBE_LEVELS], ignore_index=True)
+    return pd.DataFrame({
+        "RIC": [normalize_ric(ric) for ric in members["RIC"]],
+        "Level": members["Level"].to_numpy(),
+        "Group": members["Group"].to_numpy(),
+    })
+
+def _numeric_values(frame):
+    """
+    Zahlenwerte einer Kennzahlen-Tabelle (Text wie "12,5" → NaN wie bei to_numeric).
+    Datumswerte zählen nicht: to_numeric würde sie je nach Spalten-Mischung mal in
+    Nanosekunden, mal in NaN umwandeln - die Statistik hinge dann von der RIC-Auswahl ab.
+    """
+    frame = frame.astype(object)
+    dates = frame.map(lambda value: isinstance(value, (datetime.date, np.datetime64)))
+    return frame.mask(dates | frame.isna()).apply(pd.to_numeric, errors="coerce").astype(float)
+
+def _fetch_values(rics, fields):
+    """Numerische Werte und Quell-Dateien der Felder für die RICs"""
+    values, sources = fetch_excel_kennzahlen_sources(rics, fields)
+    values = _numeric_values(values)
+    return values, sources.where(values.notna())
+
+def _member_values(frame, members):
+    return frame.reindex(members["RIC"]).set_axis(members.index)
+
+def _partial_states(values, sources, members):
+    """
+    count/sum/mean/m2 pro Quell-Datei für die Mitgliedschafts-Zeilen members
+    (m2 zweistufig über die Abweichungen vom Gruppen-Mittelwert, ohne Summe der Quadrate)
+
+    Returns:
+        Dict Dateipfad → DataFrame mit Index (Level, Group, Metric) und Spalten PARTIAL_STATISTICS
+    """
+    member_values = _member_values(values, members).to_numpy(dtype=float)
+    member_sources = _member_values(sources, members).to_numpy(dtype=object)
+    rows, cols = np.nonzero(~np.isnan(member_values))
+    if len(rows) == 0:
+        return {}
+
+    cells = pd.DataFrame({
+        "File": member_sources[rows, cols],
+        "Level": members["Level"].to_numpy()[rows],
+        "Group": members["Group"].to_numpy()[rows],
+        "Metric": values.columns.to_numpy()[cols],
+        "value": member_values[rows, cols],
+    })
+    keys = ["File", "Level", "Group", "Metric"]
+    cells["deviation"] = (cells["value"] - cells.groupby(keys, sort=False)["value"].transform("mean")) ** 2
+    partials = cells.groupby(keys, sort=False).agg(
+        count=("value", "count"), sum=("value", "sum"), mean=("value", "mean"), m2=("deviation", "sum")).astype(float)
+    return {file_path: part.droplevel("File") for file_path, part in partials.groupby(level="File", sort=False)}
+
+def _merge_moments(current, delta, sign):
+    """
+    Führt zwei Teil-Zustände nach Chan et al. zusammen (sign=1) bzw. nimmt delta wieder aus
+    current heraus (sign=-1, Umkehrung derselben Formel); Zeilen ohne Werte fallen weg
+    """
+    if current is None:
+        current = delta.iloc[:0]
+    current, delta = current.align(delta, join="outer", fill_value=0)
+    count_a, count_b = current["count"], delta["count"]
+    count = count_a + sign * count_b
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if sign > 0:
+            difference = delta["mean"] - current["mean"]
+            mean = (current["mean"] + difference * count_b / count).where(count_a > 0, delta["mean"])
+            m2 = current["m2"] + delta["m2"] + difference ** 2 * count_a * count_b / count
+        else:
+            mean = current["mean"] + (current["mean"] - delta["mean"]) * count_b / count
+            difference = delta["mean"] - mean
+            m2 = current["m2"] - delta["m2"] - difference ** 2 * count * count_b / count_a
+            # Nur Rundungsreste der Umkehrung (ein Wert hat keine Streuung)
+            m2 = m2.where(count > 1, 0).clip(lower=0)
+
+    merged = pd.DataFrame({"count": count, "sum": current["sum"] + sign * delta["sum"], "mean": mean, "m2": m2})
+    return merged[merged["count"] > 0]
+
+def _total_moments(partials):
+    """Summe über alle Dateien, jedes Mal frisch aus den Datei-Zuständen zusammengeführt"""
+    totals = None
+    for partial in partials.values():
+        totals = _merge_moments(totals, partial, 1)
+    return totals
+
+def _apply_partials(deltas, sign):
+    """Übernimmt Teil-Zustände in die Datei-Zustände und die Summe über alle Dateien"""
+    partials = _state["partials"]
+    for file_path, delta in deltas.items():
+        partials[file_path] = _merge_moments(partials.get(file_path), delta, sign)
+        if partials[file_path].empty:
+            del partials[file_path]
+    _state["totals"] = _total_moments(partials)
+
+def _order_statistics(values, members):
+    """min/max/Quantile pro (Level, Group, Metric) für die Mitgliedschafts-Zeilen members"""
+    member_values = _member_values(values, members)
+    member_values.columns.name = "Metric"
+    grouped = member_values.groupby([members["Level"], members["Group"]], sort=False)
+    stats = {"min": grouped.min(), "max": grouped.max()}
+    for name, q in CUBE_QUANTILES.items():
+        stats[name] = grouped.quantile(q)
+    return pd.concat({name: frame.stack() for name, frame in stats.items()}, axis=1)[ORDER_STATISTICS]
+
+def _replace_rows(frame, update, drop_mask):
+    if frame is None:
+        return update
+    return pd.concat([frame[~drop_mask], update])
+
+def _build_state(fields):
+    """Berechnet den kompletten Zustand (alle Gruppen, alle Dateien) für die Felder"""
+    global _state
+    files = get_sector_excel_files(None)
+    members = _memberships()
+    rics = list(dict.fromkeys(members["RIC"]))
+    values, sources = _fetch_values(rics, fields)
+
+    _state = {
+        "version": CUBE_FORMAT_VERSION,
+        "files": list(files),
+        "stamps": get_data_stamps(files),
+        "file_rics": {file_path: list(get_file_rics(file_path)) for file_path in files},
+        "fields": list(fields),
+        "field_columns": get_field_columns(fields),
+        "members": members,
+        "values": values,
+        "sources": sources,
+        "partials": {},
+        "totals": None,
+        "order_stats": _order_statistics(values, members),
+    }
+    _apply_partials(_partial_states(values, sources, members), 1)
+    print(f"🧊 Aggregations-Würfel: {len(fields)} Kennzahlen × {len(CUBE_LEVELS)} Ebenen aus "
+          f"{len(files)} Dateien berechnet")
+
+def _add_fields(fields):
+    """Ergänzt den Zustand um neue Felder (nur diese Spalten werden berechnet)"""
+    members = _state["members"]
+    values, sources = _fetch_values(_state["values"].index, fields)
+    _state["values"] = pd.concat([_state["values"], values], axis=1)
+    _state["sources"] = pd.concat([_state["sources"], sources], axis=1)
+    _state["fields"] += list(fields)
+    _state["field_columns"].update(get_field_columns(fields))
+    _state["order_stats"] = pd.concat([_state["order_stats"], _order_statistics(values, members)])
+    _apply_partials(_partial_states(values, sources, members), 1)
+    print(f"🧊 Aggregations-Würfel: {len(fields)} Kennzahlen ergänzt")
+
+def _changed_member_rics(old_members, new_members):
+    """RICs, deren Gruppen-Zugehörigkeit (Zeilen RIC, Level, Group) sich zwischen zwei Ständen unterscheidet"""
+    diff = old_members.merge(new_members, how="outer", on=["RIC", "Level", "Group"], indicator=True)
+    return set(diff.loc[diff["_merge"] != "both", "RIC"])
+
+def _update_files(changed_files):
+    """
+    Aktualisiert den Zustand für geänderte, neue oder entfernte Dateien: nur die RICs dieser
+    Dateien (alter und neuer Stand) und die RICs mit geänderter Gruppen-Zugehörigkeit werden
+    von ihren Gruppen abgezogen und neu addiert, min/max/Quantile nur für deren Gruppen neu
+    berechnet.
+    """
+    files = get_sector_excel_files(None)
+    common_order = [f for f in files if f in _state["files"]]
+    if common_order != [f for f in _state["files"] if f in files] or \
+            get_field_columns(_state["fields"]) != _state["field_columns"]:
+        # Andere Datei-Reihenfolge oder Spalten-Zuordnung ändert potenziell alle Werte
+        _build_state(_state["fields"])
+        return
+
+    affected = set()
+    for file_path in changed_files:
+        affected.update(_state["file_rics"].pop(file_path, ()))
+        if file_path in files:
+            _state["file_rics"][file_path] = list(get_file_rics(file_path))
+            affected.update(_state["file_rics"][file_path])
+
+    # Gruppen-Zugehörigkeiten stammen aus der Stammdaten-Tabelle (andere Sheets als die RICs der
+    # Datei) - RICs mit geänderter Focus/Sub-Industry/Sektor kommen aus dem Vergleich beider Stände
+    old_members = _state["members"]
+    new_members = _memberships()
+    affected |= _changed_member_rics(old_members, new_members)
+    old_rows = old_members[old_members["RIC"].isin(affected)]
+    new_rows = new_members[new_members["RIC"].isin(affected)]
+
+    # Alten Beitrag der betroffenen RICs abziehen
+    _apply_partials(_partial_states(_state["values"], _state["sources"], old_rows), -1)
+
+    # Werte der betroffenen RICs neu holen und ihren neuen Beitrag addieren
+    affected_rics = list(dict.fromkeys(new_rows["RIC"]))
+    values, sources = _fetch_values(affected_rics, _state["fields"])
+    keep = ~_state["values"].index.isin(affected)
+    _state["values"] = pd.concat([_state["values"][keep], values])
+    _state["sources"] = pd.concat([_state["sources"][keep], sources])
+    _apply_partials(_partial_states(_state["values"], _state["sources"], new_rows), 1)
+
+    # Reihenfolgen-Statistiken der betroffenen Gruppen (mit allen Mitgliedern) neu berechnen
+    touched = pd.MultiIndex.from_frame(pd.concat([old_rows, new_rows])[["Level", "Group"]]).unique()
+    group_keys = pd.MultiIndex.from_frame(new_members[["Level", "Group"]])
+    touched_members = new_members[group_keys.isin(touched)]
+    order_stats = _state["order_stats"]
+    stale = order_stats.index.droplevel("Metric").isin(touched)
+    _state["order_stats"] = _replace_rows(order_stats, _order_statistics(_state["values"], touched_members), stale)
+
+    _state["members"] = new_members
+    _state["files"] = list(files)
+    _state["stamps"] = get_data_stamps(files)
+    print(f"🧊 Aggregations-Würfel aktualisiert: {len(changed_files)} Dateien, {len(affected)} RICs, "
+          f"{len(touched)} Gruppen")
+
+def _sync_state():
+    """
+    Bringt den Zustand auf den aktuellen Datenstand (Größe/mtime je Datei, wie im Excel-Cache
+    geladen); True, wenn er sich geändert hat
+    """
+    global _state
+    apply_pending_changes()
+
+    if _state is None:
+        _state = _load_state()
+        if _state is not None:
+            print(f"💾 Aggregations-Würfel aus Disk-Cache: {len(_state['fields'])} Kennzahlen")
+
+    if _state is None:
+        _build_state(_all_metrics())
+        return True
+
+    stamps = get_data_stamps(get_sector_excel_files(None))
+    changed = [f for f in sorted(set(stamps) | set(_state["stamps"])) if stamps.get(f) != _state["stamps"].get(f)]
+    if not changed:
+        return False
+    _update_files(changed)
+    return True
+
+def _assemble_cube():
+    """Setzt den Würfel aus Teil-Zuständen (count/sum/mean/m2), Reihenfolgen-Statistiken und Gruppengrößen zusammen"""
+    sizes = _state["members"].groupby(["Level", "Group"], sort=False).size()
+    fields = _state["fields"]
+    index = pd.MultiIndex.from_arrays([
+        np.repeat(sizes.index.get_level_values("Level"), len(fields)),
+        np.repeat(sizes.index.get_level_values("Group"), len(fields)),
+        np.tile(np.array(fields, dtype=object), len(sizes)),
+    ], names=["Level", "Group", "Metric"])
+
+    totals = _state["totals"].reindex(index) if _state["totals"] is not None else \
+        pd.DataFrame(np.nan, index=index, columns=PARTIAL_STATISTICS)
+    count = totals["count"].fillna(0)
+    variance = totals["m2"] / (count - 1).where(count > 1)
+
+    cube = pd.DataFrame({
+        "members": np.repeat(sizes.to_numpy(), len(fields)),
+        "count": count.astype(int),
+        "sum": totals["sum"],
+        "mean": totals["mean"],
+        "std": np.sqrt(variance),
+    }, index=index)
+    cube = cube.join(_state["order_stats"].reindex(index))
+    return cube[CUBE_STATISTICS]
+
+def build_aggregation_cube(fields=None):
+    """
+    Baut den Aggregations-Würfel (count, sum, mean, std, min, max, Quantile) für alle Kennzahlen
+    (bzw. zusätzlich die angegebenen Felder) auf Sub-Industry-, Focus- und Sektor-Ebene auf und
+    speichert ihn neben dem Disk-Cache.
+
+    count/sum/mean/m2 werden pro Quell-Datei als Teil-Zustand geführt: Ändert sich eine Datei,
+    wird nur der Beitrag ihrer RICs abgezogen und neu addiert (Aufwand proportional zur Datei).
+    """
+    global _cube
+    changed = _sync_state()
+
+    missing = [field for field in dict.fromkeys(fields or []) if field not in _state["fields"]]
+    if missing:
+        _add_fields(missing)
+        changed = True
+
+    if changed:
+        _save_state()
+        _cube = None
+    if _cube is None:
+        _cube = _assemble_cube()
+    return _cube
+
+def get_group_statistics(fields, level=None):
+    """
+    Gruppen-Statistiken aus dem Würfel (Index Level, Group, Metric), ohne Unternehmens-Zeilen
+    zu lesen. Felder, die noch nicht im Würfel sind, werden berechnet und ergänzt.
+    """
+    cube = build_aggregation_cube(fields)
+    stats = cube[cube.index.get_level_values("Metric").isin(list(fields))]
+    if level is not None:
+        stats = stats.xs(level, level="Level", drop_level=False)
+    return stats
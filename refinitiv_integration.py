@@ -1,9 +1,15 @@
 import pandas as pd
 import refinitiv.data as rd
 import warnings
+import threading
 
 warnings.simplefilter(action='ignore', category=FutureWarning)
 
+# rd arbeitet mit einer globalen Session: parallele Abfragen teilen sie sich, geöffnet von der
+# ersten und geschlossen von der letzten (nur Öffnen/Schließen und der Zähler sind gesperrt)
+_SESSION_LOCK = threading.Lock()
+_session_users = 0
+
 # GICS Sektor Mapping zu Refinitiv Codes
 GICS_SECTOR_CODES = {
     'Consumer Discretionary': '25',
@@ -165,16 +171,40 @@ def format_refinitiv_value(value):
     except:
         return str(value)
 
+def _acquire_session():
+    """Öffnet die Session für den ersten Nutzer, weitere parallele Abfragen verwenden sie mit"""
+    global _session_users
+    with _SESSION_LOCK:
+        if _session_users == 0:
+            print(f"🔄 Öffne Refinitiv-Session...")
+            rd.open_session()
+        _session_users += 1
+
+def _release_session():
+    """Schließt die Session, sobald die letzte parallele Abfrage fertig ist"""
+    global _session_users
+    with _SESSION_LOCK:
+        _session_users -= 1
+        if _session_users > 0:
+            return
+        try:
+            rd.close_session()
+            print("✅ Refinitiv-Session geschlossen")
+        except:
+            pass
+
 def get_refinitiv_kennzahlen_for_companies(companies, refinitiv_fields):
-    """Hole Refinitiv-Kennzahlen für alle Unternehmen"""
+    """Hole Refinitiv-Kennzahlen für alle Unternehmen (parallel aufrufbar, siehe _acquire_session)"""
     if not refinitiv_fields or not companies:
         return {}
 
-    print(f"🔄 Öffne Refinitiv-Session...")
-
     try:
-        rd.open_session()
+        _acquire_session()
+    except Exception as e:
+        print(f"❌ Fehler bei Refinitiv-Datenabfrage: {e}")
+        return {}
 
+    try:
         # Sammle alle RICs
         ric_list = [company['RIC'] for company in companies if company.get('RIC')]
 
@@ -200,11 +230,7 @@ def get_refinitiv_kennzahlen_for_companies(companies, refinitiv_fields):
         print(f"❌ Fehler bei Refinitiv-Datenabfrage: {e}")
         return {}
     finally:
-        try:
-            rd.close_session()
-            print("✅ Refinitiv-Session geschlossen")
-        except:
-            pass
+        _release_session()
 
 def get_consumer_discretionary_sector_average(refinitiv_fields):
     """
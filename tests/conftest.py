@@ -0,0 +1,66 @@
+import os
+import sys
+import shutil
+import openpyxl
+import pytest
+
+# Module liegen flach im Projekt-Verzeichnis
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+os.chdir(ROOT_DIR)  # DATA_DIR ist relativ zum Projekt-Verzeichnis
+
+import excel_disk_cache
+import excel_kennzahlen
+import group_statistics
+
+# Drei Dateien mit gemeinsamen RICs (Werte aus mehreren Quell-Dateien) und ein weiterer Sektor
+TEST_FILES = ["Consumer_Equity_Keyfigures.xlsx", "Consumer_Financial_Stability.xlsx",
+              "Consumer_Growth_Rates.xlsx", "Health_Care_Equity_Keyfigures.xlsx"]
+
+
+def reset_data_caches():
+    """Verwirft alle Daten im Speicher wie bei einem neuen Lauf (Disk-Cache bleibt)"""
+    excel_kennzahlen.clear_excel_cache()
+    excel_kennzahlen.get_sector_excel_files.cache_clear()
+    excel_kennzahlen._known_files = None
+    group_statistics._state = None
+    group_statistics._cube = None
+
+
+def modify_workbook(file_path):
+    """Ändert einen Teil der Zahlenwerte einer Datei (Wert * 3 + 7); gibt die Anzahl Zellen zurück"""
+    workbook = openpyxl.load_workbook(file_path)
+    changed = 0
+    for sheet in workbook.worksheets:
+        for row in sheet.iter_rows(min_row=4, max_row=min(sheet.max_row, 60)):
+            for cell in row[5::3]:
+                if isinstance(cell.value, (int, float)) and not isinstance(cell.value, bool):
+                    cell.value = cell.value * 3 + 7
+                    changed += 1
+    workbook.save(file_path)
+    return changed
+
+
+@pytest.fixture(autouse=True, scope="session")
+def isolated_cache_dir(tmp_path_factory):
+    """Disk-Cache, Katalog und Aggregations-Cube der Tests landen nicht in excel_data/cache"""
+    excel_disk_cache.set_cache_dir(str(tmp_path_factory.mktemp("cache")))
+    yield
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """Kopie einiger Daten-Dateien (TEST_FILES) in einem eigenen Verzeichnis mit eigenem Disk-Cache"""
+    target = tmp_path / "data"
+    target.mkdir()
+    for file_name in TEST_FILES:
+        shutil.copy(os.path.join("excel_data", "data", file_name), target / file_name)
+
+    previous_cache_dir = excel_disk_cache.CACHE_DIR
+    excel_disk_cache.set_cache_dir(str(tmp_path / "cache"))
+    monkeypatch.setattr(excel_kennzahlen, "DATA_DIR", str(target))
+    reset_data_caches()
+    yield target
+    monkeypatch.undo()
+    excel_disk_cache.set_cache_dir(previous_cache_dir)
+    reset_data_caches()
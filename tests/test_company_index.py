@@ -0,0 +1,93 @@
+import openpyxl
+import pytest
+import excel_kennzahlen
+import company_index
+from company_index import fold_company_name, normalize_company_name, search_company_by_name
+
+
+def test_normalize_folds_accents_and_keeps_word_boundaries():
+    assert normalize_company_name("Nestlé SA") == "nestle sa"
+    assert normalize_company_name("L'Oréal") == "l oreal"
+    assert normalize_company_name("AT&T  Inc.") == "at t inc"
+    assert normalize_company_name(" Lam", strip=False) == " lam"
+
+
+def test_fold_keeps_punctuation():
+    assert fold_company_name("L’Oréal SA") == "l'oreal sa"
+    assert fold_company_name("AT&T") == "at&t"
+
+
+@pytest.mark.parametrize("query, expected_ric", [
+    ("L'Oréal", "OREP.PA"),
+    ("L’Oréal", "OREP.PA"),
+    ("L'Or", "OREP.PA"),
+    ("Nestlé", "NESN.S"),
+    ("Nestle", "NESN.S"),
+    ("Lindt Spruengli", "LISN.S"),
+    ("Ralph Lauren", "RL.N"),
+])
+def test_search_finds_company(query, expected_ric):
+    company, _ = search_company_by_name(query)
+    assert company is not None
+    assert company["RIC"] == expected_ric
+
+
+def test_search_punctuation_must_match():
+    # "at t" steckt in "Just Eat Takeaway", "at&t" nicht; "at&t" auch nicht in "Hyatt"
+    assert search_company_by_name("AT&T") == (None, None)
+
+
+def test_search_short_query_rejected():
+    assert search_company_by_name("VF") == (None, None)
+
+
+def test_search_prefers_holding():
+    company, found_in = search_company_by_name("L'Oreal")
+    assert found_in == "Holding"
+    assert company["Name"] == "L'Oreal SA"
+
+
+def test_index_matches_linear_scan():
+    indexes = company_index.build_company_index()
+    for query in ["bank", "corp", "group sa", "ltd", "l'o", "& co"]:
+        folded_query = fold_company_name(query, strip=False)
+        normalized_query = normalize_company_name(query, strip=False)
+        expected = next((entry for _, entries, _ in indexes for entry in entries
+                         if normalized_query in entry[0] and folded_query in entry[1]), None)
+        punctuation = folded_query if company_index._PUNCTUATION_RE.search(folded_query) else None
+        actual = None
+        for _, entries, trigram_index in indexes:
+            entry_id = company_index._matching_entry(entries, trigram_index, normalized_query, punctuation)
+            if entry_id is not None:
+                actual = entries[entry_id]
+                break
+        assert actual == expected
+
+
+def test_changed_file_rebuilds_only_its_rows(data_dir):
+    files = excel_kennzahlen.get_sector_excel_files(None)
+    company_index.build_company_master()
+    company_index.build_company_index()
+    parts = dict(company_index._master_parts)
+    names = dict(company_index._name_indexes)
+
+    # Universe-Name eines Unternehmens in einer Datei umbenennen
+    file_path = data_dir / "Consumer_Growth_Rates.xlsx"
+    workbook = openpyxl.load_workbook(file_path)
+    row = next(row for row in workbook["Growth_Rates"].iter_rows(min_row=4) if row[4].value == "HRMS.PA")
+    row[1].value = "Testname Hermes"
+    workbook.save(file_path)
+    excel_kennzahlen.refresh_excel_data()
+
+    master = company_index.build_company_master()
+    company, found_in = search_company_by_name("Testname")
+    assert (company["RIC"], found_in) == ("HRMS.PA", "Universe")
+    for other in files:
+        if other != str(file_path):
+            assert company_index._master_parts[other] is parts[other]
+            assert company_index._name_indexes[other] is names[other]
+    assert company_index._master_parts[str(file_path)] is not parts[str(file_path)]
+
+    # Gleiches Ergebnis wie ein vollständiger Neuaufbau
+    company_index.clear_company_index()
+    assert master.equals(company_index.build_company_master())
@@ -0,0 +1,92 @@
+import os
+import pandas as pd
+import pytest
+import excel_disk_cache
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    previous_cache_dir = excel_disk_cache.CACHE_DIR
+    excel_disk_cache.set_cache_dir(str(tmp_path / "cache"))
+    yield tmp_path / "cache"
+    excel_disk_cache.set_cache_dir(previous_cache_dir)
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    """Platzhalter-Datei: der Disk-Cache prüft nur Größe, mtime und Inhalts-Hash"""
+    file_path = tmp_path / "Consumer_Test.xlsx"
+    file_path.write_bytes(b"version-1")
+    return str(file_path)
+
+
+SHEETS = {
+    "Equity Keyfigures": pd.DataFrame({"RIC": ["RL.N", "KO"], "Gearing": [0.5, 1.25]}),
+    "Working Capital": pd.DataFrame({"RIC": ["RL.N"], "DSO": [42.0]}),
+}
+
+
+def _set_mtime(file_path, offset_ns):
+    stat = os.stat(file_path)
+    os.utime(file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + offset_ns))
+
+
+def _assert_sheets_equal(sheets):
+    assert list(sheets) == list(SHEETS)
+    for name, frame in SHEETS.items():
+        pd.testing.assert_frame_equal(sheets[name], frame)
+
+
+def test_roundtrip(cache_dir, workbook):
+    assert excel_disk_cache.load_cached_workbook(workbook) is None
+    excel_disk_cache.store_cached_workbook(workbook, SHEETS)
+    _assert_sheets_equal(excel_disk_cache.load_cached_workbook(workbook))
+
+
+def test_manifest_survives_new_session(cache_dir, workbook):
+    excel_disk_cache.store_cached_workbook(workbook, SHEETS)
+    excel_disk_cache.set_cache_dir(str(cache_dir))  # verwirft das geladene Manifest
+    _assert_sheets_equal(excel_disk_cache.load_cached_workbook(workbook))
+
+
+def test_size_change_invalidates(cache_dir, workbook):
+    excel_disk_cache.store_cached_workbook(workbook, SHEETS)
+    with open(workbook, "ab") as f:
+        f.write(b"-more")
+    assert excel_disk_cache.load_cached_workbook(workbook) is None
+
+
+def test_mtime_change_with_new_content_invalidates(cache_dir, workbook):
+    excel_disk_cache.store_cached_workbook(workbook, SHEETS)
+    with open(workbook, "wb") as f:
+        f.write(b"version-2")  # gleiche Größe
+    _set_mtime(workbook, 5_000_000_000)
+    assert excel_disk_cache.load_cached_workbook(workbook) is None
+
+
+def test_mtime_change_with_same_content_stays_valid(cache_dir, workbook):
+    excel_disk_cache.store_cached_workbook(workbook, SHEETS)
+    _set_mtime(workbook, 5_000_000_000)
+    _assert_sheets_equal(excel_disk_cache.load_cached_workbook(workbook))
+
+    # Neue mtime wird übernommen, der nächste Zugriff braucht keinen Hash mehr
+    entry = excel_disk_cache._load_manifest()[os.path.abspath(workbook)]
+    assert entry["mtime_ns"] == os.stat(workbook).st_mtime_ns
+
+
+def test_restore_replaces_old_version(cache_dir, workbook):
+    excel_disk_cache.store_cached_workbook(workbook, SHEETS)
+    old_sha1 = excel_disk_cache._load_manifest()[os.path.abspath(workbook)]["sha1"]
+
+    with open(workbook, "wb") as f:
+        f.write(b"version-22")
+    excel_disk_cache.store_cached_workbook(workbook, {"Equity Keyfigures": SHEETS["Equity Keyfigures"]})
+    assert not os.path.exists(os.path.join(str(cache_dir), old_sha1))
+    assert list(excel_disk_cache.load_cached_workbook(workbook)) == ["Equity Keyfigures"]
+
+
+def test_disabled_cache(cache_dir, workbook, monkeypatch):
+    monkeypatch.setattr(excel_disk_cache, "DISK_CACHE_ENABLED", False)
+    excel_disk_cache.store_cached_workbook(workbook, SHEETS)
+    assert excel_disk_cache.load_cached_workbook(workbook) is None
+    assert not os.path.exists(str(cache_dir))
@@ -0,0 +1,90 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+import excel_disk_cache
+import excel_kennzahlen
+import company_index
+
+
+def _metrics_and_rics():
+    files = excel_kennzahlen.get_sector_excel_files(None)
+    wide = excel_kennzahlen.get_wide_table(files)
+    identity = {col.lower() for col in excel_kennzahlen.IDENTITY_COLUMNS}
+    metrics = [col for col in wide.columns if str(col).strip().lower() not in identity]
+    rics = list(dict.fromkeys(company_index.build_company_master()["RIC"]))
+    return files, metrics, rics
+
+
+def test_field_subsets_served_from_resolved_rows(monkeypatch):
+    files, metrics, rics = _metrics_and_rics()
+    fields = metrics[:6] + ["Kennzahl, die es nicht gibt"]
+    sample = rics[::17] + ["XXX.YY"]
+
+    full = excel_kennzahlen.fetch_excel_kennzahlen_batch(sample, fields)
+
+    # Teilmengen lösen keine Felder mehr neu auf
+    calls = []
+    resolve = excel_kennzahlen.resolve_field_columns
+    monkeypatch.setattr(excel_kennzahlen, "resolve_field_columns",
+                        lambda excel_files, field: calls.append(field) or resolve(excel_files, field))
+    subset = fields[4:] + fields[:2]
+    partial = excel_kennzahlen.fetch_excel_kennzahlen_batch(sample, subset)
+    assert calls == []
+    assert set(excel_kennzahlen._resolved_columns[tuple(files)][1]) >= set(fields)
+
+    for ric in sample:
+        found = [field for field in subset if full[ric][field] != ""]
+        assert list(partial[ric]) == found + [field for field in subset if field not in found]
+        assert all(partial[ric][field] == full[ric][field] for field in subset)
+
+    # Neue Felder werden nachgeladen und ergänzt
+    excel_kennzahlen.fetch_excel_kennzahlen_batch(sample, metrics[6:8])
+    assert calls == metrics[6:8]
+
+
+def test_resolved_rows_match_fresh_lookup():
+    files, metrics, rics = _metrics_and_rics()
+    sample = rics[::5]
+    excel_kennzahlen.fetch_excel_kennzahlen_frame(sample, metrics[:30])
+    cached = excel_kennzahlen.fetch_excel_kennzahlen_frame(sample, metrics[10:20])
+
+    excel_kennzahlen.clear_excel_cache()
+    fresh = excel_kennzahlen.fetch_excel_kennzahlen_frame(sample, metrics[10:20])
+    assert cached.equals(fresh)
+    assert not excel_kennzahlen._resolved_columns[tuple(files)][1].keys() - set(metrics[10:20])
+
+
+def test_resolved_rows_dropped_with_changed_file():
+    files, metrics, rics = _metrics_and_rics()
+    excel_kennzahlen.fetch_excel_kennzahlen_frame(rics[:10], metrics[:3])
+    assert tuple(files) in excel_kennzahlen._resolved_columns
+    excel_kennzahlen._forget_file(files[0])
+    assert tuple(files) not in excel_kennzahlen._resolved_columns
+    assert np.all([files[0] not in key for key in excel_kennzahlen._resolved_columns])
+    excel_kennzahlen.clear_excel_cache()
+
+
+def _sheet_value(file_name, sheet_name, ric, column):
+    """Wert einer Zelle direkt aus dem Daten-Frame eines Sheets"""
+    file_path = os.path.join(excel_kennzahlen.DATA_DIR, file_name)
+    df = excel_kennzahlen.get_sheet_frame(file_path, sheet_name, repaired=True)
+    return df.loc[df["RIC"].astype(str).str.strip() == ric, column].iloc[0]
+
+
+@pytest.mark.parametrize("projected", [False, True])
+def test_growth_and_profitability_sheets_in_lookup(monkeypatch, projected):
+    # Growth_Rates und Revenue_Profitability passen auf keines der früheren Sheet-Stichwörter
+    fields = ["Return on\nEquity \n(ROE)", "EBITDA\n5Y CAGR"]
+    excel_kennzahlen.clear_excel_cache()
+    monkeypatch.setattr(excel_kennzahlen, "PROJECTED_LOADING", projected)
+    monkeypatch.setattr(excel_disk_cache, "DISK_CACHE_ENABLED", False)
+
+    result = excel_kennzahlen.fetch_excel_kennzahlen_batch(["RL.N"], fields)["RL.N"]
+    expected = {
+        fields[0]: _sheet_value("Consumer_Revenue_Profitability_CF.xlsx", "Revenue_Profitability", "RL.N", fields[0]),
+        fields[1]: _sheet_value("Consumer_Growth_Rates.xlsx", "Growth_Rates", "RL.N", fields[1]),
+    }
+    assert all(pd.notna(value) for value in expected.values())
+    assert result == expected
+    excel_kennzahlen.clear_excel_cache()
@@ -0,0 +1,59 @@
+import os
+import shutil
+import pandas as pd
+import excel_kennzahlen
+from conftest import modify_workbook
+
+
+def _values(rics, fields):
+    return excel_kennzahlen.fetch_excel_kennzahlen_frame(rics, fields)
+
+
+def _sample(file_path):
+    """Einige RICs und Kennzahlen-Spalten einer geladenen Datei"""
+    rics = list(excel_kennzahlen.get_file_rics(file_path))[:40]
+    wide = excel_kennzahlen.get_wide_table([file_path])
+    identity = {col.lower() for col in excel_kennzahlen.IDENTITY_COLUMNS}
+    fields = [col for col in wide.columns if str(col).strip().lower() not in identity][:15]
+    return rics, fields
+
+
+def test_refresh_reloads_only_changed_file(data_dir, capsys):
+    files = excel_kennzahlen.get_sector_excel_files(None)
+    excel_kennzahlen.load_excel_files_once(files)
+    excel_kennzahlen.refresh_excel_data()
+    changed_file = str(data_dir / "Health_Care_Equity_Keyfigures.xlsx")
+    rics, fields = _sample(changed_file)
+    before = _values(rics, fields)
+
+    assert modify_workbook(changed_file) > 0
+    capsys.readouterr()
+    affected = excel_kennzahlen.refresh_excel_data()
+    assert [os.path.basename(f) for f in affected] == ["Health_Care_Equity_Keyfigures.xlsx"]
+    assert "lade neu: Health_Care_Equity_Keyfigures.xlsx" in capsys.readouterr().out
+
+    # Neu geladene Werte entsprechen einem kompletten Neuaufbau
+    after = _values(rics, fields)
+    assert not after.equals(before)
+    excel_kennzahlen.clear_excel_cache()
+    pd.testing.assert_frame_equal(after, _values(rics, fields))
+
+
+def test_refresh_without_changes_reloads_nothing(data_dir):
+    excel_kennzahlen.load_excel_files_once(excel_kennzahlen.get_sector_excel_files(None))
+    excel_kennzahlen.refresh_excel_data()
+    assert excel_kennzahlen.refresh_excel_data() == []
+
+
+def test_refresh_picks_up_added_and_removed_files(data_dir):
+    excel_kennzahlen.load_excel_files_once(excel_kennzahlen.get_sector_excel_files(None))
+    excel_kennzahlen.refresh_excel_data()
+
+    shutil.copy(os.path.join("excel_data", "data", "Utilities_Equity_Keyfigures.xlsx"), data_dir)
+    os.remove(data_dir / "Consumer_Financial_Stability.xlsx")
+    affected = excel_kennzahlen.refresh_excel_data()
+
+    assert [os.path.basename(f) for f in affected] == ["Consumer_Financial_Stability.xlsx"]
+    names = sorted(os.path.basename(f) for f in excel_kennzahlen.get_sector_excel_files(None))
+    assert names == ["Consumer_Equity_Keyfigures.xlsx", "Consumer_Growth_Rates.xlsx",
+                     "Health_Care_Equity_Keyfigures.xlsx", "Utilities_Equity_Keyfigures.xlsx"]
@@ -0,0 +1,111 @@
+import numpy as np
+import openpyxl
+import pandas as pd
+import pytest
+import excel_kennzahlen
+import company_index
+import group_statistics
+from conftest import reset_data_caches, modify_workbook
+
+
+def _reference_statistics(fields):
+    """Gruppen-Statistiken per direktem groupby über alle Mitglieder (ohne Teil-Zustände)"""
+    members = pd.concat([company_index.group_members_frame(level, company_index.group_values(level)).assign(Level=level)
+                         for level in group_statistics.CUBE_LEVELS], ignore_index=True)
+    values = group_statistics._numeric_values(
+        excel_kennzahlen.fetch_excel_kennzahlen_frame(members["RIC"].unique(), fields))
+    values = values.reindex(members["RIC"].str.upper().str.strip()).set_axis(members.index)
+    values.columns.name = "Metric"
+    grouped = values.groupby([members["Level"], members["Group"]], sort=False)
+    stats = {"count": grouped.count(), "sum": grouped.sum(min_count=1), "mean": grouped.mean(), "std": grouped.std(),
+             "min": grouped.min(), "max": grouped.max(), "median": grouped.median()}
+    return pd.concat({name: frame.stack() for name, frame in stats.items()}, axis=1)
+
+
+def _assert_matches_reference(cube):
+    reference = _reference_statistics(group_statistics._state["fields"])
+    cube = cube.reindex(reference.index)
+    for column in reference.columns:
+        np.testing.assert_allclose(cube[column].to_numpy(float), reference[column].to_numpy(float),
+                                   rtol=1e-9, atol=1e-9, err_msg=column)
+
+
+def test_moments_merge_without_cancellation():
+    values = pd.DataFrame({"M": [1e9 + 1, 1e9 + 2, 1e9 + 3, 1e9 + 4]}, index=["A", "B", "C", "D"])
+    sources = pd.DataFrame({"M": ["f1", "f1", "f2", "f2"]}, index=values.index)
+    members = pd.DataFrame({"RIC": list(values.index), "Level": "Focus", "Group": "G"})
+
+    partials = group_statistics._partial_states(values, sources, members)
+    totals = group_statistics._total_moments(partials)
+    row = totals.loc[("Focus", "G", "M")]
+    assert row["count"] == 4
+    assert row["mean"] == pytest.approx(1e9 + 2.5, rel=1e-15)
+    assert np.sqrt(row["m2"] / 3) == pytest.approx(np.std([1, 2, 3, 4], ddof=1), rel=1e-6)
+
+    # Herausnehmen eines Teil-Zustands ergibt wieder den anderen
+    rest = group_statistics._merge_moments(totals, partials["f2"], -1)
+    expected = partials["f1"].loc[("Focus", "G", "M")]
+    assert rest.loc[("Focus", "G", "M"), "count"] == 2
+    assert rest.loc[("Focus", "G", "M"), "mean"] == pytest.approx(expected["mean"], rel=1e-15)
+    assert rest.loc[("Focus", "G", "M"), "m2"] == pytest.approx(expected["m2"], rel=1e-6)
+
+
+def test_cube_matches_full_recompute(data_dir):
+    cube = group_statistics.build_aggregation_cube()
+    assert len(cube) > 0
+    _assert_matches_reference(cube)
+
+    # Kennzahlen aus dem Growth_Rates-Sheet (kein Stichwort der früheren Sheet-Auswahl)
+    metrics = set(cube.index.get_level_values("Metric"))
+    assert {"EBITDA\n5Y CAGR", "TR.TotRevenue5YrCAGR(Period=FY0)"} <= metrics
+    assert cube.xs("EBITDA\n5Y CAGR", level="Metric")["count"].sum() > 0
+
+
+def test_incremental_update_matches_full_recompute(data_dir, capsys):
+    group_statistics.build_aggregation_cube()
+    assert modify_workbook(data_dir / "Consumer_Financial_Stability.xlsx") > 0
+
+    excel_kennzahlen.refresh_excel_data()
+    capsys.readouterr()
+    cube = group_statistics.build_aggregation_cube()
+    assert "Aggregations-Würfel aktualisiert: 1 Dateien" in capsys.readouterr().out
+    _assert_matches_reference(cube)
+
+
+def test_incremental_update_follows_membership_change(data_dir, monkeypatch, capsys):
+    # Die Datei liefert hier nur Stammdaten (keine RICs mit Kennzahlen für den Würfel)
+    file_path = data_dir / "Consumer_Growth_Rates.xlsx"
+    get_file_rics = group_statistics.get_file_rics
+    monkeypatch.setattr(group_statistics, "get_file_rics",
+                        lambda path: [] if path == str(file_path) else get_file_rics(path))
+    group_statistics.build_aggregation_cube()
+
+    # Nur die Focus-Zuordnung eines Unternehmens ändert sich, keine Kennzahl
+    workbook = openpyxl.load_workbook(file_path)
+    sheet = workbook["Growth_Rates"]
+    row = next(row for row in sheet.iter_rows(min_row=4) if row[4].value == "HRMS.PA")
+    row[3].value = "Test Focus"
+    workbook.save(file_path)
+
+    excel_kennzahlen.refresh_excel_data()
+    capsys.readouterr()
+    cube = group_statistics.build_aggregation_cube()
+    assert "Aggregations-Würfel aktualisiert: 1 Dateien, 0 RICs" not in capsys.readouterr().out
+    group = cube.xs("Test Focus", level="Group")
+    assert group["members"].eq(1).all()
+    assert group["count"].sum() > 0
+    _assert_matches_reference(cube)
+
+
+def test_cube_state_reused_across_runs(data_dir, capsys):
+    group_statistics.build_aggregation_cube()
+    modify_workbook(data_dir / "Health_Care_Equity_Keyfigures.xlsx")
+
+    # Neue Session: Zustand aus dem Disk-Cache, nur die geänderte Datei wird eingerechnet
+    reset_data_caches()
+    capsys.readouterr()
+    cube = group_statistics.build_aggregation_cube()
+    out = capsys.readouterr().out
+    assert "Aggregations-Würfel aus Disk-Cache" in out
+    assert "Aggregations-Würfel aktualisiert: 1 Dateien" in out
+    _assert_matches_reference(cube)